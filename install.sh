@@ -1,4 +1,4 @@
 #!/bin/sh
 
-rm -f ${HOME}/Library/Application\ Support/Blender/2.77/scripts/addons/paint_paint_tools.py 
-cp paint_paint_tools.py ${HOME}/Library/Application\ Support/Blender/2.77/scripts/addons/
+rm -rf ${HOME}/Library/Application\ Support/Blender/2.77/scripts/addons/paint_tools
+cp -r paint_tools ${HOME}/Library/Application\ Support/Blender/2.77/scripts/addons/
@@ -1,4 +1,4 @@
 #!/bin/sh
 
-rm -f ~/.config/blender/2.76/scripts/addons/paint_paint_tools.py
-cp paint_paint_tools.py ~/.config/blender/2.76/scripts/addons/paint_paint_tools.py
+rm -rf ~/.config/blender/2.76/scripts/addons/paint_tools
+cp -r paint_tools ~/.config/blender/2.76/scripts/addons/paint_tools
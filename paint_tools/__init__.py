@@ -0,0 +1,74 @@
+bl_info = {
+    "name": "Paint Tools",
+    "author": "Nutti, chromoly",
+    "version": (1, 0),
+    "blender": (2, 77, 0),
+    "location": "Image Editor > Paint Tools",
+    "description": "Paint Tools for Blender",
+    "warning": "",
+    "support": "COMMUNITY",
+    "wiki_url": "https://github.com/nutti/Paint-Tools",
+    "tracker_url": "https://github.com/nutti/Paint-Tools/issues",
+    "category": "Paint"
+}
+
+try:
+    import bpy
+except ImportError:
+    # running outside Blender; only the bpy-free modules (core, pixel_io,
+    # benchmark) are usable
+    bpy = None
+
+if bpy is not None:
+    from . import operators
+    from . import ui
+    from . import properties
+
+    def get_handlers():
+        handlers = bpy.app.handlers
+        return [
+            (handlers.undo_pre, operators.flush_image_cache),
+            (handlers.redo_pre, operators.flush_image_cache),
+            (handlers.save_pre, operators.flush_image_cache),
+            (handlers.undo_post, operators.revalidate_image_cache),
+            (handlers.redo_post, operators.revalidate_image_cache),
+            (handlers.load_post, operators.invalidate_image_cache),
+        ]
+
+    # Ctrl+Z / Ctrl+Shift+Z run the Paint Tools history in the image
+    # editor; with nothing to undo there the poll fails and Blender's own
+    # undo gets the key
+    addon_keymaps = []
+
+    def register_keymaps():
+        kc = bpy.context.window_manager.keyconfigs.addon
+        if kc is None:
+            return
+        km = kc.keymaps.new(name='Image', space_type='IMAGE_EDITOR')
+        addon_keymaps.append((km, km.keymap_items.new(
+            operators.PT_Undo.bl_idname, 'Z', 'PRESS', ctrl=True)))
+        addon_keymaps.append((km, km.keymap_items.new(
+            operators.PT_Redo.bl_idname, 'Z', 'PRESS', ctrl=True,
+            shift=True)))
+
+    def unregister_keymaps():
+        for km, kmi in addon_keymaps:
+            km.keymap_items.remove(kmi)
+        del addon_keymaps[:]
+
+    def register():
+        operators.instrument_operators()
+        bpy.utils.register_module(__name__)
+        properties.init_props()
+        register_keymaps()
+        for h, fn in get_handlers():
+            h.append(fn)
+
+    def unregister():
+        operators.job_queue.shutdown()
+        unregister_keymaps()
+        for h, fn in get_handlers():
+            if fn in h:
+                h.remove(fn)
+        bpy.utils.unregister_module(__name__)
+        properties.clear_props()
@@ -0,0 +1,468 @@
+import argparse
+import json
+import sys
+import timeit
+
+import numpy as np
+
+from . import core, filters
+from .tiles import ArrayTileSource, TileEngine
+from .resample import RESAMPLE_FILTERS, Resampler
+from .composite import BLEND_MODES, composite_at
+from .formats import from_float, to_float
+from .pixel_io import DirtyRegions, NumpyImage, NumpyPixelIO, PixelTransfer
+from .selection import flood_fill, get_color_mask, magic_wand
+
+
+DEFAULT_SIZES = [512, 1024, 2048, 4096, 8192]
+DEFAULT_SELECTIONS = [0.1, 0.5, 1.0]
+DEFAULT_WORKERS = [1, 2, 4, 8]
+DEFAULT_RADII = [1, 3, 8, 32, 128]
+DEFAULT_SCALES = [0.25, 0.5, 2.0]
+# a case is a regression when it is this much slower than the baseline
+DEFAULT_REGRESSION_THRESHOLD = 1.25
+# parameters telling the cases of one mode apart
+KEY_PARAMS = ('size', 'selection', 'workers', 'radius', 'scale')
+# side of the fixed size selection of the write-back benchmark
+DIRTY_SIDE = 256
+# seconds a magic wand may take on an 8192 pixel square image, scaled by
+# area for the other sizes; the noise case has no budget
+WAND_BUDGET = 1.0
+WAND_BUDGET_SIZE = 8192
+
+
+def blend_paste(pixels, rect, mode):
+    # same placement and copy as the plain paste case, so the two compare
+    copied = core.copy(pixels, rect)
+    return composite_at(
+        pixels, rect['x0'], rect['y1'] - copied['height'], copied['pixels'],
+        mode, 0.75)
+
+
+def get_cases():
+    return [
+        ('fill', lambda p, r: core.fill(p, r, (1.0, 0.5, 0.0))),
+        ('copy', lambda p, r: core.copy(p, r)),
+        ('cut', lambda p, r: core.cut(p, r)),
+        ('paste', lambda p, r: core.paste(
+            p, (r['x0'], r['y1']), core.copy(p, r))),
+        ('erase', lambda p, r: core.erase(p, r)),
+        ('binarize', lambda p, r: core.binarize(p, r, 0.5, 'RED')),
+        ('gray_scale', lambda p, r: core.gray_scale(p, r, 'NTSC')),
+        ('brightness', lambda p, r: core.brightness(p, r, 0.1)),
+        ('invert', lambda p, r: core.invert(p, r)),
+    ] + [
+        ('paste_' + mode.lower(),
+         (lambda mode: lambda p, r: blend_paste(p, r, mode))(mode))
+        for mode in BLEND_MODES
+    ]
+
+
+def get_selection(size, ratio):
+    side = max(1, int(size * ratio))
+    x0 = (size - side) // 2
+    return {'x0': x0, 'y0': x0, 'x1': x0 + side, 'y1': x0 + side}
+
+
+def run(sizes, selections, repeat, ops=None, out=sys.stdout):
+    rng = np.random.RandomState(0)
+    results = []
+    out.write("{:<20}{:>8}{:>8}{:>12}{:>12}\n".format(
+        "op", "size", "sel", "ms", "Mpix/s"))
+    for size in sizes:
+        pixels = rng.random_sample((size, size, 4)).astype(np.float32)
+        for ratio in selections:
+            rect = get_selection(size, ratio)
+            npix = (rect['x1'] - rect['x0']) * (rect['y1'] - rect['y0'])
+            for name, fn in get_cases():
+                if ops and name not in ops:
+                    continue
+                t = min(timeit.repeat(
+                    lambda: fn(pixels, rect), number=1, repeat=repeat))
+                results.append({
+                    'op': name, 'size': size, 'selection': ratio,
+                    'seconds': t, 'pixels': npix})
+                out.write("{:<20}{:>8}{:>8.2f}{:>12.3f}{:>12.1f}\n".format(
+                    name, size, ratio, t * 1000.0, npix / t / 1.0e6))
+        del pixels
+
+    return results
+
+
+def get_kernels():
+    return [
+        ('binarize', lambda p: core.kernel_binarize(p, 0.5, 'RED')),
+        ('gray_scale', lambda p: core.kernel_gray_scale(p, 'NTSC')),
+        ('brightness', lambda p: core.kernel_brightness(p, 0.1)),
+        ('invert', core.kernel_invert),
+    ]
+
+
+def run_scaling(size, workers, repeat, ops=None, out=sys.stdout):
+    rng = np.random.RandomState(0)
+    pixels = rng.random_sample((size, size, 4)).astype(np.float32)
+    rect = get_selection(size, 1.0)
+    results = []
+    out.write("{:<12}{:>8}{:>8}{:>12}{:>12}\n".format(
+        "op", "size", "workers", "ms", "speedup"))
+    for name, kernel in get_kernels():
+        if ops and name not in ops:
+            continue
+        base = None
+        for n in workers:
+            engine = TileEngine(memory_limit=1 << 30, workers=n)
+            t = min(timeit.repeat(
+                lambda: engine.apply(ArrayTileSource(pixels), rect, kernel),
+                number=1, repeat=repeat))
+            engine.shutdown()
+            if base is None:
+                base = t
+            results.append({
+                'op': name, 'size': size, 'workers': n, 'seconds': t})
+            out.write("{:<12}{:>8}{:>8}{:>12.3f}{:>12.2f}\n".format(
+                name, size, n, t * 1000.0, base / t))
+
+    return results
+
+
+def run_filters(sizes, radii, repeat, ops=None, out=sys.stdout):
+    # every filter through the tile engine, the halo included; gaussian is
+    # also timed with the direct and FFT convolutions forced
+    rng = np.random.RandomState(0)
+    results = []
+    out.write("{:<12}{:>8}{:>8}{:>12}{:>12}\n".format(
+        "filter", "size", "radius", "ms", "Mpix/s"))
+    engine = TileEngine(memory_limit=1 << 30)
+    for size in sizes:
+        pixels = rng.random_sample((size, size, 4)).astype(np.float32)
+        rect = get_selection(size, 1.0)
+        for radius in radii:
+            w = filters.gaussian_weights(radius)
+            cases = [
+                (name.lower(), filters.get_filter(name, radius))
+                for name in filters.FILTERS]
+            cases.append(('gauss_dir', (
+                lambda b: filters.correlate_axis(filters.correlate_axis(
+                    b[..., :3], w, 0, False), w, 1, False), radius)))
+            cases.append(('gauss_fft', (
+                lambda b: filters.correlate_axis(filters.correlate_axis(
+                    b[..., :3], w, 0, True), w, 1, True), radius)))
+            for name, (filt, halo) in cases:
+                if ops and name not in ops:
+                    continue
+                source = ArrayTileSource(pixels.copy())
+                t = min(timeit.repeat(
+                    lambda: engine.apply_filter(source, rect, filt, halo),
+                    number=1, repeat=repeat))
+                results.append({
+                    'op': name, 'size': size, 'radius': radius,
+                    'seconds': t, 'pixels': size * size})
+                out.write("{:<12}{:>8}{:>8}{:>12.3f}{:>12.1f}\n".format(
+                    name, size, radius, t * 1000.0, size * size / t / 1.0e6))
+        del pixels
+    engine.shutdown()
+
+    return results
+
+
+def run_resize(sizes, scales, repeat, ops=None, out=sys.stdout):
+    # "cold" includes building the weight tables, "warm" reuses them like
+    # a batch of images with the same size does
+    rng = np.random.RandomState(0)
+    results = []
+    out.write("{:<12}{:>8}{:>8}{:>12}{:>12}{:>12}\n".format(
+        "filter", "size", "scale", "cold ms", "warm ms", "Mpix/s"))
+    for size in sizes:
+        pixels = rng.random_sample((size, size, 4)).astype(np.float32)
+        for scale in scales:
+            dst = max(1, int(round(size * scale)))
+            for name in RESAMPLE_FILTERS:
+                if ops and name.lower() not in ops:
+                    continue
+                resampler = Resampler()
+                cold = min(timeit.repeat(
+                    lambda: (resampler.clear(),
+                             resampler.resize(pixels, dst, dst, name)),
+                    number=1, repeat=repeat))
+                warm = min(timeit.repeat(
+                    lambda: resampler.resize(pixels, dst, dst, name),
+                    number=1, repeat=repeat))
+                npix = max(size, dst) ** 2
+                results.append({
+                    'op': name.lower(), 'size': size, 'scale': scale,
+                    'cold': cold, 'seconds': warm, 'pixels': npix})
+                out.write(
+                    "{:<12}{:>8}{:>8.2f}{:>12.3f}{:>12.3f}{:>12.1f}\n".format(
+                        name.lower(), size, scale, cold * 1000.0,
+                        warm * 1000.0, npix / warm / 1.0e6))
+        del pixels
+
+    return results
+
+
+def run_dirty(sizes, selections, repeat, out=sys.stdout):
+    # fill plus write-back of only the dirty rect against writing the whole
+    # image; the fixed size selection should cost the same at every size
+    rng = np.random.RandomState(0)
+    transfer = PixelTransfer(NumpyPixelIO())
+    results = []
+    out.write("{:<20}{:>8}{:>8}{:>12}{:>12}\n".format(
+        "op", "size", "sel", "dirty ms", "full ms"))
+    for size in sizes:
+        pixels = rng.random_sample((size, size, 4)).astype(np.float32)
+        image = NumpyImage("bench", size, size)
+        buf = pixels.reshape(-1)
+        cases = [('fixed_{}'.format(DIRTY_SIDE),
+                  get_selection(size, min(1.0, DIRTY_SIDE / float(size))))]
+        cases += [('selection', get_selection(size, r)) for r in selections]
+        for name, rect in cases:
+            ratio = (rect['x1'] - rect['x0']) / float(size)
+
+            def edit(full):
+                box = core.fill(pixels, rect, (1.0, 0.5, 0.0))
+                if full:
+                    return transfer.write(image, buf)
+                dirty = DirtyRegions(size, size)
+                dirty.add(*box)
+                return transfer.write(image, buf, dirty)
+
+            t_dirty = min(timeit.repeat(
+                lambda: edit(False), number=1, repeat=repeat))
+            t_full = min(timeit.repeat(
+                lambda: edit(True), number=1, repeat=repeat))
+            results.append({
+                'op': name, 'size': size, 'selection': ratio,
+                'seconds': t_dirty, 'full_seconds': t_full})
+            out.write("{:<20}{:>8}{:>8.2f}{:>12.3f}{:>12.3f}\n".format(
+                name, size, ratio, t_dirty * 1000.0, t_full * 1000.0))
+        del pixels, image, buf
+
+    return results
+
+
+def run_storage(sizes, repeat, ops=None, out=sys.stdout):
+    # the same point ops on float32 and uint8 storage of an 8-bit image;
+    # "diff" is the largest difference of the uint8 result to the float
+    # one rounded to 8 bits, in 1/255 steps
+    rng = np.random.RandomState(0)
+    results = []
+    out.write("{:<12}{:>8}{:>10}{:>10}{:>12}{:>12}{:>6}\n".format(
+        "op", "size", "f32 MB", "u8 MB", "f32 ms", "u8 ms", "diff"))
+    for size in sizes:
+        base = rng.randint(0, 256, (size, size, 4)).astype(np.uint8)
+        for name, kernel in get_kernels():
+            if ops and name not in ops:
+                continue
+            f = to_float(base)
+            kernel(f)
+            expected = from_float(f, np.empty_like(base))
+            u = base.copy()
+            kernel(u)
+            diff = int(np.abs(u.astype(np.int16) - expected).max())
+            tf = min(timeit.repeat(
+                lambda: kernel(f), number=1, repeat=repeat))
+            tu = min(timeit.repeat(
+                lambda: kernel(u), number=1, repeat=repeat))
+            results.append({
+                'op': name, 'size': size, 'float_seconds': tf,
+                'seconds': tu, 'float_bytes': f.nbytes, 'bytes': u.nbytes,
+                'diff': diff})
+            out.write(
+                "{:<12}{:>8}{:>10.1f}{:>10.1f}{:>12.3f}{:>12.3f}{:>6}\n".format(
+                    name, size, f.nbytes / 1.0e6, u.nbytes / 1.0e6,
+                    tf * 1000.0, tu * 1000.0, diff))
+            del f, u
+        del base
+
+    return results
+
+
+def get_wand_images(size, rng):
+    # (name, pixels, tolerance, budgeted): a radial gradient selects a
+    # disc of about 40% of the image, smooth blobs give few long runs;
+    # noise at this tolerance selects most of the image as millions of
+    # short runs, the worst case of the flood fill
+    y, x = np.mgrid[0:size, 0:size].astype(np.float32)
+    c = size // 2
+    v = np.hypot(x - c, y - c) / (size * 0.7071)
+    yield 'radial', np.repeat(v[..., np.newaxis], 4, axis=2), 0.5, True
+    v = np.sin(x / 200.0) * np.sin(y / 150.0) * 0.5 + 0.5
+    del x, y
+    yield 'smooth', np.repeat(v[..., np.newaxis], 4, axis=2), 0.2, True
+    del v
+    pixels = rng.random_sample((size, size, 4)).astype(np.float32)
+    pixels[c, c] = 0.5
+    yield 'noise', pixels, 0.45, False
+
+
+def get_wand_budget(size):
+    return WAND_BUDGET * (size / float(WAND_BUDGET_SIZE)) ** 2
+
+
+def run_wand(sizes, repeat, out=sys.stdout):
+    # magic wand from the image center, color mask and flood fill timed
+    # apart, the total is the whole magic_wand call; "sel" is the
+    # selected part of the image
+    rng = np.random.RandomState(0)
+    results = []
+    out.write("{:<12}{:>8}{:>8}{:>12}{:>12}{:>12}{:>12}\n".format(
+        "op", "size", "sel", "mask ms", "fill ms", "total ms", "budget ms"))
+    for size in sizes:
+        c = size // 2
+        for name, pixels, tolerance, budgeted in get_wand_images(size, rng):
+            color = pixels[c, c, :3].copy()
+            t_mask = min(timeit.repeat(
+                lambda: get_color_mask(pixels, color, tolerance),
+                number=1, repeat=repeat))
+            mask = get_color_mask(pixels, color, tolerance)
+            t_fill = min(timeit.repeat(
+                lambda: flood_fill(mask, c, c), number=1, repeat=repeat))
+            t = min(timeit.repeat(
+                lambda: magic_wand(pixels, c, c, tolerance),
+                number=1, repeat=repeat))
+            ratio = np.count_nonzero(flood_fill(mask, c, c)) / float(mask.size)
+            budget = get_wand_budget(size) if budgeted else None
+            results.append({
+                'op': 'wand_' + name, 'size': size, 'selected': ratio,
+                'mask_seconds': t_mask, 'fill_seconds': t_fill,
+                'seconds': t, 'budget': budget,
+                'over_budget': budget is not None and t > budget})
+            out.write(
+                "{:<12}{:>8}{:>8.2f}{:>12.3f}{:>12.3f}{:>12.3f}{:>12}{}\n"
+                .format(
+                    name, size, ratio, t_mask * 1000.0, t_fill * 1000.0,
+                    t * 1000.0,
+                    "-" if budget is None else
+                    "{:.3f}".format(budget * 1000.0),
+                    "  OVER BUDGET" if results[-1]['over_budget'] else ""))
+            del pixels, mask
+
+    return results
+
+
+def get_result_key(mode, result):
+    params = ["{}={}".format(k, result[k]) for k in KEY_PARAMS if k in result]
+    return " ".join([mode, result['op']] + params)
+
+
+def save_results(mode, results, path):
+    baseline = {get_result_key(mode, r): r['seconds'] for r in results}
+    with open(path, 'w') as f:
+        json.dump(baseline, f, indent=1, sort_keys=True)
+
+
+def compare_results(mode, results, path,
+                    threshold=DEFAULT_REGRESSION_THRESHOLD, out=sys.stdout):
+    # returns the keys of the cases slower than threshold times the
+    # baseline; cases missing from the baseline are skipped
+    with open(path) as f:
+        baseline = json.load(f)
+    regressions = []
+    out.write("\n{:<48}{:>12}{:>12}{:>8}\n".format(
+        "case", "base ms", "ms", "ratio"))
+    for r in results:
+        key = get_result_key(mode, r)
+        if key not in baseline:
+            continue
+        ratio = r['seconds'] / baseline[key]
+        slow = ratio > threshold
+        if slow:
+            regressions.append(key)
+        out.write("{:<48}{:>12.3f}{:>12.3f}{:>8.2f}{}\n".format(
+            key, baseline[key] * 1000.0, r['seconds'] * 1000.0, ratio,
+            "  REGRESSION" if slow else ""))
+
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Benchmark Paint Tools image operations")
+    parser.add_argument(
+        "--sizes", type=int, nargs="+", default=DEFAULT_SIZES)
+    parser.add_argument(
+        "--selections", type=float, nargs="+", default=DEFAULT_SELECTIONS)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--ops", nargs="+", default=None)
+    parser.add_argument(
+        "--scaling", action="store_true",
+        help="measure tile-parallel speedup instead of single op timings")
+    parser.add_argument(
+        "--workers", type=int, nargs="+", default=DEFAULT_WORKERS)
+    parser.add_argument(
+        "--filters", action="store_true",
+        help="time the convolution filters over --radii")
+    parser.add_argument(
+        "--radii", type=int, nargs="+", default=DEFAULT_RADII)
+    parser.add_argument(
+        "--resize", action="store_true",
+        help="time resampling of the whole image over --scales")
+    parser.add_argument(
+        "--scales", type=float, nargs="+", default=DEFAULT_SCALES)
+    parser.add_argument(
+        "--dirty", action="store_true",
+        help="compare dirty rect write-back with writing the whole image")
+    parser.add_argument(
+        "--storage", action="store_true",
+        help="compare point ops on float32 and uint8 storage")
+    parser.add_argument(
+        "--wand", action="store_true",
+        help="time the magic wand on large, smooth and noisy selections "
+             "and exit with 1 when a case is over its budget")
+    parser.add_argument(
+        "--save", metavar="FILE",
+        help="store the timings as a baseline for --compare")
+    parser.add_argument(
+        "--compare", metavar="FILE",
+        help="compare the timings with a saved baseline and exit with 1 on "
+             "a regression")
+    parser.add_argument(
+        "--threshold", type=float, default=DEFAULT_REGRESSION_THRESHOLD,
+        help="slowdown against the baseline counted as a regression")
+    args = parser.parse_args(argv)
+
+    if args.wand:
+        mode = 'wand'
+        results = run_wand(args.sizes, args.repeat)
+    elif args.dirty:
+        mode = 'dirty'
+        results = run_dirty(args.sizes, args.selections, args.repeat)
+    elif args.storage:
+        mode = 'storage'
+        results = run_storage(args.sizes, args.repeat, args.ops)
+    elif args.resize:
+        mode = 'resize'
+        results = run_resize(args.sizes, args.scales, args.repeat, args.ops)
+    elif args.filters:
+        mode = 'filters'
+        results = run_filters(args.sizes, args.radii, args.repeat, args.ops)
+    elif args.scaling:
+        mode = 'scaling'
+        results = []
+        for size in args.sizes:
+            results += run_scaling(
+                size, args.workers, args.repeat, args.ops)
+    else:
+        mode = 'ops'
+        results = run(args.sizes, args.selections, args.repeat, args.ops)
+
+    if args.save:
+        save_results(mode, results, args.save)
+    if mode == 'wand':
+        over = [r for r in results if r['over_budget']]
+        if over:
+            sys.stderr.write("{} wand case(s) over budget\n".format(len(over)))
+            return 1
+    if args.compare:
+        regressions = compare_results(
+            mode, results, args.compare, args.threshold)
+        if regressions:
+            sys.stderr.write("{} regression(s) over {:.2f}x\n".format(
+                len(regressions), args.threshold))
+            return 1
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
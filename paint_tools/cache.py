@@ -0,0 +1,352 @@
+from collections import OrderedDict
+
+import numpy as np
+
+from .pixel_io import DirtyRegions, pixel_transfer
+from .tiles import ArrayTileSource
+from .pyramid import MipPyramid
+from .stats import DEFAULT_STATS_MEMORY, ImageStats
+from .profiling import profiler
+from .formats import (
+    DEFAULT_STORAGE_MODE,
+    from_float,
+    get_storage_dtype,
+    to_float,
+)
+
+
+DEFAULT_CACHE_BUDGET = 1024 * 1024 * 1024
+# rows converted at once between Blender's floats and compact storage
+CONVERT_ROWS = 64
+
+
+def get_image_id(image):
+    # Blender hands out a new datablock when undo replaces the image
+    if hasattr(image, 'as_pointer'):
+        return image.as_pointer()
+    return id(image)
+
+
+def is_clean(image):
+    # images without the flag count as changed and are always compared
+    return not getattr(image, 'is_dirty', True)
+
+
+class CachedTileSource(ArrayTileSource):
+
+    def __init__(self, cache, image, entry):
+        super().__init__(entry['pixels'], entry['dirty'])
+        self.cache = cache
+        self.image = image
+        self.entry = entry
+
+    def view(self, x0, y0, x1, y1):
+        self.entry_changed(x0, y0, x1, y1)
+        return super().view(x0, y0, x1, y1)
+
+    def write(self, x0, y0, x1, y1, src):
+        self.entry_changed(x0, y0, x1, y1)
+        super().write(x0, y0, x1, y1, src)
+
+    def entry_changed(self, x0, y0, x1, y1):
+        for d in self.entry['derived'].values():
+            d.invalidate(x0, y0, x1, y1)
+
+    def update(self):
+        # the entry was verified when the source was handed out
+        if not self.cache.lazy_flush:
+            self.cache.flush(self.image, verify=False)
+
+
+class ImageCache():
+
+    def __init__(self, budget=DEFAULT_CACHE_BUDGET, transfer=None):
+        if transfer is None:
+            transfer = pixel_transfer
+        self.budget = budget
+        self.transfer = transfer
+        self.lazy_flush = False
+        self.storage_mode = DEFAULT_STORAGE_MODE
+        # image name -> entry, least recently used first
+        self.__entries = OrderedDict()
+        self.__generations = {}
+        self.__versions = {}
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.flushes = 0
+        # entries found changed outside Paint Tools
+        self.stale = 0
+
+    def get_generation(self, name):
+        return self.__generations.get(name, 0)
+
+    def get_key(self, image):
+        return (image.name, self.get_generation(image.name))
+
+    def touch(self, name):
+        # counts edits so derived data (histograms, previews) can be reused
+        # until the pixels change
+        self.__versions[name] = self.__versions.get(name, 0) + 1
+
+    def get_version(self, name):
+        return (self.get_generation(name), self.__versions.get(name, 0))
+
+    def memory_usage(self):
+        return sum(
+            e['pixels'].nbytes +
+            sum(d.memory_usage() for d in e['derived'].values())
+            for e in self.__entries.values())
+
+    def get_derived(self, image, name, factory):
+        entry = self.get(image)
+        if entry is None:
+            return None
+        derived = entry['derived'].get(name)
+        if derived is None:
+            derived = factory(entry['pixels'])
+            entry['derived'][name] = derived
+        return derived
+
+    def get_pyramid(self, image):
+        return self.get_derived(image, 'pyramid', MipPyramid)
+
+    def get_stats(self, image, memory_limit=DEFAULT_STATS_MEMORY):
+        pyramid = self.get_pyramid(image)
+        if pyramid is None:
+            return None
+        stats = self.get_derived(
+            image, 'stats', lambda p: ImageStats(pyramid, memory_limit))
+        return stats
+
+    def __len__(self):
+        return len(self.__entries)
+
+    def __contains__(self, image):
+        entry = self.__entries.get(image.name)
+        return entry is not None and entry['key'] == self.get_key(image)
+
+    def get(self, image, verify=False):
+        # verify compares a cached entry with the image first, which costs
+        # a read; entries of images changed outside Paint Tools (painting,
+        # reloading) are dropped then
+        name = image.name
+        width, height = image.size[0], image.size[1]
+        dtype = get_storage_dtype(image, self.storage_mode)
+        entry = self.__entries.get(name)
+        if entry is not None:
+            current = (entry['key'] == self.get_key(image) and
+                       entry['pixels'].shape[:2] == (height, width))
+            if current and verify and not self.__matches(entry, image):
+                self.__write_back(entry, image, True)
+                current = False
+            if current and entry['pixels'].dtype == dtype:
+                self.__entries.move_to_end(name)
+                self.hits += 1
+                return entry
+            # a changed storage mode keeps the edits made so far
+            if current:
+                self.__flush_entry(entry, image)
+            self.invalidate(image)
+
+        self.misses += 1
+        nbytes = width * height * 4 * dtype.itemsize
+        if nbytes > self.budget:
+            return None
+        self.__evict(self.budget - nbytes)
+
+        pixels = np.empty((height, width, 4), dtype=dtype)
+        with profiler.phase('read'):
+            self.__read(image, pixels, self.__fits_float(image, nbytes))
+        entry = {
+            'key': self.get_key(image),
+            'image': image,
+            'image_id': get_image_id(image),
+            'pixels': pixels,
+            'dirty': DirtyRegions(width, height),
+            # data computed from the pixels, kept in sync through
+            # invalidate(x0, y0, x1, y1)
+            'derived': {},
+            # the image had no unsaved changes when it last matched the
+            # entry; while it still has none, nothing changed it
+            'clean': is_clean(image),
+        }
+        self.__entries[name] = entry
+
+        return entry
+
+    def __fits_float(self, image, extra=0):
+        # whether a float32 copy of the whole image fits in the budget
+        # next to the entries and extra bytes
+        width, height = image.size[0], image.size[1]
+        return (self.memory_usage() + extra + width * height * 16 <=
+                self.budget)
+
+    def __float_bands(self, image, bulk):
+        # the image as float32 bands of rows: from one bulk read, or read
+        # band by band when a float copy of the whole image does not fit
+        w, h = image.size[0], image.size[1]
+        if bulk:
+            buf = np.empty((h, w, 4), dtype=np.float32)
+            self.transfer.read(image, buf.reshape(-1))
+        else:
+            buf = np.empty((min(h, CONVERT_ROWS), w, 4), dtype=np.float32)
+        for y0 in range(0, h, CONVERT_ROWS):
+            y1 = min(y0 + CONVERT_ROWS, h)
+            if bulk:
+                yield (y0, y1, buf[y0:y1])
+            else:
+                yield (y0, y1, self.transfer.read_rect(
+                    image, 0, y0, w, y1, buf[:y1 - y0]))
+
+    def __read(self, image, pixels, bulk=True):
+        if pixels.dtype == np.float32:
+            self.transfer.read(image, pixels.reshape(-1))
+            return
+        # converted in bands of rows to keep the rounding temporaries small
+        for y0, y1, band in self.__float_bands(image, bulk):
+            from_float(band, pixels[y0:y1])
+
+    def __matches(self, entry, image):
+        # True when the image holds the entry's pixels outside the edits
+        # not flushed yet
+        if entry['clean'] and is_clean(image):
+            return True
+        pixels = entry['pixels']
+        rects = entry['dirty'].rects()
+        scratch = None
+        if pixels.dtype != np.float32:
+            scratch = np.empty((CONVERT_ROWS,) + pixels.shape[1:],
+                               dtype=pixels.dtype)
+        with profiler.phase('read'):
+            for y0, y1, band in self.__float_bands(
+                    image, self.__fits_float(image)):
+                if scratch is not None:
+                    band = from_float(band, scratch[:y1 - y0])
+                for x0, ry0, x1, ry1 in rects:
+                    a = max(y0, ry0)
+                    b = min(y1, ry1)
+                    if a < b:
+                        band[a - y0:b - y0, x0:x1] = pixels[a:b, x0:x1]
+                if not np.array_equal(band, pixels[y0:y1]):
+                    return False
+        entry['clean'] = is_clean(image)
+        return True
+
+    def __write(self, image, pixels, dirty, bulk=True):
+        # bulk lets PixelTransfer rewrite the whole image when most of it
+        # is dirty; without it only the dirty rects are written
+        if pixels.dtype == np.float32 and bulk:
+            return self.transfer.write(image, pixels.reshape(-1), dirty)
+        nbytes = 0
+        for x0, y0, x1, y1 in dirty.rects():
+            for by0 in range(y0, y1, CONVERT_ROWS):
+                by1 = min(by0 + CONVERT_ROWS, y1)
+                buf = to_float(pixels[by0:by1, x0:x1])
+                self.transfer.write_rect(image, x0, by0, x1, by1, buf)
+                nbytes += buf.nbytes
+        self.transfer.update(image)
+        return nbytes
+
+    def get_source(self, image):
+        # operators write back through the source, so it is verified
+        entry = self.get(image, verify=True)
+        if entry is None:
+            return None
+        return CachedTileSource(self, image, entry)
+
+    def __flush_entry(self, entry, image=None, verify=True):
+        if entry['dirty'].is_empty():
+            return 0
+        if image is None:
+            image = entry['image']
+        if tuple(image.size) != entry['pixels'].shape[1::-1]:
+            # resized since the read: the edits no longer fit the image
+            entry['dirty'].clear()
+            return 0
+        return self.__write_back(
+            entry, image, verify and not self.__matches(entry, image))
+
+    def __write_back(self, entry, image, stale):
+        # edits of a changed (stale) image only go to their own rects, so
+        # what was painted around them stays; the entry is dropped after
+        nbytes = 0
+        if not entry['dirty'].is_empty():
+            with profiler.phase('write'):
+                nbytes = self.__write(
+                    image, entry['pixels'], entry['dirty'], not stale)
+            entry['dirty'].clear()
+            entry['clean'] = False
+            self.flushes += 1
+        if stale:
+            self.stale += 1
+            self.invalidate(image)
+        return nbytes
+
+    def flush(self, image=None, verify=True):
+        # verify may be skipped right after a verified get, when nothing
+        # else ran in between
+        if image is not None:
+            entry = self.__entries.get(image.name)
+            if entry is None:
+                return 0
+            return self.__flush_entry(entry, image, verify)
+        return sum(self.__flush_entry(e, verify=verify)
+                   for e in list(self.__entries.values()))
+
+    def is_dirty(self):
+        return any(not e['dirty'].is_empty() for e in self.__entries.values())
+
+    def __evict(self, limit):
+        while self.__entries and self.memory_usage() > limit:
+            name, entry = self.__entries.popitem(last=False)
+            self.__flush_entry(entry)
+            self.evictions += 1
+
+    def invalidate(self, image):
+        # drop the buffer without writing it back; the next access re-reads
+        name = image if isinstance(image, str) else image.name
+        self.__entries.pop(name, None)
+        self.__generations[name] = self.get_generation(name) + 1
+
+    def revalidate(self, images):
+        # images: name -> image lookup (bpy.data.images); entries whose
+        # image is gone, resized or replaced are dropped, the others are
+        # kept with their pending edits
+        for name, entry in list(self.__entries.items()):
+            image = images.get(name)
+            if (image is None or
+                    get_image_id(image) != entry['image_id'] or
+                    tuple(image.size) != entry['pixels'].shape[1::-1]):
+                self.invalidate(name)
+            else:
+                entry['image'] = image
+                entry['clean'] = False
+
+    def expect_changes(self):
+        # saving clears is_dirty and undo restores older pixels, so until
+        # the next check the entries can not trust a clean image
+        for entry in self.__entries.values():
+            entry['clean'] = False
+
+    def clear(self):
+        for name in list(self.__entries.keys()):
+            self.invalidate(name)
+
+    def set_storage_mode(self, mode):
+        # entries in another format are converted on their next access
+        self.storage_mode = mode
+
+    def set_budget(self, budget):
+        self.budget = budget
+        self.__evict(budget)
+
+    def reset_stats(self):
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.flushes = 0
+        self.stale = 0
+
+
+image_cache = ImageCache()
@@ -0,0 +1,230 @@
+import argparse
+import multiprocessing
+import os
+import sys
+import threading
+import time
+
+import numpy as np
+
+from .pipeline import Pipeline
+from .resample import RESAMPLE_FILTERS, DEFAULT_RESAMPLE_FILTER, resampler
+
+try:
+    import imageio.v2 as imageio
+except ImportError:
+    try:
+        import imageio
+    except ImportError:
+        imageio = None
+
+
+IMAGE_EXTENSIONS = ('.png', '.exr', '.tif', '.tiff', '.jpg', '.jpeg', '.bmp')
+DEFAULT_QUEUE_SIZE = 16
+
+
+def parse_step(text):
+    # "op" or "op:key=value,key=value"; values are given like the panel
+    # shows them (0-255 integers, colors as r/g/b floats)
+    name, _, args = text.partition(':')
+    op = name.strip().upper()
+    params = {}
+    for arg in filter(None, args.split(',')):
+        key, _, value = arg.partition('=')
+        params[key.strip()] = value.strip()
+
+    if op == 'FILL':
+        color = params.get('color', '1/1/1').split('/')
+        return (op, {'color': tuple(float(c) for c in color)})
+    if op == 'BINARIZE':
+        return (op, {
+            'threshold': int(params.get('threshold', 128)) / 255.0,
+            'color': params.get('color', 'RED').upper()})
+    if op == 'GRAY_SCALE':
+        return (op, {'color': params.get('color', 'NTSC').upper()})
+    if op == 'BRIGHTNESS':
+        return (op, {'value': int(params.get('value', 0)) / 255.0})
+    if op in ('ERASE', 'INVERT'):
+        return (op, {})
+    raise ValueError("Unknown operation: {}".format(name))
+
+
+def find_images(paths):
+    for path in paths:
+        if os.path.isdir(path):
+            for root, dirs, files in os.walk(path):
+                dirs.sort()
+                for f in sorted(files):
+                    if f.lower().endswith(IMAGE_EXTENSIONS):
+                        yield (os.path.join(root, f),
+                               os.path.relpath(os.path.join(root, f), path))
+        else:
+            yield (path, os.path.basename(path))
+
+
+def to_rgba(data):
+    dtype = data.dtype
+    if data.ndim == 2:
+        data = data[..., np.newaxis]
+    h, w, c = data.shape
+    pixels = np.empty((h, w, 4), dtype=np.float32)
+    if np.issubdtype(dtype, np.integer):
+        scale = 1.0 / np.iinfo(dtype).max
+    else:
+        scale = 1.0
+    # images are stored top row first, Blender counts rows from the bottom
+    src = data[::-1]
+    if c >= 3:
+        np.multiply(src[..., :3], scale, out=pixels[..., :3], casting='unsafe')
+    else:
+        np.multiply(
+            src[..., :1], scale, out=pixels[..., :3], casting='unsafe')
+    if c in (2, 4):
+        np.multiply(src[..., -1], scale, out=pixels[..., 3], casting='unsafe')
+    else:
+        pixels[..., 3] = 1.0
+
+    return pixels
+
+
+def from_rgba(pixels, dtype, channels):
+    src = pixels[::-1]
+    if channels >= 3:
+        src = src[..., :channels]
+    elif channels == 2:
+        src = src[..., [0, 3]]
+    else:
+        src = src[..., 0]
+    if np.issubdtype(dtype, np.integer):
+        vmax = np.iinfo(dtype).max
+        out = np.clip(src, 0.0, 1.0) * vmax + 0.5
+        return out.astype(dtype)
+    return src.astype(dtype)
+
+
+def process_file(job):
+    src, dst, steps, rect, resize = job
+    data = imageio.imread(src)
+    channels = 1 if data.ndim == 2 else data.shape[2]
+    pixels = to_rgba(np.asarray(data))
+
+    h, w = pixels.shape[:2]
+    if rect is None:
+        r = {'x0': 0, 'y0': 0, 'x1': w, 'y1': h}
+    else:
+        r = {'x0': rect[0], 'y0': rect[1], 'x1': rect[2], 'y1': rect[3]}
+    Pipeline(steps).apply(pixels, r)
+    if resize is not None:
+        # weight tables stay cached in the worker process across files
+        pixels = resampler.resize(pixels, resize[0], resize[1], resize[2])
+
+    out = from_rgba(pixels, data.dtype, channels)
+    d = os.path.dirname(dst)
+    if d and not os.path.isdir(d):
+        os.makedirs(d, exist_ok=True)
+    imageio.imwrite(dst, out)
+
+    return (src, os.path.getsize(src), os.path.getsize(dst), w * h)
+
+
+def run(files, output, steps, rect=None, workers=0, queue_size=None,
+        resize=None, out=sys.stdout):
+    if imageio is None:
+        raise RuntimeError("imageio is required for batch processing")
+    if workers <= 0:
+        workers = os.cpu_count() or 1
+    if queue_size is None:
+        queue_size = max(DEFAULT_QUEUE_SIZE, workers * 2)
+
+    stats = {'images': 0, 'bytes_in': 0, 'bytes_out': 0, 'pixels': 0,
+             'errors': 0}
+    # bounds the number of files submitted but not finished yet
+    slots = threading.BoundedSemaphore(queue_size)
+
+    def done(result):
+        stats['images'] += 1
+        stats['bytes_in'] += result[1]
+        stats['bytes_out'] += result[2]
+        stats['pixels'] += result[3]
+        slots.release()
+
+    def failed(e):
+        stats['errors'] += 1
+        out.write("error: {}\n".format(e))
+        slots.release()
+
+    start = time.perf_counter()
+    pool = multiprocessing.Pool(workers)
+    try:
+        for src, rel in files:
+            slots.acquire()
+            job = (src, os.path.join(output, rel), steps, rect, resize)
+            pool.apply_async(
+                process_file, (job,), callback=done, error_callback=failed)
+        pool.close()
+        pool.join()
+    finally:
+        pool.terminate()
+    elapsed = max(time.perf_counter() - start, 1.0e-9)
+
+    mb = (stats['bytes_in'] + stats['bytes_out']) / (1024.0 * 1024.0)
+    out.write(
+        "{} images ({} errors) in {:.2f}s: {:.1f} images/s, {:.1f} MB/s, "
+        "{:.1f} Mpix/s\n".format(
+            stats['images'], stats['errors'], elapsed,
+            stats['images'] / elapsed, mb / elapsed,
+            stats['pixels'] / elapsed / 1.0e6))
+    stats['seconds'] = elapsed
+
+    return stats
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Apply Paint Tools operations to image files")
+    parser.add_argument(
+        "inputs", nargs="+", help="image files or directories")
+    parser.add_argument(
+        "-o", "--output", required=True, help="output directory")
+    parser.add_argument(
+        "--op", dest="ops", action="append", default=[],
+        metavar="OP[:KEY=VALUE,...]",
+        help="operation to apply, in order (fill, erase, binarize, "
+             "gray_scale, brightness, invert)")
+    parser.add_argument(
+        "--rect", type=int, nargs=4, metavar=("X0", "Y0", "X1", "Y1"),
+        help="pixel rectangle, bottom-left origin (default: whole image)")
+    parser.add_argument(
+        "--resize", type=int, nargs=2, metavar=("WIDTH", "HEIGHT"),
+        help="resize the result to this size")
+    parser.add_argument(
+        "--filter", choices=[f.lower() for f in RESAMPLE_FILTERS],
+        default=DEFAULT_RESAMPLE_FILTER.lower(),
+        help="resampling filter used by --resize")
+    parser.add_argument(
+        "-j", "--workers", type=int, default=0,
+        help="worker processes (default: one per CPU)")
+    parser.add_argument(
+        "--queue-size", type=int, default=None,
+        help="maximum number of files in flight")
+    args = parser.parse_args(argv)
+    if not args.ops and args.resize is None:
+        parser.error("nothing to do, give --op or --resize")
+    resize = None
+    if args.resize is not None:
+        resize = (args.resize[0], args.resize[1], args.filter.upper())
+
+    steps = []
+    for text in args.ops:
+        op, params = parse_step(text)
+        steps.append({'op': op, 'params': params})
+
+    stats = run(
+        find_images(args.inputs), args.output, steps, args.rect,
+        args.workers, args.queue_size, resize)
+
+    return 1 if stats['errors'] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
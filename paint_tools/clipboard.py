@@ -0,0 +1,160 @@
+import zlib
+from collections import OrderedDict
+
+import numpy as np
+
+try:
+    import lz4.frame as lz4_frame
+except ImportError:
+    lz4_frame = None
+
+
+DEFAULT_CLIPBOARD_BUDGET = 256 * 1024 * 1024
+DEFAULT_SLOT = "Default"
+
+FORMAT_DTYPES = {
+    'FLOAT32': np.float32,
+    'HALF': np.float16,
+    'UINT8': np.uint8,
+}
+# AUTO stores 8-bit images as UINT8, which holds them exactly, and float
+# images as FLOAT32
+DEFAULT_CLIPBOARD_FORMAT = 'AUTO'
+
+
+def get_format(fmt, image):
+    if fmt != 'AUTO':
+        return fmt
+    return 'FLOAT32' if getattr(image, 'is_float', True) else 'UINT8'
+
+
+def get_compressions():
+    compressions = ['NONE', 'ZLIB']
+    if lz4_frame is not None:
+        compressions.append('LZ4')
+    return compressions
+
+
+def compress(data, compression):
+    if compression == 'ZLIB':
+        return zlib.compress(data, 1)
+    if compression == 'LZ4':
+        return lz4_frame.compress(data)
+    return data
+
+
+def decompress(data, compression):
+    if compression == 'ZLIB':
+        return zlib.decompress(data)
+    if compression == 'LZ4':
+        return lz4_frame.decompress(data)
+    return data
+
+
+def encode(pixels, fmt):
+    if fmt == 'UINT8':
+        q = np.clip(pixels, 0.0, 1.0) * 255.0
+        q += 0.5
+        return q.astype(np.uint8)
+    return np.ascontiguousarray(pixels, dtype=FORMAT_DTYPES[fmt])
+
+
+def decode_into(src, fmt, out):
+    if fmt == 'UINT8':
+        np.multiply(src, 1.0 / 255.0, out=out, casting='unsafe')
+    else:
+        np.copyto(out, src, casting='unsafe')
+    return out
+
+
+class Clipboard():
+
+    def __init__(self, budget=DEFAULT_CLIPBOARD_BUDGET):
+        self.budget = budget
+        # slot name -> entry, least recently used first
+        self.__slots = OrderedDict()
+
+    def names(self):
+        return list(self.__slots.keys())
+
+    def entries(self):
+        return list(self.__slots.items())
+
+    def __contains__(self, name):
+        return name in self.__slots
+
+    def __len__(self):
+        return len(self.__slots)
+
+    def memory_usage(self):
+        return sum(len(e['data']) for e in self.__slots.values())
+
+    def get(self, name):
+        entry = self.__slots.get(name)
+        if entry is not None:
+            self.__slots.move_to_end(name)
+        return entry
+
+    def store(self, name, pixels, fmt='FLOAT32', compression='ZLIB'):
+        if compression not in get_compressions():
+            raise ValueError(
+                "Unsupported compression: {}".format(compression))
+        h, w = pixels.shape[:2]
+        data = compress(encode(pixels, fmt).tobytes(), compression)
+        if len(data) > self.budget:
+            raise ValueError(
+                "Region needs {} bytes, clipboard budget is {} bytes".format(
+                    len(data), self.budget))
+
+        self.__slots.pop(name, None)
+        self.__evict(self.budget - len(data))
+        entry = {
+            'data': data,
+            'format': fmt,
+            'compression': compression,
+            'width': w,
+            'height': h,
+            'raw_size': w * h * 4 * 4,
+        }
+        self.__slots[name] = entry
+
+        return entry
+
+    def __evict(self, limit):
+        while self.__slots and self.memory_usage() > limit:
+            self.__slots.popitem(last=False)
+
+    def __decoded(self, entry):
+        raw = decompress(entry['data'], entry['compression'])
+        # no copy: the decompressed bytes are viewed in place
+        return np.frombuffer(raw, dtype=FORMAT_DTYPES[entry['format']]) \
+            .reshape((entry['height'], entry['width'], 4))
+
+    def load(self, name):
+        entry = self.get(name)
+        if entry is None:
+            return None
+        out = np.empty((entry['height'], entry['width'], 4), dtype=np.float32)
+        return decode_into(self.__decoded(entry), entry['format'], out)
+
+    def paste_into(self, name, out, x=0, y=0):
+        # decode the part of the slot starting at (x, y) straight into out
+        entry = self.get(name)
+        if entry is None:
+            return None
+        h, w = out.shape[:2]
+        src = self.__decoded(entry)[y:y + h, x:x + w]
+        return decode_into(src, entry['format'], out)
+
+    def remove(self, name):
+        self.__slots.pop(name, None)
+
+    def clear(self):
+        self.__slots.clear()
+
+    def set_budget(self, budget):
+        self.budget = budget
+        self.__evict(budget)
+
+
+clipboard = Clipboard()
@@ -0,0 +1,107 @@
+import numpy as np
+
+
+BLEND_MODES = ('REPLACE', 'OVER', 'MULTIPLY', 'SCREEN', 'ADD', 'PREMULTIPLIED')
+# existing operators (Paste, Fill, the shapes) overwrite unless a mode is
+# chosen
+DEFAULT_BLEND_MODE = 'REPLACE'
+
+
+def clip_paste(width, height, x, y, w, h):
+    # part of a (w, h) block placed at (x, y) that lies inside the image,
+    # as the image box and the offset into the block
+    x0 = max(0, x)
+    y0 = max(0, y)
+    x1 = min(width, x + w)
+    y1 = min(height, y + h)
+    if x0 >= x1 or y0 >= y1:
+        return None
+    return ((x0, y0, x1, y1), (x0 - x, y0 - y))
+
+
+def composite(dst, src, mode=DEFAULT_BLEND_MODE, opacity=1.0):
+    # blends src (straight alpha, or premultiplied for PREMULTIPLIED) into
+    # dst in place; src may be a single (4,) color. All arithmetic runs on
+    # full RGBA scratch arrays with out=, the alpha channel of the color
+    # math is discarded and written last
+    src = np.asarray(src, dtype=np.float32)
+    if mode == 'OVER' and opacity >= 1.0 and np.all(src[..., 3] >= 1.0):
+        # an opaque source covers dst completely
+        mode = 'REPLACE'
+    if mode == 'REPLACE':
+        if opacity >= 1.0:
+            dst[...] = src
+        else:
+            scratch = np.subtract(src, dst, dtype=np.float32)
+            scratch *= opacity
+            dst += scratch
+        return dst
+
+    shape = dst.shape
+    sa = np.empty(shape, dtype=np.float32)
+    np.multiply(np.broadcast_to(src[..., 3:4], shape), opacity, out=sa)
+    da = np.repeat(dst[..., 3:4], 4, axis=-1)
+    # t = (1 - sa) * da, the part of dst that shows through
+    t = np.subtract(1.0, sa)
+    t *= da
+    co = np.empty(shape, dtype=np.float32)
+
+    if mode == 'PREMULTIPLIED':
+        np.multiply(src, opacity, out=co)
+        dst *= t
+        co += dst
+    elif mode == 'OVER':
+        np.multiply(src, sa, out=co)
+        dst *= t
+        co += dst
+    elif mode == 'ADD':
+        # sa * cs + da * cd
+        np.multiply(src, sa, out=co)
+        dst *= da
+        co += dst
+    elif mode == 'MULTIPLY':
+        # sa * cs * (da * cd - da + 1) + t * cd
+        np.multiply(dst, da, out=co)
+        co -= da
+        co += 1.0
+        co *= src
+        co *= sa
+        dst *= t
+        co += dst
+    elif mode == 'SCREEN':
+        # sa * cs + cd * (sa * da * (1 - cs) + t)
+        np.subtract(1.0, src, out=co)
+        co *= sa
+        co *= da
+        co += t
+        dst *= co
+        np.multiply(src, sa, out=co)
+        co += dst
+    else:
+        raise ValueError("Unknown blend mode: {}".format(mode))
+
+    # straight alpha again: divide by the result alpha where it is not 0
+    sa += t
+    dst[...] = 0.0
+    np.divide(co, sa, out=dst, where=sa > 0.0)
+    dst[..., 3] = sa[..., 3]
+    return dst
+
+
+def composite_at(pixels, x, y, src, mode=DEFAULT_BLEND_MODE, opacity=1.0):
+    # src placed with its bottom-left corner at (x, y), clipped exactly to
+    # the image; returns the touched box or None
+    h, w = src.shape[:2]
+    clipped = clip_paste(pixels.shape[1], pixels.shape[0], x, y, w, h)
+    if clipped is None:
+        return None
+    (x0, y0, x1, y1), (ox, oy) = clipped
+    composite(
+        pixels[y0:y1, x0:x1], src[oy:oy + y1 - y0, ox:ox + x1 - x0],
+        mode, opacity)
+    return (x0, y0, x1, y1)
+
+
+def kernel_fill_blend(src, color, mode=DEFAULT_BLEND_MODE, opacity=1.0):
+    c = [color[0], color[1], color[2], color[3] if len(color) > 3 else 1.0]
+    return composite(src, c, mode, opacity)
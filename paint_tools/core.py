@@ -0,0 +1,210 @@
+import numpy as np
+
+from .formats import UINT8_MAX, native, to_float, to_uint8
+
+
+GRAY_SCALE_WEIGHTS = {
+    'NTSC': (0.298912, 0.586611, 0.114478),
+    'AVERAGE': (1.0 / 3.0, 1.0 / 3.0, 1.0 / 3.0),
+}
+
+COLOR_CHANNELS = ['RED', 'GREEN', 'BLUE']
+# fixed point gray scale weights of uint8 pixels
+GRAY_SCALE_SHIFT = 22
+
+
+def get_out_pixels(src, out):
+    if out is None:
+        return src
+    if out is not src:
+        out[..., 3] = src[..., 3]
+    return out
+
+
+def clamp_rgb(pixels):
+    np.clip(pixels[..., :3], 0.0, 1.0, out=pixels[..., :3])
+    return pixels
+
+
+def is_uint8(pixels):
+    return pixels.dtype == np.uint8
+
+
+# kernels decorated with native also work in place on uint8 and float16
+# storage; uint8 results are exact and saturate like the float ones after
+# rounding
+
+@native
+def kernel_fill(src, color, out=None):
+    out = get_out_pixels(src, out)
+    if is_uint8(out):
+        out[...] = [to_uint8(c) for c in color[:3]] + [UINT8_MAX]
+        return out
+    out[...] = [color[0], color[1], color[2], 1.0]
+    return out
+
+
+@native
+def kernel_erase(src, out=None):
+    out = get_out_pixels(src, out)
+    out[...] = 0.0
+    return out
+
+
+@native
+def kernel_binarize(src, threshold, color, out=None):
+    out = get_out_pixels(src, out)
+    c = src[..., COLOR_CHANNELS.index(color)]
+    if is_uint8(src):
+        # integer cuts taken from the float comparison of every level, so
+        # both storages binarize the same pixels
+        levels = to_float(np.arange(UINT8_MAX + 1, dtype=np.uint8))
+        black = int(np.count_nonzero(levels < threshold))
+        white = UINT8_MAX + 1 - int(np.count_nonzero(levels > threshold))
+        fill_black = c < black
+        fill_white = c >= white
+    else:
+        fill_black = c < threshold
+        fill_white = c > threshold
+    if out is not src:
+        out[..., :3] = src[..., :3]
+    out[fill_black, :3] = 0
+    out[fill_white, :3] = UINT8_MAX if is_uint8(out) else 1.0
+    return out
+
+
+def gray_scale_uint8(src, weights):
+    w = [int(round(x * (1 << GRAY_SCALE_SHIFT))) for x in weights]
+    acc = src[..., 0].astype(np.uint32)
+    acc *= w[0]
+    for i in (1, 2):
+        acc += src[..., i].astype(np.uint32) * np.uint32(w[i])
+    acc += 1 << (GRAY_SCALE_SHIFT - 1)
+    acc >>= GRAY_SCALE_SHIFT
+    np.minimum(acc, UINT8_MAX, out=acc)
+    return acc.astype(np.uint8)
+
+
+@native
+def kernel_gray_scale(src, color, out=None):
+    out = get_out_pixels(src, out)
+    if color in COLOR_CHANNELS:
+        c = src[..., COLOR_CHANNELS.index(color)].copy()
+    elif is_uint8(src):
+        c = gray_scale_uint8(src, GRAY_SCALE_WEIGHTS[color])
+    else:
+        r, g, b = GRAY_SCALE_WEIGHTS[color]
+        c = src[..., 0] * r
+        c += src[..., 1] * g
+        c += src[..., 2] * b
+    out[..., :3] = c[..., np.newaxis]
+    return out if is_uint8(out) else clamp_rgb(out)
+
+
+@native
+def kernel_brightness(src, brightness, out=None):
+    out = get_out_pixels(src, out)
+    if is_uint8(src):
+        # clamping before the add keeps the sum inside 0..255
+        value = int(round(brightness * UINT8_MAX))
+        rgb = out[..., :3]
+        if value >= 0:
+            np.minimum(src[..., :3], UINT8_MAX - value, out=rgb)
+            rgb += np.uint8(value)
+        else:
+            np.maximum(src[..., :3], -value, out=rgb)
+            rgb -= np.uint8(-value)
+        return out
+    np.add(src[..., :3], brightness, out=out[..., :3])
+    return clamp_rgb(out)
+
+
+@native
+def kernel_invert(src, out=None):
+    out = get_out_pixels(src, out)
+    if is_uint8(src):
+        np.subtract(UINT8_MAX, src[..., :3], out=out[..., :3])
+        return out
+    np.subtract(1.0, src[..., :3], out=out[..., :3])
+    return clamp_rgb(out)
+
+
+def new_pixels(width, height):
+    return np.zeros((height, width, 4), dtype=np.float32)
+
+
+def clip_rect(pixels, rect):
+    h, w = pixels.shape[:2]
+    x0 = min(max(0, rect['x0']), w)
+    y0 = min(max(0, rect['y0']), h)
+    x1 = min(max(0, rect['x1']), w)
+    y1 = min(max(0, rect['y1']), h)
+
+    return (x0, y0, max(x0, x1), max(y0, y1))
+
+
+# Every operation below works on a (height, width, 4) RGBA float array in
+# place and returns the (x0, y0, x1, y1) box it modified.
+
+def fill(pixels, rect, color):
+    x0, y0, x1, y1 = clip_rect(pixels, rect)
+    kernel_fill(pixels[y0:y1, x0:x1], color)
+    return (x0, y0, x1, y1)
+
+
+def copy(pixels, rect):
+    x0, y0, x1, y1 = clip_rect(pixels, rect)
+
+    info = {}
+    info['pixels'] = pixels[y0:y1, x0:x1].copy()
+    info['width'] = x1 - x0
+    info['height'] = y1 - y0
+
+    return info
+
+
+def cut(pixels, rect):
+    info = copy(pixels, rect)
+    erase(pixels, rect)
+    return info
+
+
+def paste(pixels, p, copied):
+    x = int(p[0])
+    y = int(p[1]) - copied['height']
+    x0, y0, x1, y1 = clip_rect(
+        pixels, {'x0': x, 'y0': y, 'x1': x + copied['width'],
+                 'y1': y + copied['height']})
+
+    pixels[y0:y1, x0:x1] = copied['pixels'][y0 - y:y1 - y, x0 - x:x1 - x]
+    return (x0, y0, x1, y1)
+
+
+def erase(pixels, rect):
+    x0, y0, x1, y1 = clip_rect(pixels, rect)
+    kernel_erase(pixels[y0:y1, x0:x1])
+    return (x0, y0, x1, y1)
+
+
+def binarize(pixels, rect, threshold, color):
+    x0, y0, x1, y1 = clip_rect(pixels, rect)
+    kernel_binarize(pixels[y0:y1, x0:x1], threshold, color)
+    return (x0, y0, x1, y1)
+
+
+def gray_scale(pixels, rect, color):
+    x0, y0, x1, y1 = clip_rect(pixels, rect)
+    kernel_gray_scale(pixels[y0:y1, x0:x1], color)
+    return (x0, y0, x1, y1)
+
+
+def brightness(pixels, rect, value):
+    x0, y0, x1, y1 = clip_rect(pixels, rect)
+    kernel_brightness(pixels[y0:y1, x0:x1], value)
+    return (x0, y0, x1, y1)
+
+
+def invert(pixels, rect):
+    x0, y0, x1, y1 = clip_rect(pixels, rect)
+    kernel_invert(pixels[y0:y1, x0:x1])
+    return (x0, y0, x1, y1)
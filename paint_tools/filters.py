@@ -0,0 +1,150 @@
+import numpy as np
+
+
+FILTERS = ('GAUSSIAN', 'BOX', 'SHARPEN', 'SOBEL')
+DEFAULT_FILTER_RADIUS = 3
+DEFAULT_SHARPEN_AMOUNT = 1.0
+# kernels longer than this are convolved through an FFT
+FFT_MIN_TAPS = 15
+
+
+def get_fft_size(n):
+    # smallest 2^a * 3^b * 5^c >= n, fast for numpy's pocketfft
+    best = 1 << max(0, (n - 1).bit_length())
+    p5 = 1
+    while p5 < best:
+        p35 = p5
+        while p35 < best:
+            m = p35
+            while m < n:
+                m *= 2
+            best = min(best, m)
+            p35 *= 3
+        p5 *= 5
+    return best
+
+
+def correlate_axis(a, weights, axis, use_fft=None):
+    # valid correlation along axis: the result is len(weights) - 1 shorter
+    taps = len(weights)
+    n = a.shape[axis]
+    m = n - taps + 1
+    if use_fft is None:
+        use_fft = taps > FFT_MIN_TAPS
+    if use_fft:
+        size = get_fft_size(n + taps - 1)
+        shape = [1] * a.ndim
+        shape[axis] = -1
+        fk = np.fft.rfft(weights[::-1], size).reshape(shape)
+        full = np.fft.irfft(np.fft.rfft(a, size, axis=axis) * fk, size, axis=axis)
+        index = [slice(None)] * a.ndim
+        index[axis] = slice(taps - 1, n)
+        return full[tuple(index)].astype(np.float32)
+
+    out = None
+    for k, w in enumerate(weights):
+        if w == 0.0:
+            continue
+        index = [slice(None)] * a.ndim
+        index[axis] = slice(k, k + m)
+        part = a[tuple(index)]
+        if out is None:
+            out = part * np.float32(w)
+        else:
+            out += part * np.float32(w)
+    return out
+
+
+def gaussian_weights(radius):
+    # the kernel is cut at 3 sigma, which is the radius
+    sigma = max(radius, 1) / 3.0
+    x = np.arange(-radius, radius + 1, dtype=np.float64)
+    w = np.exp(-x * x / (2.0 * sigma * sigma))
+    return w / w.sum()
+
+
+def gaussian(block, radius, use_fft=None):
+    w = gaussian_weights(radius)
+    rgb = block[..., :3]
+    return correlate_axis(
+        correlate_axis(rgb, w, 0, use_fft), w, 1, use_fft)
+
+
+def box(block, radius):
+    # running sum: constant cost per pixel whatever the radius
+    taps = 2 * radius + 1
+    out = block[..., :3].astype(np.float64)
+    for axis in (0, 1):
+        c = np.cumsum(out, axis=axis)
+        n = c.shape[axis]
+        head = [slice(None)] * 3
+        head[axis] = slice(taps - 1, taps)
+        hi = [slice(None)] * 3
+        hi[axis] = slice(taps, n)
+        lo = [slice(None)] * 3
+        lo[axis] = slice(0, n - taps)
+        out = np.concatenate(
+            [c[tuple(head)], c[tuple(hi)] - c[tuple(lo)]], axis=axis)
+    out /= taps * taps
+    return out.astype(np.float32)
+
+
+def sharpen(block, radius, amount):
+    # unsharp mask
+    blurred = gaussian(block, radius)
+    center = block[radius:-radius, radius:-radius, :3]
+    out = center - blurred
+    out *= amount
+    out += center
+    return np.clip(out, 0.0, 1.0, out=out)
+
+
+def sobel(block):
+    rgb = block[..., :3]
+    smooth = np.array([1.0, 2.0, 1.0])
+    diff = np.array([-1.0, 0.0, 1.0])
+    gx = correlate_axis(correlate_axis(rgb, smooth, 0), diff, 1)
+    gy = correlate_axis(correlate_axis(rgb, diff, 0), smooth, 1)
+    # a unit step along one axis gives 1
+    out = np.hypot(gx, gy)
+    out *= 0.25
+    return np.clip(out, 0.0, 1.0, out=out)
+
+
+def get_filter(name, radius=DEFAULT_FILTER_RADIUS,
+               amount=DEFAULT_SHARPEN_AMOUNT):
+    # returns (filter, halo): the filter maps a block padded by halo on
+    # every side to the RGB of its interior
+    radius = max(1, int(radius))
+    if name == 'GAUSSIAN':
+        return (lambda b: gaussian(b, radius), radius)
+    elif name == 'BOX':
+        return (lambda b: box(b, radius), radius)
+    elif name == 'SHARPEN':
+        return (lambda b: sharpen(b, radius, amount), radius)
+    elif name == 'SOBEL':
+        return (sobel, 1)
+    raise ValueError("Unknown filter: {}".format(name))
+
+
+def pad_edges(block, top, bottom, left, right):
+    if top == bottom == left == right == 0:
+        return block
+    return np.pad(block, ((top, bottom), (left, right), (0, 0)), mode='edge')
+
+
+def apply(pixels, rect, name, **params):
+    # whole-array reference, used by the benchmarks and the batch tool
+    h, w = pixels.shape[:2]
+    x0, y0 = max(0, rect['x0']), max(0, rect['y0'])
+    x1, y1 = min(w, rect['x1']), min(h, rect['y1'])
+    if x0 >= x1 or y0 >= y1:
+        return (x0, y0, x0, y0)
+    fn, halo = get_filter(name, **params)
+    hx0, hy0 = max(0, x0 - halo), max(0, y0 - halo)
+    hx1, hy1 = min(w, x1 + halo), min(h, y1 + halo)
+    block = pad_edges(
+        pixels[hy0:hy1, hx0:hx1], halo - (y0 - hy0), halo - (hy1 - y1),
+        halo - (x0 - hx0), halo - (hx1 - x1))
+    pixels[y0:y1, x0:x1, :3] = fn(block)
+    return (x0, y0, x1, y1)
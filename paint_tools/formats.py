@@ -0,0 +1,65 @@
+import numpy as np
+
+
+# How the image cache stores pixels. Blender hands out floats, so pixels
+# are converted when a cache entry is read or flushed:
+#   FLOAT32  every image as float32 (16 bytes per pixel)
+#   AUTO     8-bit images as uint8 (4 bytes per pixel), float images as
+#            float32
+#   COMPACT  8-bit images as uint8, float images as float16 (8 bytes per
+#            pixel)
+STORAGE_MODES = ('FLOAT32', 'AUTO', 'COMPACT')
+DEFAULT_STORAGE_MODE = 'FLOAT32'
+UINT8_MAX = 255
+
+
+def get_storage_dtype(image, mode=DEFAULT_STORAGE_MODE):
+    if mode == 'FLOAT32':
+        return np.dtype(np.float32)
+    if not getattr(image, 'is_float', True):
+        return np.dtype(np.uint8)
+    if mode == 'COMPACT':
+        return np.dtype(np.float16)
+    return np.dtype(np.float32)
+
+
+def get_scale(dtype):
+    # stored value of 1.0
+    return UINT8_MAX if np.dtype(dtype) == np.uint8 else 1
+
+
+def to_float(src, out=None):
+    if out is None:
+        out = np.empty(src.shape, dtype=np.float32)
+    if src.dtype == np.uint8:
+        np.multiply(src, np.float32(1.0 / UINT8_MAX), out=out)
+    else:
+        out[...] = src
+    return out
+
+
+def from_float(src, out):
+    # uint8 rounds to the nearest value and saturates
+    if out.dtype == np.uint8:
+        tmp = np.multiply(src, np.float32(UINT8_MAX))
+        tmp += 0.5
+        np.clip(tmp, 0, UINT8_MAX, out=tmp)
+        out[...] = tmp
+    else:
+        out[...] = src
+    return out
+
+
+def to_uint8(value):
+    return int(min(max(np.floor(value * UINT8_MAX + 0.5), 0), UINT8_MAX))
+
+
+def native(kernel):
+    # marks a kernel that works in place on every storage dtype; the tile
+    # engine hands other kernels float32 copies of the tiles
+    kernel.native = True
+    return kernel
+
+
+def is_native(kernel):
+    return getattr(kernel, 'native', False)
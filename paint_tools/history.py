@@ -0,0 +1,184 @@
+import zlib
+
+import numpy as np
+
+from .tiles import clip_rect, iter_tiles
+
+
+DEFAULT_HISTORY_LIMIT = 256 * 1024 * 1024
+DEFAULT_HISTORY_TILE_SIZE = 64
+
+
+class UndoHistory():
+
+    def __init__(self, memory_limit=DEFAULT_HISTORY_LIMIT,
+                 tile_size=DEFAULT_HISTORY_TILE_SIZE):
+        self.memory_limit = memory_limit
+        self.tile_size = tile_size
+        self.__undo = []
+        self.__redo = []
+
+    def get_tiles(self, x0, y0, x1, y1):
+        # tiles are aligned to a fixed grid so steps on the same area line up
+        t = self.tile_size
+        gx0 = x0 - x0 % t
+        gy0 = y0 - y0 % t
+        for tx0, ty0, tx1, ty1 in iter_tiles(gx0, gy0, x1, y1, t, t):
+            yield (max(tx0, x0), max(ty0, y0), tx1, ty1)
+
+    def __read_tiles(self, source, tiles):
+        # yields (tile, bytes); the tiles of one grid row are read as one
+        # rect, so an uncached image is sliced once per image row rather
+        # than once per row of every tile
+        for (y0, y1), row in self.__group_rows(tiles):
+            bx0 = row[0][0]
+            buf = np.empty((y1 - y0, row[-1][2] - bx0, 4), dtype=np.float32)
+            source.read(bx0, y0, row[-1][2], y1, buf)
+            for tile in row:
+                yield tile, buf[:, tile[0] - bx0:tile[2] - bx0].tobytes()
+
+    def __write_tiles(self, source, tiles):
+        # tiles: (x0, y0, x1, y1, float32 array) written a grid row at once
+        for (y0, y1), row in self.__group_rows(tiles):
+            bx0 = row[0][0]
+            buf = np.empty((y1 - y0, row[-1][2] - bx0, 4), dtype=np.float32)
+            for x0, _, x1, _, pixels in row:
+                buf[:, x0 - bx0:x1 - bx0] = pixels
+            source.write(bx0, y0, row[-1][2], y1, buf)
+
+    def __group_rows(self, tiles):
+        # ((y0, y1), tiles) of runs of tiles side by side on the same rows
+        rows = []
+        for tile in sorted(tiles, key=lambda t: (t[1], t[0])):
+            if rows and rows[-1][0] == (tile[1], tile[3]) and \
+                    rows[-1][1][-1][2] == tile[0]:
+                rows[-1][1].append(tile)
+            else:
+                rows.append(((tile[1], tile[3]), [tile]))
+        return rows
+
+    def __snapshot(self, name, image_name, source, tiles):
+        # the size tells a resized or replaced image of the same name apart;
+        # 'after' holds checksums of the tiles once the edit is done
+        step = {'name': name, 'image': image_name, 'tiles': [], 'nbytes': 0,
+                'width': source.width, 'height': source.height,
+                'after': None}
+        for (x0, y0, x1, y1), raw in self.__read_tiles(source, tiles):
+            data = zlib.compress(raw, 1)
+            step['tiles'].append((x0, y0, x1, y1, data))
+            step['nbytes'] += len(data)
+        return step
+
+    def record(self, name, image_name, source, rect):
+        x0, y0, x1, y1 = clip_rect(source.width, source.height, rect)
+        if x0 >= x1 or y0 >= y1:
+            return None
+        step = self.__snapshot(
+            name, image_name, source, self.get_tiles(x0, y0, x1, y1))
+        self.__undo.append(step)
+        self.__redo = [s for s in self.__redo if s['image'] != image_name]
+        self.__trim()
+        return step
+
+    def seal(self, image_name, source):
+        # called once the recorded edit is written; undo compares these
+        # checksums with the image to notice changes made outside the
+        # history (painting, reloading)
+        step = self.peek_undo(image_name)
+        if step is None or step['after'] is not None:
+            return
+        tiles = [t[:4] for t in step['tiles']]
+        step['after'] = [zlib.crc32(raw)
+                         for _, raw in self.__read_tiles(source, tiles)]
+
+    def __restore(self, step, source):
+        # the current contents become the opposite step, then the saved
+        # tiles are written back; None when the contents are not what the
+        # step left behind
+        tiles = [t[:4] for t in step['tiles']]
+        opposite = self.__snapshot(step['name'], step['image'], source, tiles)
+        if step['after'] is not None and step['after'] != [
+                zlib.crc32(zlib.decompress(t[4])) for t in opposite['tiles']]:
+            return None
+        saved = [zlib.decompress(t[4]) for t in step['tiles']]
+        opposite['after'] = [zlib.crc32(raw) for raw in saved]
+        self.__write_tiles(source, [
+            (x0, y0, x1, y1, np.frombuffer(raw, dtype=np.float32).reshape(
+                (y1 - y0, x1 - x0, 4)))
+            for (x0, y0, x1, y1), raw in zip(tiles, saved)])
+        source.update()
+        return opposite
+
+    def __last(self, steps, image_name):
+        for i in range(len(steps) - 1, -1, -1):
+            if image_name is None or steps[i]['image'] == image_name:
+                return i
+        return None
+
+    def peek_undo(self, image_name=None):
+        i = self.__last(self.__undo, image_name)
+        return None if i is None else self.__undo[i]
+
+    def peek_redo(self, image_name=None):
+        i = self.__last(self.__redo, image_name)
+        return None if i is None else self.__redo[i]
+
+    def matches(self, step, source):
+        return (step['width'], step['height']) == (source.width, source.height)
+
+    def __step(self, steps, opposite, image_name, source):
+        # None when the image no longer has the recorded size or was
+        # changed outside the history; its steps are forgotten then
+        i = self.__last(steps, image_name)
+        if i is None:
+            return None
+        step = steps[i]
+        restored = None
+        if self.matches(step, source):
+            restored = self.__restore(step, source)
+        if restored is None:
+            self.forget(step['image'])
+            return None
+        del steps[i]
+        opposite.append(restored)
+        self.__trim()
+        return step
+
+    def undo(self, source, image_name=None):
+        return self.__step(self.__undo, self.__redo, image_name, source)
+
+    def redo(self, source, image_name=None):
+        return self.__step(self.__redo, self.__undo, image_name, source)
+
+    def num_undo(self, image_name=None):
+        return len([s for s in self.__undo
+                    if image_name is None or s['image'] == image_name])
+
+    def num_redo(self, image_name=None):
+        return len([s for s in self.__redo
+                    if image_name is None or s['image'] == image_name])
+
+    def memory_usage(self):
+        return sum(s['nbytes'] for s in self.__undo + self.__redo)
+
+    def __trim(self):
+        # oldest undo steps go first, then the farthest redo steps
+        while self.__undo and self.memory_usage() > self.memory_limit:
+            self.__undo.pop(0)
+        while self.__redo and self.memory_usage() > self.memory_limit:
+            self.__redo.pop(0)
+
+    def set_memory_limit(self, memory_limit):
+        self.memory_limit = memory_limit
+        self.__trim()
+
+    def forget(self, image_name):
+        self.__undo = [s for s in self.__undo if s['image'] != image_name]
+        self.__redo = [s for s in self.__redo if s['image'] != image_name]
+
+    def clear(self):
+        self.__undo = []
+        self.__redo = []
+
+
+undo_history = UndoHistory()
@@ -0,0 +1,237 @@
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from .selection import apply_masked
+from .filters import pad_edges
+from .tiles import clip_rect, get_num_workers
+
+
+DEFAULT_JOB_WORKERS = 2
+# rows computed between two progress updates and cancellation checks
+JOB_BAND_ROWS = 64
+# seconds between two polls of the main thread
+JOB_POLL_INTERVAL = 0.1
+
+
+class Job():
+
+    def __init__(self, name, image_name, rect, compute, mask=None, halo=0):
+        # rect is the (x0, y0, x1, y1) box written back on commit; the
+        # snapshot covers source_rect, which is rect grown by halo
+        self.name = name
+        self.image_name = image_name
+        self.rect = rect
+        self.compute = compute
+        self.mask = mask
+        self.halo = halo
+        self.source_rect = rect
+        self.snapshot = None
+        self.result = None
+        # image version the snapshot was taken at, see ImageCache.touch
+        self.version = None
+        # QUEUED -> RUNNING -> DONE, CANCELLED or FAILED
+        self.state = 'QUEUED'
+        self.progress = 0.0
+        self.error = None
+        self.cancelled = False
+
+    def is_finished(self):
+        return self.state in ('DONE', 'CANCELLED', 'FAILED')
+
+    def cancel(self):
+        # a running job stops at its next band
+        self.cancelled = True
+        if self.state == 'QUEUED':
+            self.state = 'CANCELLED'
+
+    def take_snapshot(self, source, engine):
+        # main thread; the job computes on this copy, so nothing reaches
+        # the image before commit
+        x0, y0, x1, y1 = self.rect
+        h = self.halo
+        self.source_rect = clip_rect(
+            source.width, source.height,
+            {'x0': x0 - h, 'y0': y0 - h, 'x1': x1 + h, 'y1': y1 + h})
+        sx0, sy0, sx1, sy1 = self.source_rect
+        self.snapshot = engine.read(
+            source, {'x0': sx0, 'y0': sy0, 'x1': sx1, 'y1': sy1})
+
+    def commit(self, source, engine):
+        # main thread, once DONE
+        x0, y0 = self.rect[:2]
+        return engine.write(source, x0, y0, self.result)
+
+    def bands(self, height):
+        for y0 in range(0, height, JOB_BAND_ROWS):
+            if self.cancelled:
+                return
+            y1 = min(y0 + JOB_BAND_ROWS, height)
+            yield (y0, y1)
+            self.progress = y1 / float(height)
+
+    def run(self):
+        # worker thread; only touches the snapshot and its own attributes
+        try:
+            result = self.compute(self)
+        except Exception as e:
+            self.error = str(e)
+            self.state = 'FAILED'
+        else:
+            if self.cancelled:
+                self.state = 'CANCELLED'
+            else:
+                self.result = result
+                self.state = 'DONE'
+        self.snapshot = None
+
+
+def kernel_compute(kernel):
+    # point kernel over the snapshot, in place
+    def compute(job):
+        pixels = job.snapshot
+        x0, y0 = job.rect[:2]
+        w = pixels.shape[1]
+        for b0, b1 in job.bands(pixels.shape[0]):
+            band = pixels[b0:b1]
+            if job.mask is None:
+                kernel(band)
+                continue
+            m = job.mask.get_mask(x0, y0 + b0, x0 + w, y0 + b1)
+            if m.any():
+                apply_masked(band, m, kernel)
+        return pixels
+
+    return compute
+
+
+def filter_compute(filt, halo):
+    # neighbourhood filter, see TileEngine.apply_filter; the snapshot
+    # holds the halo around the rect as far as the image reaches
+    def compute(job):
+        src = job.snapshot
+        x0, y0, x1, y1 = job.rect
+        sx0, sy0, sx1, sy1 = job.source_rect
+        h = src.shape[0]
+        oy = y0 - sy0
+        left = halo - (x0 - sx0)
+        right = halo - (sx1 - x1)
+        out = src[oy:oy + y1 - y0, x0 - sx0:x1 - sx0].copy()
+        for b0, b1 in job.bands(y1 - y0):
+            r0 = oy + b0
+            r1 = oy + b1
+            s0 = max(0, r0 - halo)
+            s1 = min(h, r1 + halo)
+            strip = pad_edges(
+                src[s0:s1], halo - (r0 - s0), halo - (s1 - r1), left, right)
+            rgb = filt(strip)
+            if job.mask is None:
+                out[b0:b1, :, :3] = rgb
+            else:
+                m = job.mask.get_mask(x0, y0 + b0, x1, y0 + b1)
+                np.copyto(out[b0:b1, :, :3], rgb, where=m[..., np.newaxis])
+        return out
+
+    return compute
+
+
+class JobQueue():
+
+    def __init__(self, workers=DEFAULT_JOB_WORKERS):
+        self.workers = workers
+        # submission order; finished jobs stay until collected
+        self.jobs = []
+        self.__executor = None
+        self.__executor_workers = 0
+
+    def get_executor(self):
+        workers = get_num_workers(self.workers)
+        if self.__executor is None or self.__executor_workers != workers:
+            # running jobs finish on the old pool
+            if self.__executor is not None:
+                self.__executor.shutdown(wait=False)
+            self.__executor = ThreadPoolExecutor(max_workers=workers)
+            self.__executor_workers = workers
+        return self.__executor
+
+    def shutdown(self):
+        self.cancel()
+        if self.__executor is not None:
+            self.__executor.shutdown()
+            self.__executor = None
+            self.__executor_workers = 0
+
+    def submit(self, job):
+        self.jobs.append(job)
+        return job
+
+    def ready(self):
+        # the oldest job of every image, once the jobs before it on that
+        # image are committed; different images run concurrently
+        seen = set()
+        ready = []
+        for job in self.jobs:
+            if job.image_name in seen:
+                continue
+            seen.add(job.image_name)
+            if job.state == 'QUEUED':
+                ready.append(job)
+        return ready
+
+    def start(self, job):
+        # the snapshot must be taken by the caller on the main thread
+        job.state = 'RUNNING'
+        self.get_executor().submit(job.run)
+
+    def poll(self, start, commit):
+        # one main thread pass of the job runner: finished jobs go to
+        # commit(job), which returns False when it dropped the result, and
+        # jobs now ready go to start(job), which takes the snapshot and
+        # calls start; a job whose start or commit raises fails alone.
+        # Returns whether a result was written and (level, message) reports
+        committed = False
+        reports = []
+        for job in self.collect():
+            if job.state == 'DONE':
+                try:
+                    written = commit(job)
+                except Exception as e:
+                    reports.append(('ERROR', "{}: {}".format(job.name, e)))
+                    continue
+                if written:
+                    committed = True
+                else:
+                    reports.append((
+                        'WARNING',
+                        "{}: image changed, result dropped".format(job.name)))
+            elif job.state == 'FAILED':
+                reports.append(
+                    ('ERROR', "{}: {}".format(job.name, job.error)))
+        for job in self.ready():
+            try:
+                start(job)
+            except Exception as e:
+                # reported on the next poll; the jobs after it may run
+                job.error = str(e)
+                job.state = 'FAILED'
+                job.snapshot = None
+        return committed, reports
+
+    def collect(self):
+        finished = [j for j in self.jobs if j.is_finished()]
+        self.jobs = [j for j in self.jobs if not j.is_finished()]
+        return finished
+
+    def active(self):
+        return [j for j in self.jobs if not j.is_finished()]
+
+    def cancel(self, image_name=None):
+        for job in self.jobs:
+            if image_name is None or job.image_name == image_name:
+                job.cancel()
+
+    def __len__(self):
+        return len(self.jobs)
+
+
+job_queue = JobQueue()
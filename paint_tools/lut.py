@@ -0,0 +1,152 @@
+import numpy as np
+
+from .core import COLOR_CHANNELS, GRAY_SCALE_WEIGHTS
+
+
+LUT_SIZE = 256
+LEVELS = np.arange(LUT_SIZE, dtype=np.float32) / (LUT_SIZE - 1)
+
+
+def quantize(pixels, out=None):
+    if out is None:
+        out = np.empty(pixels.shape, dtype=np.uint8)
+    q = np.clip(pixels, 0.0, 1.0) * (LUT_SIZE - 1)
+    q += 0.5
+    np.copyto(out, q, casting='unsafe')
+    return out
+
+
+def make_lut(fn):
+    return np.clip(fn(LEVELS), 0.0, 1.0).astype(np.float32)
+
+
+def brightness_lut(value):
+    return make_lut(lambda x: x + value)
+
+
+def invert_lut():
+    return make_lut(lambda x: 1.0 - x)
+
+
+def threshold_lut(threshold):
+    # 0: black, 1: white, 2: keep the pixel as is
+    lut = np.full(LUT_SIZE, 2, dtype=np.uint8)
+    lut[LEVELS < threshold] = 0
+    lut[LEVELS > threshold] = 1
+    return lut
+
+
+def otsu_threshold(hist):
+    hist = np.asarray(hist, dtype=np.float64)
+    total = hist.sum()
+    if total == 0:
+        return LUT_SIZE // 2
+    p = hist / total
+    levels = np.arange(len(hist))
+    w0 = np.cumsum(p)
+    m0 = np.cumsum(p * levels)
+    mt = m0[-1]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        between = (mt * w0 - m0) ** 2 / (w0 * (1.0 - w0))
+    between[~np.isfinite(between)] = 0.0
+    # levels up to and including k form the dark class. Binarize keeps
+    # pixels exactly at the threshold, so the threshold goes into the empty
+    # levels after k when there are any (the variance is the same for all
+    # of them), in their middle; otherwise it is k + 1, and the pixels of
+    # that level are left as they are
+    k = int(np.argmax(between))
+    last = k
+    while last + 1 < len(hist) and hist[last + 1] == 0:
+        last += 1
+    if last == k:
+        return min(k + 1, LUT_SIZE - 1)
+    return (k + 1 + last) // 2
+
+
+class LutEngine():
+
+    def __init__(self):
+        self.key = None
+        self.indices = None
+        self.alpha = None
+        self.__histograms = {}
+
+    def set_source(self, key, pixels):
+        # quantize once per selection contents; later mappings are gathers
+        if key is not None and key == self.key:
+            return False
+        self.key = key
+        self.indices = quantize(pixels[..., :3])
+        self.alpha = pixels[..., 3].copy()
+        self.__histograms = {}
+        return True
+
+    def clear(self):
+        self.key = None
+        self.indices = None
+        self.alpha = None
+        self.__histograms = {}
+
+    def shape(self):
+        return self.indices.shape[:2]
+
+    def histogram(self, channel):
+        hist = self.__histograms.get(channel)
+        if hist is None:
+            i = COLOR_CHANNELS.index(channel)
+            hist = np.bincount(
+                self.indices[..., i].ravel(), minlength=LUT_SIZE)
+            self.__histograms[channel] = hist
+        return hist
+
+    def histograms(self):
+        return {c: self.histogram(c) for c in COLOR_CHANNELS}
+
+    def auto_threshold(self, channel):
+        return otsu_threshold(self.histogram(channel))
+
+    def __get_out(self, out):
+        if out is None:
+            out = np.empty(self.indices.shape[:2] + (4,), dtype=np.float32)
+        out[..., 3] = self.alpha
+        return out
+
+    def apply_lut(self, lut, out=None):
+        out = self.__get_out(out)
+        out[..., :3] = lut[self.indices]
+        return out
+
+    def binarize(self, threshold, color, out=None):
+        out = self.__get_out(out)
+        sel = threshold_lut(threshold)[
+            self.indices[..., COLOR_CHANNELS.index(color)]]
+        # one gather from a (class, level) table instead of masked writes
+        table = np.empty((3, LUT_SIZE), dtype=np.float32)
+        table[0] = 0.0
+        table[1] = 1.0
+        table[2] = LEVELS
+        index = sel.astype(np.uint16)
+        index <<= 8
+        out[..., :3] = table.ravel()[index[..., np.newaxis] | self.indices]
+        return out
+
+    def brightness(self, value, out=None):
+        return self.apply_lut(brightness_lut(value), out)
+
+    def invert(self, out=None):
+        return self.apply_lut(invert_lut(), out)
+
+    def gray_scale(self, color, out=None):
+        out = self.__get_out(out)
+        if color in COLOR_CHANNELS:
+            gray = LEVELS[self.indices[..., COLOR_CHANNELS.index(color)]]
+        else:
+            gray = np.zeros(self.indices.shape[:2], dtype=np.float32)
+            for i, wgt in enumerate(GRAY_SCALE_WEIGHTS[color]):
+                gray += (LEVELS * wgt)[self.indices[..., i]]
+            np.clip(gray, 0.0, 1.0, out=gray)
+        out[..., :3] = gray[..., np.newaxis]
+        return out
+
+
+lut_engine = LutEngine()
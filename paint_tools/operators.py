@@ -0,0 +1,1552 @@
+import time
+
+import bpy
+import bgl
+import numpy as np
+
+from . import core
+from .pixel_io import pixel_transfer
+from .tiles import ImageTileSource, clip_rect, tile_engine
+from .cache import image_cache
+from .clipboard import clipboard, get_format as get_clipboard_format
+from .history import undo_history
+from .lut import lut_engine
+from .preview import get_preview_size, preview_renderer
+from .selection import magic_wand, magic_wand_rows
+from .filters import get_filter
+from .resample import resampler
+from .composite import clip_paste, composite, kernel_fill_blend
+from .profiling import profiled, profiler
+from .redraw import redraw_scheduler
+from .view import view_cache
+from .formats import native
+from .jobs import Job, JOB_POLL_INTERVAL, filter_compute, job_queue, \
+    kernel_compute
+from . import raster
+
+
+def redraw_all_areas():
+    for area in bpy.context.screen.areas:
+        area.tag_redraw()
+
+
+def get_space(area_type, region_type, space_type, context):
+    for area in context.screen.areas:
+        if area.type == area_type:
+            break
+    for region in area.regions:
+        if region.type == region_type:
+            break
+    for space in area.spaces:
+        if space.type == space_type:
+            break
+
+    return (area, region, space)
+
+
+def get_active_image(context):
+    if context.area and context.area.type == 'IMAGE_EDITOR':
+        image = context.area.spaces.active.image
+        if image:
+            return image
+    area, region, space = get_space('IMAGE_EDITOR', 'WINDOW', 'IMAGE_EDITOR', bpy.context)
+    return area.spaces.active.image
+
+
+# events that can pan or zoom the image editor
+VIEW_EVENTS = {
+    'WHEELUPMOUSE', 'WHEELDOWNMOUSE', 'MIDDLEMOUSE', 'TRACKPADPAN',
+    'TRACKPADZOOM', 'MOUSEROTATE', 'NDOF_MOTION', 'NUMPAD_PLUS',
+    'NUMPAD_MINUS', 'NUMPAD_PERIOD', 'HOME',
+}
+
+
+def get_region_key(region):
+    return region.as_pointer()
+
+
+def get_view_region(context):
+    # main region of the image editor the operator runs in, else of the
+    # first image editor of the screen
+    area = context.area
+    if area is not None and area.type == 'IMAGE_EDITOR':
+        for region in area.regions:
+            if region.type == 'WINDOW':
+                return area, region
+    area, region, space = get_space(
+        'IMAGE_EDITOR', 'WINDOW', 'IMAGE_EDITOR', bpy.context)
+    return area, region
+
+
+def capture_view(context):
+    # called once per redraw of an image editor region, see draw_bb
+    key = get_region_key(context.region)
+    space = context.space_data
+    img = space.image if space is not None and space.type == 'IMAGE_EDITOR' \
+        else None
+    if img is None:
+        view_cache.invalidate(key)
+        return None
+    return view_cache.capture(
+        key, context.region.view2d, img.size[0], img.size[1])
+
+
+def get_view_transform(context):
+    area, region = get_view_region(context)
+    key = get_region_key(region)
+    transform = view_cache.get(key)
+    if transform is None:
+        img = area.spaces.active.image
+        if img is not None:
+            transform = view_cache.capture(
+                key, region.view2d, img.size[0], img.size[1])
+    return transform
+
+
+def get_view_zoom(context):
+    # region pixels per image pixel of the image editor
+    transform = get_view_transform(context)
+    if transform is None:
+        return 1.0
+    return transform.get_zoom()
+
+
+def to_pixel(context, mvx, mvy):
+    transform = get_view_transform(context)
+    if transform is not None:
+        return transform.to_pixel(mvx, mvy)
+    mrx, mry = context.region.view2d.region_to_view(mvx, mvy)
+    img = get_active_image(context)
+    mpx = img.size[0] * mrx
+    mpy = img.size[1] * mry
+    return (int(mpx), int(mpy))
+
+
+def get_tile_engine(context):
+    scene = context.scene
+    tile_engine.tile_size = scene.pt_tile_size
+    tile_engine.memory_limit = scene.pt_memory_limit * 1024 * 1024
+    tile_engine.workers = scene.pt_workers
+    return tile_engine
+
+
+def get_image_cache(context):
+    scene = context.scene
+    image_cache.lazy_flush = scene.pt_cache_lazy_flush
+    image_cache.set_storage_mode(scene.pt_storage_mode)
+    image_cache.set_budget(scene.pt_cache_budget * 1024 * 1024)
+    return image_cache
+
+
+def get_tile_source(context, img=None):
+    if img is None:
+        img = get_active_image(context)
+    if context.scene.pt_use_cache:
+        source = get_image_cache(context).get_source(img)
+        if source is not None:
+            return source
+    else:
+        image_cache.flush()
+        image_cache.clear()
+    return ImageTileSource(img)
+
+
+@bpy.app.handlers.persistent
+def flush_image_cache(scene):
+    # before undo/redo and saving, so lazily flushed edits are neither lost
+    # nor missing from the saved file
+    image_cache.flush()
+    image_cache.expect_changes()
+
+
+@bpy.app.handlers.persistent
+def revalidate_image_cache(scene):
+    # undo/redo may replace the image data behind our back; only entries
+    # of images that changed are dropped
+    image_cache.revalidate(bpy.data.images)
+    view_cache.invalidate()
+
+
+@bpy.app.handlers.persistent
+def invalidate_image_cache(scene):
+    # a loaded file brings its own images; steps recorded on the previous
+    # file's images must not be applied to same-named ones
+    image_cache.clear()
+    undo_history.clear()
+    view_cache.invalidate()
+    # loading ends the job runner without calling its cancel; the jobs
+    # of the previous file must not write into the new one
+    job_queue.cancel()
+    props = getattr(bpy.types.Scene, 'pt_props', None)
+    if props is not None:
+        props.jobs_running = False
+
+
+def get_undo_history(context):
+    undo_history.set_memory_limit(
+        context.scene.pt_history_limit * 1024 * 1024)
+    return undo_history
+
+
+def record_undo(context, name, source, rect):
+    if context.scene.pt_use_history:
+        img = get_active_image(context)
+        get_undo_history(context).record(name, img.name, source, rect)
+
+
+def finish_edit(context, name, image_name, source):
+    # after the pixels are written: the step just recorded is sealed so
+    # undo can tell when the image changed since; without the history the
+    # edit goes to Blender's undo, as the UNDO option did
+    if context.scene.pt_use_history:
+        get_undo_history(context).seal(image_name, source)
+    else:
+        bpy.ops.ed.undo_push(message=name)
+
+
+def get_mask_selection(context):
+    # a magic wand mask only applies to the image it was made on
+    props = context.scene.pt_props
+    mask = props.mask_selection
+    if mask is None:
+        return None
+    img = get_active_image(context)
+    if props.mask_image != img.name or \
+            (mask.width, mask.height) != tuple(img.size):
+        return None
+    return mask
+
+
+def clear_mask_selection(context):
+    props = context.scene.pt_props
+    props.mask_selection = None
+    props.mask_image = None
+
+
+def add_rect_pixels(rect):
+    profiler.add_pixels(
+        max(0, rect['x1'] - rect['x0']) * max(0, rect['y1'] - rect['y0']))
+
+
+def submit_job(context, name, rect, compute, halo=0):
+    # the edit is computed by a background job and written back by
+    # PT_JobRunner; returns the box it will change
+    img = get_active_image(context)
+    x0, y0, x1, y1 = clip_rect(img.size[0], img.size[1], rect)
+    if x0 < x1 and y0 < y1:
+        job_queue.workers = context.scene.pt_job_workers
+        job_queue.submit(Job(
+            name, img.name, (x0, y0, x1, y1), compute,
+            get_mask_selection(context), halo))
+        if not context.scene.pt_props.jobs_running:
+            bpy.ops.paint.pt_job_runner('INVOKE_DEFAULT')
+    return (x0, y0, x1, y1)
+
+
+def start_job(context, job):
+    img = bpy.data.images.get(job.image_name)
+    if img is None:
+        job.cancel()
+        return
+    job.take_snapshot(
+        get_tile_source(context, img), get_tile_engine(context))
+    job.version = image_cache.get_version(img.name)
+    job_queue.start(job)
+
+
+def commit_job(context, job):
+    # main thread; a job whose image was edited, undone or reloaded since
+    # its snapshot is dropped instead of overwriting those changes
+    img = bpy.data.images.get(job.image_name)
+    if img is None:
+        return False
+    if image_cache.get_version(img.name) != job.version:
+        return False
+    source = get_tile_source(context, img)
+    x0, y0, x1, y1 = job.rect
+    if context.scene.pt_use_history:
+        get_undo_history(context).record(
+            job.name, img.name, source,
+            {'x0': x0, 'y0': y0, 'x1': x1, 'y1': y1})
+    image_cache.touch(img.name)
+    job.commit(source, get_tile_engine(context))
+    finish_edit(context, job.name, img.name, source)
+    return True
+
+
+def apply_rect(context, kernel, name):
+    rect = get_pixel_rect_bb(context)
+    if context.scene.pt_background:
+        return submit_job(context, name, rect, kernel_compute(kernel))
+    add_rect_pixels(rect)
+    with profiler.phase('source'):
+        source = get_tile_source(context)
+    with profiler.phase('undo'):
+        record_undo(context, name, source, rect)
+    img = get_active_image(context)
+    image_cache.touch(img.name)
+    with profiler.phase('apply'):
+        result = get_tile_engine(context).apply(
+            source, rect, kernel, get_mask_selection(context))
+    with profiler.phase('undo'):
+        finish_edit(context, name, img.name, source)
+    return result
+
+
+def apply_filter_rect(context, filter_name, name):
+    scene = context.scene
+    filt, halo = get_filter(
+        filter_name, scene.pt_filter_radius, scene.pt_sharpen_amount)
+    rect = get_pixel_rect_bb(context)
+    if scene.pt_background:
+        return submit_job(
+            context, name, rect, filter_compute(filt, halo), halo)
+    add_rect_pixels(rect)
+    with profiler.phase('source'):
+        source = get_tile_source(context)
+    with profiler.phase('undo'):
+        record_undo(context, name, source, rect)
+    img = get_active_image(context)
+    image_cache.touch(img.name)
+    with profiler.phase('apply'):
+        result = get_tile_engine(context).apply_filter(
+            source, rect, filt, halo, get_mask_selection(context))
+    with profiler.phase('undo'):
+        finish_edit(context, name, img.name, source)
+    return result
+
+
+def draw_shape(context, name, box, draw):
+    # draw(pixels, ox, oy) renders into a block of the image whose
+    # bottom-left pixel is (ox, oy); box bounds everything it touches
+    rect = {'x0': int(np.floor(box[0])), 'y0': int(np.floor(box[1])),
+            'x1': int(np.ceil(box[2])), 'y1': int(np.ceil(box[3]))}
+    source = get_tile_source(context)
+    x0, y0, x1, y1 = clip_rect(source.width, source.height, rect)
+    if x0 >= x1 or y0 >= y1:
+        return None
+    rect = {'x0': x0, 'y0': y0, 'x1': x1, 'y1': y1}
+    add_rect_pixels(rect)
+    record_undo(context, name, source, rect)
+    img = get_active_image(context)
+    image_cache.touch(img.name)
+    with profiler.phase('draw'):
+        if source.streamed:
+            engine = get_tile_engine(context)
+            block = engine.read(source, rect)
+            draw(block, x0, y0)
+            engine.write(source, x0, y0, block)
+        else:
+            draw(source.view(x0, y0, x1, y1), x0, y0)
+            source.update()
+    finish_edit(context, name, img.name, source)
+
+    return (x0, y0, x1, y1)
+
+
+def get_shape_style(context):
+    scene = context.scene
+    return {'color': scene.pt_fill_color, 'stroke': scene.pt_stroke_width,
+            'mode': scene.pt_blend_mode, 'opacity': scene.pt_blend_opacity}
+
+
+def draw_segments(context, name, segs):
+    # segs: (n, 4) in image pixel coordinates
+    segs = np.asarray(segs, dtype=np.float64).reshape(-1, 4)
+    style = get_shape_style(context)
+    pad = style['stroke'] * 0.5 + 1.0
+    box = (min(segs[:, 0].min(), segs[:, 2].min()) - pad,
+           min(segs[:, 1].min(), segs[:, 3].min()) - pad,
+           max(segs[:, 0].max(), segs[:, 2].max()) + pad,
+           max(segs[:, 1].max(), segs[:, 3].max()) + pad)
+
+    def draw(pixels, ox, oy):
+        raster.draw_lines(
+            pixels, segs - [ox, oy, ox, oy], style['color'],
+            style['stroke'], style['mode'], style['opacity'])
+
+    return draw_shape(context, name, box, draw)
+
+
+def read_selection(context, zoom=1.0):
+    # with zoom < 1 a matching pyramid level is used if one is available
+    rect = get_pixel_rect_bb(context)
+    source = get_tile_source(context)
+    x0, y0, x1, y1 = clip_rect(source.width, source.height, rect)
+    if zoom < 1.0 and source.storage is not None:
+        pyramid = image_cache.get_pyramid(get_active_image(context))
+        level = pyramid.level_for_zoom(zoom)
+        if level > 0:
+            return pyramid.get_region(level, (x0, y0, x1, y1))
+    if source.streamed:
+        return get_tile_engine(context).read(source, rect)
+    return source.pixels[y0:y1, x0:x1]
+
+
+def get_selection_key(context):
+    img = get_active_image(context)
+    rect = get_pixel_rect_bb(context)
+    return (img.name, image_cache.get_version(img.name),
+            rect['x0'], rect['y0'], rect['x1'], rect['y1'])
+
+
+def update_selection_stats(context, region=False):
+    # mean/std come from summed-area tables and are cheap enough for every
+    # mouse move; min/max/histogram need a pass over the selection
+    scene = context.scene
+    props = scene.pt_props
+    if not scene.pt_show_stats:
+        return
+    props.selection_stats = None
+    props.region_stats = None
+    if not scene.pt_use_cache:
+        return
+    stats = image_cache.get_stats(
+        get_active_image(context), scene.pt_stats_memory * 1024 * 1024)
+    if stats is None:
+        return
+    r = get_pixel_rect_bb(context)
+    rect = (r['x0'], r['y0'], r['x1'], r['y1'])
+    zoom = get_view_zoom(context)
+    props.selection_stats = stats.query(rect, zoom)
+    if region:
+        props.region_stats = stats.region(rect, zoom)
+
+
+def get_lut_engine(context):
+    key = get_selection_key(context)
+    if lut_engine.key != key:
+        lut_engine.set_source(key, read_selection(context))
+    return lut_engine
+
+
+def get_clipboard(context):
+    clipboard.set_budget(context.scene.pt_clipboard_budget * 1024 * 1024)
+    return clipboard
+
+
+def copy_rect(context):
+    scene = context.scene
+    rect = get_pixel_rect_bb(context)
+    add_rect_pixels(rect)
+    with profiler.phase('source'):
+        source = get_tile_source(context)
+    with profiler.phase('read'):
+        if source.streamed:
+            pixels = get_tile_engine(context).read(source, rect)
+        else:
+            x0, y0, x1, y1 = clip_rect(source.width, source.height, rect)
+            pixels = source.pixels[y0:y1, x0:x1]
+
+    with profiler.phase('store'):
+        return get_clipboard(context).store(
+            scene.pt_clipboard_slot, pixels,
+            get_clipboard_format(
+                scene.pt_clipboard_format, get_active_image(context)),
+            scene.pt_clipboard_compression)
+
+
+def paste_rect(context, name):
+    slot = context.scene.pt_clipboard_slot
+    entry = get_clipboard(context).get(slot)
+    if entry is None:
+        return None
+
+    rect = get_pixel_rect_bb(context)
+    with profiler.phase('source'):
+        source = get_tile_source(context)
+    x = rect['x0']
+    y = rect['y1'] - entry['height']
+    with profiler.phase('undo'):
+        record_undo(
+            context, name, source,
+            {'x0': x, 'y0': y, 'x1': x + entry['width'],
+             'y1': y + entry['height']})
+    img = get_active_image(context)
+    image_cache.touch(img.name)
+    mode = context.scene.pt_blend_mode
+    opacity = context.scene.pt_blend_opacity
+    clipped = clip_paste(
+        source.width, source.height, x, y, entry['width'], entry['height'])
+    if clipped is None:
+        return (x, y, x, y)
+    (x0, y0, x1, y1), (ox, oy) = clipped
+    rect = {'x0': x0, 'y0': y0, 'x1': x1, 'y1': y1}
+    add_rect_pixels(rect)
+    with profiler.phase('paste'):
+        result = paste_clipped(
+            context, source, slot, rect, ox, oy, mode, opacity)
+    finish_edit(context, name, img.name, source)
+    return result
+
+
+def paste_clipped(context, source, slot, rect, ox, oy, mode, opacity):
+    x0, y0, x1, y1 = rect['x0'], rect['y0'], rect['x1'], rect['y1']
+    if mode == 'REPLACE' and opacity >= 1.0:
+        if source.streamed:
+            return get_tile_engine(context).write(
+                source, x0, y0,
+                clipboard.load(slot)[oy:oy + y1 - y0, ox:ox + x1 - x0])
+        clipboard.paste_into(slot, source.view(x0, y0, x1, y1), ox, oy)
+        source.update()
+        return (x0, y0, x1, y1)
+
+    src = np.empty((y1 - y0, x1 - x0, 4), dtype=np.float32)
+    clipboard.paste_into(slot, src, ox, oy)
+    if source.streamed:
+        engine = get_tile_engine(context)
+        dst = engine.read(source, rect)
+        composite(dst, src, mode, opacity)
+        return engine.write(source, x0, y0, dst)
+    composite(source.view(x0, y0, x1, y1), src, mode, opacity)
+    source.update()
+
+    return (x0, y0, x1, y1)
+
+
+def new_image(context, name, pixels):
+    # the new image replaces the active one in the image editor
+    img = get_active_image(context)
+    h, w = pixels.shape[:2]
+    new = bpy.data.images.new(
+        name, w, h, alpha=True, float_buffer=img.is_float)
+    pixel_transfer.write(
+        new, np.ascontiguousarray(pixels, dtype=np.float32).reshape(-1))
+    area, region, space = get_space(
+        'IMAGE_EDITOR', 'WINDOW', 'IMAGE_EDITOR', bpy.context)
+    space.image = new
+    view_cache.invalidate()
+    return new
+
+
+def get_pixel_rect_bb(context):
+    mask = get_mask_selection(context)
+    if mask is not None:
+        return mask.get_rect()
+    scene = context.scene
+    props = scene.pt_props
+    transform = get_view_transform(context)
+    if transform is not None:
+        (xs, ys), (xe, ye) = transform.to_pixels([props.start, props.end])
+    else:
+        xs, ys = to_pixel(context, props.start[0], props.start[1])
+        xe, ye = to_pixel(context, props.end[0], props.end[1])
+    y0 = min(ys, ye) + 1
+    y1 = max(ys, ye) + 1
+    x0 = min(xs, xe)
+    x1 = max(xs, xe)
+
+    return {'x0': x0, 'y0': y0, 'x1': x1, 'y1': y1}
+
+
+class PT_FillRect(bpy.types.Operator):
+
+    bl_idname = "paint.pt_fill_rect"
+    bl_label = "Fill Rect"
+    bl_description = "Fill Rect"
+    bl_options = {'REGISTER'}
+
+    def execute(self, context):
+        scene = context.scene
+        color = scene.pt_fill_color
+        mode = scene.pt_blend_mode
+        opacity = scene.pt_blend_opacity
+        if opacity >= 1.0 and mode in ('REPLACE', 'OVER'):
+            # an opaque fill overwrites, which works on any storage
+            kernel = native(lambda p: core.kernel_fill(p, color))
+        else:
+            kernel = lambda p: kernel_fill_blend(p, color, mode, opacity)
+        apply_rect(context, kernel, self.bl_label)
+
+        return {'FINISHED'}
+
+
+class PT_CopyRect(bpy.types.Operator):
+
+    bl_idname = "paint.pt_copy_rect"
+    bl_label = "Copy Rect"
+    bl_description = "Copy Rect"
+    bl_options = {'REGISTER', 'UNDO'}
+
+    def execute(self, context):
+        try:
+            copy_rect(context)
+        except ValueError as e:
+            self.report({'ERROR'}, str(e))
+            return {'CANCELLED'}
+
+        return {'FINISHED'}
+
+
+class PT_CutRect(bpy.types.Operator):
+
+    bl_idname = "paint.pt_cut_rect"
+    bl_label = "Cut Rect"
+    bl_description = "Cut Rect"
+    bl_options = {'REGISTER'}
+
+    def execute(self, context):
+        try:
+            copy_rect(context)
+        except ValueError as e:
+            self.report({'ERROR'}, str(e))
+            return {'CANCELLED'}
+        apply_rect(context, core.kernel_erase, self.bl_label)
+
+        return {'FINISHED'}
+
+
+class PT_PasteRect(bpy.types.Operator):
+
+    bl_idname = "paint.pt_paste_rect"
+    bl_label = "Paste Rect"
+    bl_description = "Paste Rect"
+    bl_options = {'REGISTER'}
+
+    def execute(self, context):
+        if paste_rect(context, self.bl_label) is None:
+            self.report({'WARNING'}, "Clipboard slot is empty")
+            return {'CANCELLED'}
+
+        return {'FINISHED'}
+
+
+class PT_ClearClipboard(bpy.types.Operator):
+
+    bl_idname = "paint.pt_clear_clipboard"
+    bl_label = "Clear Clipboard"
+    bl_description = "Remove all clipboard slots"
+
+    def execute(self, context):
+        clipboard.clear()
+
+        return {'FINISHED'}
+
+
+class PT_EraseRect(bpy.types.Operator):
+
+    bl_idname = "paint.pt_erase_rect"
+    bl_label = "Erase Rect"
+    bl_description = "Erase Rect"
+    bl_options = {'REGISTER'}
+
+    def execute(self, context):
+        apply_rect(context, core.kernel_erase, self.bl_label)
+
+        return {'FINISHED'}
+
+
+class PT_SelectAll(bpy.types.Operator):
+
+    bl_idname = "paint.pt_select_all"
+    bl_label = "Select All"
+    bl_description = "Select all"
+    bl_options = {'REGISTER', 'UNDO'}
+
+    def execute(self, context):
+        props = context.scene.pt_props
+
+        clear_mask_selection(context)
+        transform = get_view_transform(context)
+        if transform is None:
+            return {'CANCELLED'}
+        props.start = (transform.x0, transform.y0)
+        props.end = (transform.x1, transform.y1)
+
+        redraw_all_areas()
+
+        return {'FINISHED'}
+
+
+class PT_MagicWand(bpy.types.Operator):
+
+    bl_idname = "paint.pt_magic_wand"
+    bl_label = "Magic Wand"
+    bl_description = "Select the connected region of similar color at the clicked point"
+
+    def execute(self, context):
+        props = context.scene.pt_props
+        img = get_active_image(context)
+        # computed from the editor when it has not drawn yet
+        transform = get_view_transform(context)
+        if img is None or transform is None:
+            self.report({'WARNING'}, "No image editor view to pick from")
+            return {'CANCELLED'}
+        w, h = img.size[0], img.size[1]
+        x, y = transform.to_pixel(props.end[0], props.end[1])
+        source = get_tile_source(context, img)
+        tolerance = context.scene.pt_wand_tolerance / 255.0
+        if source.streamed:
+            engine = get_tile_engine(context)
+            mask = magic_wand_rows(
+                lambda y0, y1: engine.read(
+                    source, {'x0': 0, 'y0': y0, 'x1': w, 'y1': y1}),
+                w, h, x, y, tolerance)
+        else:
+            mask = magic_wand(source.pixels, x, y, tolerance)
+        if mask is None or mask.count == 0:
+            return {'CANCELLED'}
+
+        props.mask_selection = mask
+        props.mask_image = img.name
+        x0, y0, x1, y1 = mask.bbox
+        props.start = transform.to_region(x0, y0)
+        props.end = transform.to_region(x1, y1)
+        update_selection_stats(context, True)
+        redraw_all_areas()
+
+        return {'FINISHED'}
+
+
+class PT_ClearMask(bpy.types.Operator):
+
+    bl_idname = "paint.pt_clear_mask"
+    bl_label = "Clear Mask"
+    bl_description = "Drop the magic wand mask and go back to the rectangle"
+
+    def execute(self, context):
+        clear_mask_selection(context)
+        redraw_all_areas()
+
+        return {'FINISHED'}
+
+
+class PT_Undo(bpy.types.Operator):
+
+    bl_idname = "paint.pt_undo"
+    bl_label = "Undo"
+    bl_description = "Undo the last Paint Tools edit"
+
+    @classmethod
+    def poll(cls, context):
+        # steps of other images stay for when they are shown again
+        img = get_active_image(context)
+        return img is not None and undo_history.num_undo(img.name) > 0
+
+    def execute(self, context):
+        img = get_active_image(context)
+        if undo_history.undo(get_tile_source(context, img), img.name) is None:
+            self.report(
+                {'WARNING'},
+                "Image {} was changed outside Paint Tools, its history was "
+                "dropped".format(img.name))
+            return {'CANCELLED'}
+        image_cache.touch(img.name)
+        redraw_all_areas()
+
+        return {'FINISHED'}
+
+
+class PT_Redo(bpy.types.Operator):
+
+    bl_idname = "paint.pt_redo"
+    bl_label = "Redo"
+    bl_description = "Redo the last undone Paint Tools edit"
+
+    @classmethod
+    def poll(cls, context):
+        # steps of other images stay for when they are shown again
+        img = get_active_image(context)
+        return img is not None and undo_history.num_redo(img.name) > 0
+
+    def execute(self, context):
+        img = get_active_image(context)
+        if undo_history.redo(get_tile_source(context, img), img.name) is None:
+            self.report(
+                {'WARNING'},
+                "Image {} was changed outside Paint Tools, its history was "
+                "dropped".format(img.name))
+            return {'CANCELLED'}
+        image_cache.touch(img.name)
+        redraw_all_areas()
+
+        return {'FINISHED'}
+
+
+class PT_ClearHistory(bpy.types.Operator):
+
+    bl_idname = "paint.pt_clear_history"
+    bl_label = "Clear History"
+    bl_description = "Drop all Paint Tools undo steps"
+
+    def execute(self, context):
+        undo_history.clear()
+
+        return {'FINISHED'}
+
+
+class PT_FlushCache(bpy.types.Operator):
+
+    bl_idname = "paint.pt_flush_cache"
+    bl_label = "Flush Cache"
+    bl_description = "Write cached edits back to the images"
+
+    def execute(self, context):
+        image_cache.flush()
+
+        return {'FINISHED'}
+
+
+class PT_ClearCache(bpy.types.Operator):
+
+    bl_idname = "paint.pt_clear_cache"
+    bl_label = "Clear Cache"
+    bl_description = "Flush and drop all cached images"
+
+    def execute(self, context):
+        image_cache.flush()
+        image_cache.clear()
+        image_cache.reset_stats()
+
+        return {'FINISHED'}
+
+
+class PT_UpdateStatistics(bpy.types.Operator):
+
+    bl_idname = "paint.pt_update_statistics"
+    bl_label = "Update Statistics"
+    bl_description = "Compute statistics of the selection"
+
+    def execute(self, context):
+        update_selection_stats(context, True)
+
+        return {'FINISHED'}
+
+
+class PT_BinarizeRect(bpy.types.Operator):
+
+    bl_idname = "paint.pt_binarize_rect"
+    bl_label = "Binarize Rect"
+    bl_description = "Binarize Rect"
+    bl_options = {'REGISTER'}
+
+    def execute(self, context):
+        threshold = context.scene.pt_binarize_threshold / 255.0
+        color = context.scene.pt_binarize_threshold_color
+        apply_rect(
+            context, native(lambda p: core.kernel_binarize(p, threshold, color)),
+            self.bl_label)
+
+        return {'FINISHED'}
+
+
+class PT_AutoThreshold(bpy.types.Operator):
+
+    bl_idname = "paint.pt_auto_threshold"
+    bl_label = "Auto Threshold"
+    bl_description = "Set the binarize threshold from the selection histogram (Otsu)"
+
+    def execute(self, context):
+        scene = context.scene
+        engine = get_lut_engine(context)
+        if engine.indices.size == 0:
+            return {'CANCELLED'}
+        scene.pt_binarize_threshold = engine.auto_threshold(
+            scene.pt_binarize_threshold_color)
+
+        return {'FINISHED'}
+
+
+class PT_GrayScaleRect(bpy.types.Operator):
+
+    bl_idname = "paint.pt_gray_scale_rect"
+    bl_label = "Gray Scale Rect"
+    bl_description = "Gray Scale Rect"
+    bl_options = {'REGISTER'}
+
+    def execute(self, context):
+        color = context.scene.pt_gray_scale_color
+        apply_rect(
+            context, native(lambda p: core.kernel_gray_scale(p, color)),
+            self.bl_label)
+
+        return {'FINISHED'}
+
+
+class PT_ChangeBrightnessRect(bpy.types.Operator):
+
+    bl_idname = "paint.pt_change_brightness_rect"
+    bl_label = "Change Brightness Rect"
+    bl_description = "Change Brightness Rect"
+    bl_options = {'REGISTER'}
+
+    def execute(self, context):
+        value = context.scene.pt_change_brightness_value / 255.0
+        apply_rect(
+            context, native(lambda p: core.kernel_brightness(p, value)),
+            self.bl_label)
+
+        return {'FINISHED'}
+
+
+class PT_InvertRect(bpy.types.Operator):
+
+    bl_idname = "paint.pt_invert_rect"
+    bl_label = "Invert Rect"
+    bl_description = "Invert Rect"
+    bl_options = {'REGISTER'}
+
+    def execute(self, context):
+        apply_rect(context, core.kernel_invert, self.bl_label)
+
+        return {'FINISHED'}
+
+
+class PT_BlurRect(bpy.types.Operator):
+
+    bl_idname = "paint.pt_blur_rect"
+    bl_label = "Blur Rect"
+    bl_description = "Gaussian Blur Rect"
+    bl_options = {'REGISTER'}
+
+    def execute(self, context):
+        apply_filter_rect(context, 'GAUSSIAN', self.bl_label)
+
+        return {'FINISHED'}
+
+
+class PT_BoxBlurRect(bpy.types.Operator):
+
+    bl_idname = "paint.pt_box_blur_rect"
+    bl_label = "Box Blur Rect"
+    bl_description = "Box Blur Rect"
+    bl_options = {'REGISTER'}
+
+    def execute(self, context):
+        apply_filter_rect(context, 'BOX', self.bl_label)
+
+        return {'FINISHED'}
+
+
+class PT_SharpenRect(bpy.types.Operator):
+
+    bl_idname = "paint.pt_sharpen_rect"
+    bl_label = "Sharpen Rect"
+    bl_description = "Sharpen Rect"
+    bl_options = {'REGISTER'}
+
+    def execute(self, context):
+        apply_filter_rect(context, 'SHARPEN', self.bl_label)
+
+        return {'FINISHED'}
+
+
+class PT_EdgeDetectRect(bpy.types.Operator):
+
+    bl_idname = "paint.pt_edge_detect_rect"
+    bl_label = "Edge Detect Rect"
+    bl_description = "Sobel Edge Detect Rect"
+    bl_options = {'REGISTER'}
+
+    def execute(self, context):
+        apply_filter_rect(context, 'SOBEL', self.bl_label)
+
+        return {'FINISHED'}
+
+
+def get_pipeline_params(context, op):
+    scene = context.scene
+    if op == 'FILL':
+        return {'color': tuple(scene.pt_fill_color)}
+    if op == 'BINARIZE':
+        return {
+            'threshold': scene.pt_binarize_threshold / 255.0,
+            'color': scene.pt_binarize_threshold_color}
+    if op == 'GRAY_SCALE':
+        return {'color': scene.pt_gray_scale_color}
+    if op == 'BRIGHTNESS':
+        return {'value': scene.pt_change_brightness_value / 255.0}
+    return {}
+
+
+class PT_PipelineAddStep(bpy.types.Operator):
+
+    bl_idname = "paint.pt_pipeline_add_step"
+    bl_label = "Add Pipeline Step"
+    bl_description = "Record the operation with its current settings"
+
+    def execute(self, context):
+        op = context.scene.pt_pipeline_op
+        pipeline = context.scene.pt_props.pipeline
+        pipeline.add(op, **get_pipeline_params(context, op))
+
+        return {'FINISHED'}
+
+
+class PT_PipelineRemoveStep(bpy.types.Operator):
+
+    bl_idname = "paint.pt_pipeline_remove_step"
+    bl_label = "Remove Pipeline Step"
+    bl_description = "Remove the last recorded operation"
+
+    def execute(self, context):
+        context.scene.pt_props.pipeline.pop()
+
+        return {'FINISHED'}
+
+
+class PT_PipelineClear(bpy.types.Operator):
+
+    bl_idname = "paint.pt_pipeline_clear"
+    bl_label = "Clear Pipeline"
+    bl_description = "Remove all recorded operations"
+
+    def execute(self, context):
+        context.scene.pt_props.pipeline.clear()
+
+        return {'FINISHED'}
+
+
+class PT_PipelineRun(bpy.types.Operator):
+
+    bl_idname = "paint.pt_pipeline_run"
+    bl_label = "Run Pipeline"
+    bl_description = "Apply all recorded operations to the selection in one pass"
+    bl_options = {'REGISTER'}
+
+    def execute(self, context):
+        pipeline = context.scene.pt_props.pipeline
+        if len(pipeline) == 0:
+            self.report({'WARNING'}, "Pipeline is empty")
+            return {'CANCELLED'}
+        apply_rect(context, pipeline.get_kernel(), self.bl_label)
+
+        return {'FINISHED'}
+
+
+class PT_CropRect(bpy.types.Operator):
+
+    bl_idname = "paint.pt_crop_rect"
+    bl_label = "Crop Rect"
+    bl_description = "Crop Rect"
+    bl_options = {'REGISTER', 'UNDO'}
+
+    def execute(self, context):
+        pixels = read_selection(context)
+        if pixels.size == 0:
+            return {'CANCELLED'}
+        img = get_active_image(context)
+        new_image(context, "{}_crop".format(img.name), pixels)
+
+        return {'FINISHED'}
+
+
+class PT_DrawLine(bpy.types.Operator):
+
+    bl_idname = "paint.pt_draw_line"
+    bl_label = "Draw Line"
+    bl_description = "Draw a line from the start to the end of the selection"
+    bl_options = {'REGISTER'}
+
+    def execute(self, context):
+        props = context.scene.pt_props
+        transform = get_view_transform(context)
+        if transform is None:
+            return {'CANCELLED'}
+        points = transform.to_pixels([props.start, props.end]) + 0.5
+        draw_segments(context, self.bl_label, points.reshape(1, 4))
+
+        return {'FINISHED'}
+
+
+class PT_DrawRect(bpy.types.Operator):
+
+    bl_idname = "paint.pt_draw_rect"
+    bl_label = "Draw Rect"
+    bl_description = "Draw the outline of the selection, or fill it"
+    bl_options = {'REGISTER'}
+
+    def execute(self, context):
+        style = get_shape_style(context)
+        r = get_pixel_rect_bb(context)
+        if context.scene.pt_shape_fill:
+            rect = (r['x0'], r['y0'], r['x1'], r['y1'])
+        else:
+            # the stroke runs through the centers of the border pixels
+            rect = (r['x0'] + 0.5, r['y0'] + 0.5, r['x1'] - 0.5,
+                    r['y1'] - 0.5)
+        pad = style['stroke'] * 0.5 + 1.0
+
+        def draw(pixels, ox, oy):
+            raster.draw_rects(
+                pixels, [[rect[0] - ox, rect[1] - oy, rect[2] - ox,
+                          rect[3] - oy]],
+                style['color'], style['stroke'], style['mode'],
+                style['opacity'], context.scene.pt_shape_fill)
+
+        draw_shape(
+            context, self.bl_label,
+            (rect[0] - pad, rect[1] - pad, rect[2] + pad, rect[3] + pad),
+            draw)
+
+        return {'FINISHED'}
+
+
+class PT_DrawEllipse(bpy.types.Operator):
+
+    bl_idname = "paint.pt_draw_ellipse"
+    bl_label = "Draw Ellipse"
+    bl_description = "Draw the ellipse inscribed in the selection"
+    bl_options = {'REGISTER'}
+
+    def execute(self, context):
+        style = get_shape_style(context)
+        fill = context.scene.pt_shape_fill
+        r = get_pixel_rect_bb(context)
+        cx = (r['x0'] + r['x1']) * 0.5
+        cy = (r['y0'] + r['y1']) * 0.5
+        inset = 0.0 if fill else 0.5
+        rx = max(0.0, (r['x1'] - r['x0']) * 0.5 - inset)
+        ry = max(0.0, (r['y1'] - r['y0']) * 0.5 - inset)
+        pad = style['stroke'] * 0.5 + 1.0
+
+        def draw(pixels, ox, oy):
+            raster.draw_ellipses(
+                pixels, [[cx - ox, cy - oy, rx, ry]], style['color'],
+                style['stroke'], style['mode'], style['opacity'], fill)
+
+        draw_shape(
+            context, self.bl_label,
+            (cx - rx - pad, cy - ry - pad, cx + rx + pad, cy + ry + pad),
+            draw)
+
+        return {'FINISHED'}
+
+
+class PT_PolylineAddPoint(bpy.types.Operator):
+
+    bl_idname = "paint.pt_polyline_add_point"
+    bl_label = "Add Polyline Point"
+    bl_description = "Add the end of the selection to the polyline"
+
+    def execute(self, context):
+        props = context.scene.pt_props
+        transform = get_view_transform(context)
+        if transform is None:
+            return {'CANCELLED'}
+        x, y = transform.to_pixel(props.end[0], props.end[1])
+        props.polyline = props.polyline + [(x + 0.5, y + 0.5)]
+        redraw_all_areas()
+
+        return {'FINISHED'}
+
+
+class PT_PolylineDraw(bpy.types.Operator):
+
+    bl_idname = "paint.pt_polyline_draw"
+    bl_label = "Draw Polyline"
+    bl_description = "Draw the polyline and start a new one"
+    bl_options = {'REGISTER'}
+
+    def execute(self, context):
+        props = context.scene.pt_props
+        points = np.array(props.polyline, dtype=np.float64)
+        if len(points) < 2:
+            return {'CANCELLED'}
+        segs = np.concatenate([points[:-1], points[1:]], axis=1)
+        draw_segments(context, self.bl_label, segs)
+        props.polyline = []
+        redraw_all_areas()
+
+        return {'FINISHED'}
+
+
+class PT_PolylineClear(bpy.types.Operator):
+
+    bl_idname = "paint.pt_polyline_clear"
+    bl_label = "Clear Polyline"
+    bl_description = "Drop the polyline points"
+
+    def execute(self, context):
+        context.scene.pt_props.polyline = []
+        redraw_all_areas()
+
+        return {'FINISHED'}
+
+
+class PT_ResizeRect(bpy.types.Operator):
+
+    bl_idname = "paint.pt_resize_rect"
+    bl_label = "Resize Rect"
+    bl_description = "Create a new image from the resized selection"
+    bl_options = {'REGISTER', 'UNDO'}
+
+    def execute(self, context):
+        scene = context.scene
+        pixels = read_selection(context)
+        if pixels.size == 0:
+            return {'CANCELLED'}
+        h, w = pixels.shape[:2]
+        width = max(1, int(round(w * scene.pt_resize_scale)))
+        height = max(1, int(round(h * scene.pt_resize_scale)))
+        pixels = resampler.resize(
+            pixels, width, height, scene.pt_resize_filter)
+        img = get_active_image(context)
+        new_image(context, "{}_resized".format(img.name), pixels)
+
+        return {'FINISHED'}
+
+
+# GL copy of preview_renderer.result, refilled only when the result changes
+# and reallocated only when its size does
+preview_buffer = {'buffer': None, 'view': None, 'refreshes': -1,
+                  'size': (0, 0)}
+
+
+def get_buffer_view(buf):
+    # float32 view into the memory of a bgl.Buffer where it exposes the
+    # buffer protocol, so uploads are a single copy
+    try:
+        return np.frombuffer(memoryview(buf), dtype=np.float32)
+    except (TypeError, ValueError):
+        return None
+
+
+def upload_preview(result):
+    h, w = result.shape[:2]
+    if preview_buffer['buffer'] is None or preview_buffer['size'] != (w, h):
+        buf = bgl.Buffer(bgl.GL_FLOAT, [w * h * 4])
+        preview_buffer['buffer'] = buf
+        preview_buffer['view'] = get_buffer_view(buf)
+        preview_buffer['size'] = (w, h)
+    view = preview_buffer['view']
+    if view is not None:
+        view[...] = result.reshape(-1)
+    else:
+        preview_buffer['buffer'][:] = result.reshape(-1).tolist()
+
+
+def draw_preview(context):
+    scene = context.scene
+    props = scene.pt_props
+    sx0 = min(props.start[0], props.end[0])
+    sy0 = min(props.start[1], props.end[1])
+    sw = abs(props.end[0] - props.start[0])
+    sh = abs(props.end[1] - props.start[1])
+    if sw < 1 or sh < 1:
+        return
+
+    rect = get_pixel_rect_bb(context)
+    key = get_selection_key(context)
+    pw, ph = get_preview_size(
+        rect['x1'] - rect['x0'], rect['y1'] - rect['y0'], sw, sh,
+        scene.pt_preview_max_size)
+    if not preview_renderer.is_valid(key, pw, ph):
+        pixels = read_selection(context, get_view_zoom(context))
+        if pixels.size == 0:
+            return
+        preview_renderer.set_source(key, pixels, pw, ph)
+
+    mode = scene.pt_preview_mode
+    if preview_renderer.refresh(mode, get_pipeline_params(context, mode)) \
+            is None:
+        # throttled, draw the previous result and come back next frame
+        context.area.tag_redraw()
+    result = preview_renderer.result
+    if result is None:
+        return
+
+    if preview_buffer['refreshes'] != preview_renderer.refreshes:
+        # part of the refresh cost shown in the panel
+        start = time.perf_counter()
+        upload_preview(result)
+        preview_renderer.add_upload_time(time.perf_counter() - start)
+        preview_buffer['refreshes'] = preview_renderer.refreshes
+
+    w, h = preview_buffer['size']
+    bgl.glEnable(bgl.GL_BLEND)
+    bgl.glRasterPos2f(sx0, sy0)
+    bgl.glPixelZoom(sw / w, sh / h)
+    bgl.glDrawPixels(w, h, bgl.GL_RGBA, bgl.GL_FLOAT, preview_buffer['buffer'])
+    bgl.glPixelZoom(1.0, 1.0)
+    bgl.glDisable(bgl.GL_BLEND)
+
+
+class PT_ApplyPreview(bpy.types.Operator):
+
+    bl_idname = "paint.pt_apply_preview"
+    bl_label = "Apply Preview"
+    bl_description = "Apply the previewed operation at full resolution"
+
+    def execute(self, context):
+        mode = context.scene.pt_preview_mode
+        if mode == 'BINARIZE':
+            bpy.ops.paint.pt_binarize_rect()
+        elif mode == 'GRAY_SCALE':
+            bpy.ops.paint.pt_gray_scale_rect()
+        elif mode == 'BRIGHTNESS':
+            bpy.ops.paint.pt_change_brightness_rect()
+        elif mode == 'INVERT':
+            bpy.ops.paint.pt_invert_rect()
+        preview_renderer.clear()
+
+        return {'FINISHED'}
+
+
+class PT_BoxRenderer(bpy.types.Operator):
+
+    bl_idname = "paint.pt_box_renderer"
+    bl_label = "Box Renderer"
+    bl_description = "Bounding Box Renderer in Image Editor"
+
+    __handle = None
+
+    @staticmethod
+    def handle_add(self, context):
+        if PT_BoxRenderer.__handle is None:
+            PT_BoxRenderer.__handle = bpy.types.SpaceImageEditor.draw_handler_add(
+                PT_BoxRenderer.draw_bb,
+                (self, context), "WINDOW", "POST_PIXEL")
+
+    @staticmethod
+    def handle_remove(self, context):
+        if PT_BoxRenderer.__handle is not None:
+            bpy.types.SpaceImageEditor.draw_handler_remove(
+                PT_BoxRenderer.__handle, "WINDOW")
+            PT_BoxRenderer.__handle = None
+
+    @staticmethod
+    def draw_bb(self, context):
+        transform = capture_view(context)
+        props = context.scene.pt_props
+        x0, y0 = props.start
+        x1, y1 = props.end
+
+        verts = [
+            [x0, y0],
+            [x0, y1],
+            [x1, y1],
+            [x1, y0]
+        ]
+
+        if context.scene.pt_preview:
+            draw_preview(context)
+
+        bgl.glLineWidth(1)
+        bgl.glBegin(bgl.GL_LINE_LOOP)
+        bgl.glColor4f(1.0, 1.0, 1.0, 1.0)
+        for (x, y) in verts:
+            bgl.glVertex2f(x, y)
+        bgl.glEnd()
+
+        if props.polyline and transform is not None:
+            bgl.glBegin(bgl.GL_LINE_STRIP)
+            bgl.glColor4f(1.0, 1.0, 0.0, 1.0)
+            for (x, y) in transform.to_regions(props.polyline):
+                bgl.glVertex2f(x, y)
+            bgl.glEnd()
+
+    def __get_mouse_position(self, context, event):
+        mx, my = event.mouse_region_x, event.mouse_region_y
+        transform = get_view_transform(context)
+        if transform is not None:
+            return transform.clamp_region(mx, my)
+        min_x, min_y = context.region.view2d.view_to_region(0.0, 0.0)
+        max_x, max_y = context.region.view2d.view_to_region(1.0, 1.0)
+        if mx < min_x:
+            mx = min_x
+        elif mx > max_x:
+            mx = max_x
+        if my < min_y:
+            my = min_y
+        elif my > max_y:
+            my = max_y
+
+        return (mx, my)
+
+    def __request_redraw(self, context, force=False):
+        # only the region the box is drawn in is tagged, and only when the
+        # box changed; bursts of mouse moves are cut down to the redraw rate
+        props = context.scene.pt_props
+        redraw_scheduler.max_fps = context.scene.pt_redraw_fps
+        state = (tuple(props.start), tuple(props.end), props.selecting)
+        return redraw_scheduler.request(self.__region, state, force)
+
+    def __add_timer(self, context):
+        # wakes the operator up to perform a redraw held back by coalescing
+        if self.__timer is None:
+            self.__timer = context.window_manager.event_timer_add(
+                redraw_scheduler.get_interval(), context.window)
+
+    def __remove_timer(self, context):
+        if self.__timer is not None:
+            context.window_manager.event_timer_remove(self.__timer)
+            self.__timer = None
+
+    def modal(self, context, event):
+        props = context.scene.pt_props
+        if event.type in VIEW_EVENTS:
+            # recaptured by the redraw that follows the view change
+            view_cache.invalidate()
+        mr = self.__get_mouse_position(context, event)
+        if props.running is False:
+            props.start = mr
+            props.end = props.start
+            PT_BoxRenderer.handle_remove(self, context)
+            self.__remove_timer(context)
+            props.running = False
+            self.__request_redraw(context, True)
+            return {'FINISHED'}
+
+        region = context.region
+        m = event.mouse_region_x, event.mouse_region_y
+        is_inside = (0 <= m[0] < region.width) and (0 <= m[1] < region.height)
+
+        if event.type == 'TIMER':
+            if redraw_scheduler.flush():
+                update_selection_stats(context)
+        elif event.type == 'LEFTMOUSE':
+            if event.value == 'PRESS':
+                if not props.selecting and is_inside:
+                    clear_mask_selection(context)
+                    props.selecting = True
+                    props.start = mr
+                    props.end = props.start
+                    self.__add_timer(context)
+                    self.__request_redraw(context, True)
+                    return {'RUNNING_MODAL'}
+            elif event.value == 'RELEASE':
+                if props.selecting:
+                    props.selecting = False
+                    props.end = mr
+                    self.__remove_timer(context)
+                    update_selection_stats(context, True)
+                    self.__request_redraw(context, True)
+                    return {'RUNNING_MODAL'}
+        elif event.type == 'MOUSEMOVE':
+            if props.selecting:
+                props.end = mr
+                # statistics are only needed for frames that get drawn
+                if self.__request_redraw(context):
+                    update_selection_stats(context)
+
+        return {'PASS_THROUGH'}
+
+    def invoke(self, context, event):
+        props = context.scene.pt_props
+        if props.running is False:
+            PT_BoxRenderer.handle_add(self, context)
+            context.window_manager.modal_handler_add(self)
+            # the main region of the image editor the tool was started in
+            self.__region = get_view_region(context)[1]
+            self.__timer = None
+            redraw_scheduler.reset()
+            props.running = True
+            props.selecting = False
+            self.__request_redraw(context, True)
+            return {'RUNNING_MODAL'}
+        else:
+            props.running = False
+        return {'FINISHED'}
+
+
+class PT_JobRunner(bpy.types.Operator):
+
+    bl_idname = "paint.pt_job_runner"
+    bl_label = "Run Jobs"
+    bl_description = "Start queued background jobs and write their results back"
+
+    def __finish(self, context):
+        context.scene.pt_props.jobs_running = False
+        if self.__timer is not None:
+            context.window_manager.event_timer_remove(self.__timer)
+            self.__timer = None
+
+    def __poll(self, context):
+        committed, reports = job_queue.poll(
+            lambda job: start_job(context, job),
+            lambda job: commit_job(context, job))
+        for level, message in reports:
+            self.report({level}, message)
+        if committed:
+            redraw_all_areas()
+        else:
+            # progress in the panel
+            get_space('IMAGE_EDITOR', 'TOOLS', 'IMAGE_EDITOR',
+                      context)[1].tag_redraw()
+
+    def modal(self, context, event):
+        if event.type != 'TIMER':
+            return {'PASS_THROUGH'}
+        try:
+            self.__poll(context)
+        except Exception:
+            # the runner stops on the error; the next submit starts a new
+            # one for the jobs left
+            self.__finish(context)
+            raise
+        if len(job_queue) == 0:
+            self.__finish(context)
+            return {'FINISHED'}
+
+        return {'PASS_THROUGH'}
+
+    def invoke(self, context, event):
+        props = context.scene.pt_props
+        if props.jobs_running:
+            return {'CANCELLED'}
+        props.jobs_running = True
+        self.__timer = context.window_manager.event_timer_add(
+            JOB_POLL_INTERVAL, context.window)
+        context.window_manager.modal_handler_add(self)
+        self.__poll(context)
+
+        return {'RUNNING_MODAL'}
+
+    def cancel(self, context):
+        # called when Blender ends the modal operator, e.g. on window close
+        self.__finish(context)
+
+
+class PT_CancelJobs(bpy.types.Operator):
+
+    bl_idname = "paint.pt_cancel_jobs"
+    bl_label = "Cancel Jobs"
+    bl_description = "Stop all background jobs; nothing they computed is written"
+
+    def execute(self, context):
+        job_queue.cancel()
+
+        return {'FINISHED'}
+
+
+class PT_DumpProfile(bpy.types.Operator):
+
+    bl_idname = "paint.pt_dump_profile"
+    bl_label = "Dump Profile"
+    bl_description = "Write the profiling records to a JSON or CSV file"
+
+    def execute(self, context):
+        path = bpy.path.abspath(context.scene.pt_profile_path)
+        try:
+            n = profiler.dump(path)
+        except (IOError, OSError) as e:
+            self.report({'ERROR'}, str(e))
+            return {'CANCELLED'}
+        self.report({'INFO'}, "{} records written to {}".format(n, path))
+
+        return {'FINISHED'}
+
+
+class PT_ClearProfile(bpy.types.Operator):
+
+    bl_idname = "paint.pt_clear_profile"
+    bl_label = "Clear Profile"
+    bl_description = "Drop the profiling records"
+
+    def execute(self, context):
+        profiler.clear()
+
+        return {'FINISHED'}
+
+
+def instrument_operators():
+    # every operator with an execute is timed while profiling is enabled
+    for cls in list(globals().values()):
+        if not isinstance(cls, type) or \
+                not issubclass(cls, bpy.types.Operator) or \
+                cls in (PT_DumpProfile, PT_ClearProfile):
+            continue
+        execute = cls.__dict__.get('execute')
+        if execute is not None and not hasattr(execute, '__wrapped__'):
+            cls.execute = profiled(cls.bl_label, execute)
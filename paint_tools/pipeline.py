@@ -0,0 +1,151 @@
+import numpy as np
+
+from . import core
+
+
+POINT_OPS = ('BRIGHTNESS', 'INVERT')
+OVERWRITE_OPS = ('FILL', 'ERASE')
+
+
+def get_step_kernel(step):
+    op = step['op']
+    params = step['params']
+    if op == 'FILL':
+        return lambda p: core.kernel_fill(p, params['color'])
+    if op == 'ERASE':
+        return core.kernel_erase
+    if op == 'BINARIZE':
+        return lambda p: core.kernel_binarize(
+            p, params['threshold'], params['color'])
+    if op == 'GRAY_SCALE':
+        return lambda p: core.kernel_gray_scale(p, params['color'])
+    if op == 'BRIGHTNESS':
+        return lambda p: core.kernel_brightness(p, params['value'])
+    if op == 'INVERT':
+        return core.kernel_invert
+    raise ValueError("Unknown pipeline operation: {}".format(op))
+
+
+def get_step_affine(step):
+    # per channel mapping clip(a * x + c, lo, hi)
+    if step['op'] == 'BRIGHTNESS':
+        return (1.0, step['params']['value'], 0.0, 1.0)
+    if step['op'] == 'INVERT':
+        return (-1.0, 1.0, 0.0, 1.0)
+    return None
+
+
+def compose_affine(f, g):
+    a1, c1, l1, h1 = f
+    a2, c2, l2, h2 = g
+    lo = a2 * l1 + c2
+    hi = a2 * h1 + c2
+    if lo > hi:
+        lo, hi = hi, lo
+    lo = max(lo, l2)
+    hi = min(hi, h2)
+    if lo > hi:
+        # the two ranges do not overlap, the result is a constant
+        v = l2 if hi < l2 else h2
+        return (0.0, v, v, v)
+    return (a2 * a1, a2 * c1 + c2, lo, hi)
+
+
+def make_affine_kernel(affine):
+    a, c, lo, hi = affine
+
+    def kernel(p):
+        rgb = p[..., :3]
+        if a != 1.0:
+            np.multiply(rgb, a, out=rgb)
+        if c != 0.0:
+            np.add(rgb, c, out=rgb)
+        np.clip(rgb, lo, hi, out=rgb)
+        return p
+
+    return kernel
+
+
+class Pipeline():
+
+    def __init__(self, steps=None):
+        self.steps = []
+        for step in steps or []:
+            self.add(step['op'], **step['params'])
+
+    def add(self, op, **params):
+        step = {'op': op, 'params': params}
+        get_step_kernel(step)
+        self.steps.append(step)
+        return step
+
+    def pop(self):
+        if self.steps:
+            return self.steps.pop()
+        return None
+
+    def clear(self):
+        self.steps = []
+
+    def __len__(self):
+        return len(self.steps)
+
+    def describe(self):
+        lines = []
+        for step in self.steps:
+            params = ", ".join(
+                "{}={}".format(k, format_param(v))
+                for k, v in sorted(step['params'].items()))
+            lines.append("{}({})".format(step['op'], params))
+        return lines
+
+    def get_fused_steps(self):
+        steps = list(self.steps)
+        # anything before the last fill/erase is overwritten anyway
+        for i in range(len(steps) - 1, -1, -1):
+            if steps[i]['op'] in OVERWRITE_OPS:
+                steps = steps[i:]
+                break
+
+        fused = []
+        for step in steps:
+            affine = get_step_affine(step)
+            if affine is not None and fused and fused[-1][0] == 'AFFINE':
+                fused[-1] = ('AFFINE', compose_affine(fused[-1][1], affine))
+            elif affine is not None:
+                fused.append(('AFFINE', affine))
+            else:
+                fused.append(('STEP', step))
+        return fused
+
+    def get_kernel(self):
+        kernels = []
+        for kind, value in self.get_fused_steps():
+            if kind == 'AFFINE':
+                kernels.append(make_affine_kernel(value))
+            else:
+                kernels.append(get_step_kernel(value))
+
+        # every step runs on the same tile while it is hot in the cache
+        def kernel(p):
+            for k in kernels:
+                k(p)
+            return p
+
+        return kernel
+
+    def run(self, engine, source, rect):
+        return engine.apply(source, rect, self.get_kernel())
+
+    def apply(self, pixels, rect):
+        x0, y0, x1, y1 = core.clip_rect(pixels, rect)
+        self.get_kernel()(pixels[y0:y1, x0:x1])
+        return (x0, y0, x1, y1)
+
+
+def format_param(v):
+    if isinstance(v, float):
+        return "{:.3f}".format(v)
+    if isinstance(v, (tuple, list)):
+        return "(" + ", ".join(format_param(x) for x in v) + ")"
+    return str(v)
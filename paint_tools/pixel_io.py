@@ -0,0 +1,229 @@
+import numpy as np
+
+
+# dirty spans covering more than this share of the image are written with
+# one bulk write; per span slices convert element by element in Blender
+BULK_WRITE_RATIO = 0.5
+
+
+class DirtyRegions():
+
+    def __init__(self, width, height):
+        self.width = width
+        self.height = height
+        self.__rects = []
+
+    def add(self, x0, y0, x1, y1):
+        x0 = min(max(0, x0), self.width)
+        x1 = min(max(0, x1), self.width)
+        y0 = min(max(0, y0), self.height)
+        y1 = min(max(0, y1), self.height)
+        if x0 >= x1 or y0 >= y1:
+            return
+        rect = (x0, y0, x1, y1)
+        # merge until the new box no longer overlaps or shares an edge with
+        # any other one; boxes meeting only at a corner stay apart, their
+        # bounding box would add pixels nobody changed
+        merged = True
+        while merged:
+            merged = False
+            for r in self.__rects:
+                x_overlap = rect[0] < r[2] and r[0] < rect[2]
+                y_overlap = rect[1] < r[3] and r[1] < rect[3]
+                x_touch = rect[0] <= r[2] and r[0] <= rect[2]
+                y_touch = rect[1] <= r[3] and r[1] <= rect[3]
+                if (x_overlap and y_touch) or (y_overlap and x_touch):
+                    self.__rects.remove(r)
+                    rect = (min(rect[0], r[0]), min(rect[1], r[1]),
+                            max(rect[2], r[2]), max(rect[3], r[3]))
+                    merged = True
+                    break
+        self.__rects.append(rect)
+
+    def add_all(self):
+        self.add(0, 0, self.width, self.height)
+
+    def rects(self):
+        return list(self.__rects)
+
+    def is_empty(self):
+        return len(self.__rects) == 0
+
+    def clear(self):
+        self.__rects = []
+
+    def num_pixels(self):
+        return sum((r[2] - r[0]) * (r[3] - r[1]) for r in self.__rects)
+
+    def spans(self):
+        w = self.width
+        spans = []
+        for x0, y0, x1, y1 in self.__rects:
+            if x0 == 0 and x1 == w:
+                spans.append((y0 * w * 4, y1 * w * 4))
+            else:
+                for y in range(y0, y1):
+                    spans.append(((y * w + x0) * 4, (y * w + x1) * 4))
+        spans.sort()
+        # join spans which are contiguous in the flat pixel array
+        joined = []
+        for s in spans:
+            if joined and s[0] <= joined[-1][1]:
+                joined[-1] = (joined[-1][0], max(joined[-1][1], s[1]))
+            else:
+                joined.append(s)
+        return joined
+
+
+class BlenderPixelIO():
+
+    def read(self, image, buf):
+        pixels = image.pixels
+        if hasattr(pixels, 'foreach_get'):
+            # bulk copy through the buffer protocol, no Python float objects
+            pixels.foreach_get(buf)
+        else:
+            buf[:] = pixels[:]
+
+    def write(self, image, buf):
+        pixels = image.pixels
+        if hasattr(pixels, 'foreach_set'):
+            pixels.foreach_set(buf)
+        else:
+            pixels[:] = buf
+        image.update()
+
+    def write_spans(self, image, buf, spans):
+        pixels = image.pixels
+        for start, end in spans:
+            pixels[start:end] = buf[start:end]
+        image.update()
+
+    def read_span(self, image, start, out):
+        out[:] = image.pixels[start:start + len(out)]
+
+    def write_span(self, image, start, src):
+        image.pixels[start:start + len(src)] = src
+
+    def update(self, image):
+        image.update()
+
+
+class NumpyPixelIO():
+
+    def read(self, image, buf):
+        np.copyto(buf, image.pixels, casting='same_kind')
+
+    def write(self, image, buf):
+        np.copyto(image.pixels, buf, casting='same_kind')
+
+    def write_spans(self, image, buf, spans):
+        for start, end in spans:
+            image.pixels[start:end] = buf[start:end]
+
+    def read_span(self, image, start, out):
+        out[:] = image.pixels[start:start + len(out)]
+
+    def write_span(self, image, start, src):
+        image.pixels[start:start + len(src)] = src
+
+    def update(self, image):
+        pass
+
+
+class NumpyImage():
+
+    def __init__(self, name, width, height, pixels=None):
+        self.name = name
+        self.size = (width, height)
+        if pixels is None:
+            pixels = np.zeros(width * height * 4, dtype=np.float32)
+        self.pixels = pixels
+
+    def update(self):
+        pass
+
+
+class PixelTransfer():
+
+    def __init__(self, backend=None):
+        if backend is None:
+            backend = BlenderPixelIO()
+        self.backend = backend
+        self.__buffer = None
+        self.bytes_read = 0
+        self.bytes_written = 0
+        self.last_bytes_read = 0
+        self.last_bytes_written = 0
+
+    def buffer(self, length):
+        buf = self.__buffer
+        if buf is None or len(buf) != length:
+            buf = np.empty(length, dtype=np.float32)
+            self.__buffer = buf
+        return buf
+
+    def begin(self):
+        self.last_bytes_read = 0
+        self.last_bytes_written = 0
+
+    def read(self, image, out=None):
+        buf = out
+        if buf is None:
+            buf = self.buffer(len(image.pixels))
+        self.backend.read(image, buf)
+        self.last_bytes_read += buf.nbytes
+        self.bytes_read += buf.nbytes
+        return buf
+
+    def write(self, image, buf, dirty=None):
+        if dirty is None:
+            self.backend.write(image, buf)
+            nbytes = buf.nbytes
+        elif dirty.num_pixels() * 4 > len(buf) * BULK_WRITE_RATIO:
+            self.backend.write(image, buf)
+            nbytes = buf.nbytes
+        else:
+            spans = dirty.spans()
+            if spans:
+                self.backend.write_spans(image, buf, spans)
+            nbytes = sum(e - s for s, e in spans) * buf.itemsize
+        self.last_bytes_written += nbytes
+        self.bytes_written += nbytes
+        return nbytes
+
+    def __rect_rows(self, image, x0, y0, x1, y1, buf):
+        w = image.size[0]
+        flat = buf.reshape((y1 - y0, -1))
+        if x0 == 0 and x1 == w:
+            # full width rows are contiguous in the image as well
+            yield (y0 * w * 4, buf.reshape(-1))
+        else:
+            for i, y in enumerate(range(y0, y1)):
+                yield ((y * w + x0) * 4, flat[i])
+
+    def read_rect(self, image, x0, y0, x1, y1, out):
+        for start, row in self.__rect_rows(image, x0, y0, x1, y1, out):
+            self.backend.read_span(image, start, row)
+        self.last_bytes_read += out.nbytes
+        self.bytes_read += out.nbytes
+        return out
+
+    def write_rect(self, image, x0, y0, x1, y1, src):
+        for start, row in self.__rect_rows(image, x0, y0, x1, y1, src):
+            self.backend.write_span(image, start, row)
+        self.last_bytes_written += src.nbytes
+        self.bytes_written += src.nbytes
+        return src.nbytes
+
+    def update(self, image):
+        self.backend.update(image)
+
+    def reset_stats(self):
+        self.bytes_read = 0
+        self.bytes_written = 0
+        self.last_bytes_read = 0
+        self.last_bytes_written = 0
+
+
+pixel_transfer = PixelTransfer()
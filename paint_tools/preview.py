@@ -0,0 +1,106 @@
+import time
+from collections import deque
+
+import numpy as np
+
+from .lut import LutEngine
+
+
+DEFAULT_PREVIEW_FPS = 30
+DEFAULT_PREVIEW_MAX_SIZE = 1024
+
+
+def downsample(pixels, width, height):
+    # nearest neighbour; the preview only has to match the screen
+    h, w = pixels.shape[:2]
+    ys = np.arange(height) * h // height
+    xs = np.arange(width) * w // width
+    return pixels[np.ix_(ys, xs)]
+
+
+def get_preview_size(src_width, src_height, screen_width, screen_height,
+                     max_size=DEFAULT_PREVIEW_MAX_SIZE):
+    width = max(1, min(src_width, int(screen_width)))
+    height = max(1, min(src_height, int(screen_height)))
+    scale = min(1.0, float(max_size) / max(width, height))
+    return (max(1, int(width * scale)), max(1, int(height * scale)))
+
+
+class PreviewRenderer():
+
+    def __init__(self, fps=DEFAULT_PREVIEW_FPS):
+        self.fps = fps
+        self.lut = LutEngine()
+        self.result = None
+        self.__state = None
+        self.__last_refresh = 0.0
+        self.__timings = deque(maxlen=30)
+        self.refreshes = 0
+        self.throttled = 0
+
+    def set_source(self, key, pixels, width, height):
+        key = (key, width, height)
+        if self.lut.key == key:
+            return False
+        self.lut.set_source(key, downsample(pixels, width, height))
+        self.__state = None
+        return True
+
+    def is_valid(self, key, width, height):
+        return self.lut.key == (key, width, height)
+
+    def __compute(self, mode, params, out):
+        if mode == 'BINARIZE':
+            return self.lut.binarize(params['threshold'], params['color'], out)
+        if mode == 'GRAY_SCALE':
+            return self.lut.gray_scale(params['color'], out)
+        if mode == 'BRIGHTNESS':
+            return self.lut.brightness(params['value'], out)
+        if mode == 'INVERT':
+            return self.lut.invert(out)
+        raise ValueError("Unknown preview mode: {}".format(mode))
+
+    def refresh(self, mode, params, force=False):
+        # True: result changed, False: already up to date,
+        # None: throttled, the caller has to retry later
+        state = (mode, tuple(sorted(params.items())))
+        if state == self.__state and self.result is not None:
+            return False
+        now = time.perf_counter()
+        if not force and now - self.__last_refresh < 1.0 / self.fps:
+            self.throttled += 1
+            return None
+
+        h, w = self.lut.shape()
+        if self.result is None or self.result.shape[:2] != (h, w):
+            self.result = np.empty((h, w, 4), dtype=np.float32)
+        self.__compute(mode, params, self.result)
+        self.__state = state
+
+        end = time.perf_counter()
+        self.__last_refresh = end
+        self.__timings.append(end - now)
+        self.refreshes += 1
+        return True
+
+    def add_upload_time(self, seconds):
+        # the caller's copy of the result to the GPU counts to the refresh
+        if self.__timings:
+            self.__timings[-1] += seconds
+
+    def get_refresh_time(self):
+        if not self.__timings:
+            return 0.0
+        return sum(self.__timings) / len(self.__timings)
+
+    def get_max_fps(self):
+        t = self.get_refresh_time()
+        return 1.0 / t if t > 0.0 else 0.0
+
+    def clear(self):
+        self.lut.clear()
+        self.result = None
+        self.__state = None
+
+
+preview_renderer = PreviewRenderer()
@@ -0,0 +1,156 @@
+import csv
+import functools
+import io
+import json
+import time
+import tracemalloc
+from collections import deque
+
+from .pixel_io import pixel_transfer
+
+
+DEFAULT_PROFILE_SIZE = 256
+CSV_FIELDS = ['time', 'op', 'seconds', 'pixels', 'bytes_read',
+              'bytes_written', 'peak_memory', 'phases']
+
+
+class NullPhase():
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, tb):
+        return False
+
+
+NULL_PHASE = NullPhase()
+
+
+class Phase():
+
+    def __init__(self, record, name):
+        self.record = record
+        self.name = name
+        self.start = 0.0
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc_value, tb):
+        phases = self.record['phases']
+        phases[self.name] = phases.get(self.name, 0.0) + \
+            time.perf_counter() - self.start
+        return False
+
+
+class Profiler():
+
+    def __init__(self, size=DEFAULT_PROFILE_SIZE):
+        # checked before anything else, so a disabled profiler costs one
+        # attribute lookup per call
+        self.enabled = False
+        self.track_memory = False
+        self.records = deque(maxlen=size)
+        self.__current = None
+        self.__counters = (0, 0)
+        self.__tracing = False
+
+    def set_size(self, size):
+        if size != self.records.maxlen:
+            self.records = deque(self.records, maxlen=size)
+
+    def begin(self, name):
+        self.__current = {
+            'time': time.time(), 'op': name, 'seconds': 0.0, 'pixels': 0,
+            'bytes_read': 0, 'bytes_written': 0, 'peak_memory': None,
+            'phases': {}}
+        self.__counters = (pixel_transfer.bytes_read,
+                           pixel_transfer.bytes_written)
+        # tracemalloc cannot reset its peak before Python 3.9, so tracing
+        # is restarted for every operator
+        self.__tracing = self.track_memory and not tracemalloc.is_tracing()
+        if self.__tracing:
+            tracemalloc.start()
+        self.__start = time.perf_counter()
+
+    def end(self):
+        record = self.__current
+        if record is None:
+            return None
+        record['seconds'] = time.perf_counter() - self.__start
+        record['bytes_read'] = pixel_transfer.bytes_read - self.__counters[0]
+        record['bytes_written'] = \
+            pixel_transfer.bytes_written - self.__counters[1]
+        if self.__tracing:
+            record['peak_memory'] = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+            self.__tracing = False
+        self.records.append(record)
+        self.__current = None
+        return record
+
+    def is_active(self):
+        return self.__current is not None
+
+    def phase(self, name):
+        if self.__current is None:
+            return NULL_PHASE
+        return Phase(self.__current, name)
+
+    def add_pixels(self, n):
+        if self.__current is not None:
+            self.__current['pixels'] += n
+
+    def last(self, n):
+        return list(self.records)[-n:]
+
+    def summary(self):
+        # per operator: (calls, total seconds, total pixels)
+        ops = {}
+        for r in self.records:
+            calls, seconds, pixels = ops.get(r['op'], (0, 0.0, 0))
+            ops[r['op']] = (calls + 1, seconds + r['seconds'],
+                            pixels + r['pixels'])
+        return ops
+
+    def to_json(self):
+        return json.dumps(list(self.records), indent=1, sort_keys=True)
+
+    def to_csv(self):
+        out = io.StringIO()
+        writer = csv.DictWriter(out, CSV_FIELDS)
+        writer.writeheader()
+        for r in self.records:
+            row = dict(r)
+            row['phases'] = ";".join(
+                "{}={:.6f}".format(k, v) for k, v in sorted(r['phases'].items()))
+            writer.writerow(row)
+        return out.getvalue()
+
+    def dump(self, path):
+        text = self.to_csv() if path.lower().endswith('.csv') \
+            else self.to_json()
+        with open(path, 'w') as f:
+            f.write(text)
+        return len(self.records)
+
+    def clear(self):
+        self.records.clear()
+
+
+profiler = Profiler()
+
+
+def profiled(name, execute):
+    @functools.wraps(execute)
+    def wrapper(self, context):
+        # nested operators (Apply Preview) count towards the outer one
+        if not profiler.enabled or profiler.is_active():
+            return execute(self, context)
+        profiler.begin(name)
+        try:
+            return execute(self, context)
+        finally:
+            profiler.end()
+    return wrapper
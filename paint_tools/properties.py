@@ -0,0 +1,378 @@
+import bpy
+from bpy.props import (
+    FloatVectorProperty,
+    FloatProperty,
+    IntProperty,
+    EnumProperty,
+    BoolProperty,
+    StringProperty,
+)
+
+from .cache import DEFAULT_CACHE_BUDGET
+from .formats import DEFAULT_STORAGE_MODE
+from .pipeline import Pipeline
+from .history import DEFAULT_HISTORY_LIMIT
+from .filters import DEFAULT_FILTER_RADIUS, DEFAULT_SHARPEN_AMOUNT
+from .resample import DEFAULT_RESAMPLE_FILTER
+from .composite import DEFAULT_BLEND_MODE
+from .profiling import DEFAULT_PROFILE_SIZE, profiler
+from .redraw import DEFAULT_REDRAW_FPS
+from .raster import DEFAULT_STROKE_WIDTH
+from .jobs import DEFAULT_JOB_WORKERS
+from .preview import DEFAULT_PREVIEW_MAX_SIZE
+from .stats import DEFAULT_STATS_MEMORY
+from .operators import redraw_all_areas
+from .clipboard import (
+    DEFAULT_CLIPBOARD_BUDGET,
+    DEFAULT_CLIPBOARD_FORMAT,
+    DEFAULT_SLOT,
+    get_compressions,
+)
+from .tiles import DEFAULT_TILE_SIZE, DEFAULT_MEMORY_LIMIT, DEFAULT_WORKERS
+
+
+class PTProps():
+    running = False
+    selecting = False
+    start = (0.0, 0.0)
+    end = (0.0, 0.0)
+    pipeline = Pipeline()
+    selection_stats = None
+    region_stats = None
+    mask_selection = None
+    mask_image = None
+    polyline = []
+    jobs_running = False
+
+
+def update_preview(self, context):
+    if context.scene.pt_preview:
+        redraw_all_areas()
+
+
+def update_profiler(self, context):
+    scene = context.scene
+    profiler.enabled = scene.pt_profile
+    profiler.track_memory = scene.pt_profile_memory
+    profiler.set_size(scene.pt_profile_size)
+
+
+def init_props():
+    scene = bpy.types.Scene
+    scene.pt_props = PTProps()
+    scene.pt_fill_color = FloatVectorProperty(
+        name="Fill Color",
+        description="Filled by this color",
+        subtype='COLOR_GAMMA',
+        default=(1.0, 1.0, 1.0),
+        min=0.0,
+        max=1.0)
+    scene.pt_binarize_threshold_color = EnumProperty(
+        name="Threshold Color",
+        description="Binarize Threshold Color",
+        items=[
+            ('RED', "Red", "Red"),
+            ('GREEN', "Green", "Green"),
+            ('BLUE', "Blue", "Blue")],
+        default='RED',
+        update=update_preview)
+    scene.pt_binarize_threshold = IntProperty(
+        name="Threshold",
+        description="Binarize Threshold",
+        default=128,
+        min=0,
+        max=255,
+        update=update_preview)
+    scene.pt_gray_scale_color = EnumProperty(
+        name="Gray Scale Color",
+        description="Gray Scale Color",
+        items=[
+            ('NTSC', "NTSC", "NTSC"),
+            ('AVERAGE', "Average", "Average"),
+            ('RED', "Red", "Red"),
+            ('GREEN', "Green", "Green"),
+            ('BLUE', "Blue", "Blue")],
+        default='NTSC',
+        update=update_preview)
+    scene.pt_change_brightness_value = IntProperty(
+        name="Brightness",
+        description="Brightness",
+        default=0,
+        min=-255,
+        max=255,
+        update=update_preview)
+    scene.pt_tile_size = IntProperty(
+        name="Tile Size",
+        description="Width and height of the tiles processed at once",
+        default=DEFAULT_TILE_SIZE,
+        min=16,
+        max=4096)
+    scene.pt_memory_limit = IntProperty(
+        name="Memory Limit",
+        description="Upper bound of the tile working memory (MB)",
+        default=DEFAULT_MEMORY_LIMIT // (1024 * 1024),
+        min=1,
+        max=65536)
+    scene.pt_workers = IntProperty(
+        name="Workers",
+        description="Number of threads processing tiles (0: one per CPU)",
+        default=DEFAULT_WORKERS,
+        min=0,
+        max=256)
+
+    scene.pt_use_cache = BoolProperty(
+        name="Use Cache",
+        description="Keep decoded pixels in memory between operations",
+        default=True)
+    scene.pt_cache_lazy_flush = BoolProperty(
+        name="Lazy Flush",
+        description="Write cached edits back to the image only on demand",
+        default=False)
+    scene.pt_cache_budget = IntProperty(
+        name="Cache Budget",
+        description="Memory available to the image cache (MB)",
+        default=DEFAULT_CACHE_BUDGET // (1024 * 1024),
+        min=16,
+        max=1048576)
+    scene.pt_pipeline_op = EnumProperty(
+        name="Pipeline Operation",
+        description="Operation recorded by Add Step",
+        items=[
+            ('GRAY_SCALE', "Gray Scale", "Gray Scale"),
+            ('BINARIZE', "Binarize", "Binarize"),
+            ('BRIGHTNESS', "Brightness", "Change Brightness"),
+            ('INVERT', "Invert", "Invert"),
+            ('FILL', "Fill", "Fill"),
+            ('ERASE', "Erase", "Erase")],
+        default='GRAY_SCALE')
+    scene.pt_clipboard_slot = StringProperty(
+        name="Clipboard Slot",
+        description="Clipboard slot used by Copy, Cut and Paste",
+        default=DEFAULT_SLOT)
+    scene.pt_clipboard_format = EnumProperty(
+        name="Clipboard Format",
+        description="Storage format of copied pixels",
+        items=[
+            ('AUTO', "Auto",
+             "8 bit for 8 bit images, 32 bit float for float images; "
+             "lossless"),
+            ('FLOAT32', "Float", "32 bit float, lossless"),
+            ('HALF', "Half",
+             "16 bit float, about 3 decimal digits, up to 65504"),
+            ('UINT8', "8 bit", "8 bit per channel, clamped to [0, 1]")],
+        default=DEFAULT_CLIPBOARD_FORMAT)
+    scene.pt_clipboard_compression = EnumProperty(
+        name="Clipboard Compression",
+        description="Compression of copied pixels",
+        items=[(c, c.capitalize(), c.capitalize())
+               for c in get_compressions()],
+        default='ZLIB')
+    scene.pt_clipboard_budget = IntProperty(
+        name="Clipboard Budget",
+        description="Memory available to all clipboard slots (MB)",
+        default=DEFAULT_CLIPBOARD_BUDGET // (1024 * 1024),
+        min=1,
+        max=65536)
+    scene.pt_use_history = BoolProperty(
+        name="Use History",
+        description="Record the tiles each edit touches for Undo/Redo",
+        default=True)
+    scene.pt_history_limit = IntProperty(
+        name="History Limit",
+        description="Memory available to the undo history (MB)",
+        default=DEFAULT_HISTORY_LIMIT // (1024 * 1024),
+        min=1,
+        max=65536)
+    scene.pt_preview = BoolProperty(
+        name="Preview",
+        description="Show the filtered selection before applying it",
+        default=False,
+        update=update_preview)
+    scene.pt_preview_mode = EnumProperty(
+        name="Preview Mode",
+        description="Operation shown in the preview",
+        items=[
+            ('BINARIZE', "Binarize", "Binarize"),
+            ('GRAY_SCALE', "Gray Scale", "Gray Scale"),
+            ('BRIGHTNESS', "Brightness", "Change Brightness"),
+            ('INVERT', "Invert", "Invert")],
+        default='BINARIZE',
+        update=update_preview)
+    scene.pt_preview_max_size = IntProperty(
+        name="Preview Size",
+        description="Largest side of the preview in pixels",
+        default=DEFAULT_PREVIEW_MAX_SIZE,
+        min=16,
+        max=8192,
+        update=update_preview)
+    scene.pt_show_stats = BoolProperty(
+        name="Statistics",
+        description="Compute statistics of the selection while selecting",
+        default=False)
+    scene.pt_stats_memory = IntProperty(
+        name="Statistics Memory",
+        description="Memory for summed-area tables (MB); larger images are "
+                    "summarised on a downsampled level",
+        default=DEFAULT_STATS_MEMORY // (1024 * 1024),
+        min=1,
+        max=65536)
+    scene.pt_wand_tolerance = IntProperty(
+        name="Tolerance",
+        description="Largest per channel difference to the seed color",
+        default=25,
+        min=0,
+        max=255)
+    scene.pt_filter_radius = IntProperty(
+        name="Radius",
+        description="Radius of the blur and sharpen kernels (pixel)",
+        default=DEFAULT_FILTER_RADIUS,
+        min=1,
+        max=512)
+    scene.pt_sharpen_amount = FloatProperty(
+        name="Amount",
+        description="Strength of the sharpen filter",
+        default=DEFAULT_SHARPEN_AMOUNT,
+        min=0.0,
+        max=10.0)
+    scene.pt_resize_scale = FloatProperty(
+        name="Scale",
+        description="Size of the resized image relative to the selection",
+        default=0.5,
+        min=0.01,
+        max=16.0)
+    scene.pt_resize_filter = EnumProperty(
+        name="Filter",
+        description="Resampling filter",
+        items=[
+            ('NEAREST', "Nearest", "Nearest neighbour"),
+            ('BILINEAR', "Bilinear", "Bilinear (triangle) filter"),
+            ('LANCZOS', "Lanczos", "Lanczos filter with 3 lobes"),
+        ],
+        default=DEFAULT_RESAMPLE_FILTER)
+    scene.pt_blend_mode = EnumProperty(
+        name="Blend Mode",
+        description="How Paste and Fill combine with the image",
+        items=[
+            ('REPLACE', "Replace", "Overwrite the pixels, alpha included"),
+            ('OVER', "Over", "Alpha compositing"),
+            ('MULTIPLY', "Multiply", "Multiply the colors"),
+            ('SCREEN', "Screen", "Screen the colors"),
+            ('ADD', "Add", "Add the colors"),
+            ('PREMULTIPLIED', "Premultiplied",
+             "Alpha compositing of premultiplied colors"),
+        ],
+        default=DEFAULT_BLEND_MODE)
+    scene.pt_blend_opacity = FloatProperty(
+        name="Opacity",
+        description="Opacity of Paste and Fill",
+        default=1.0,
+        min=0.0,
+        max=1.0,
+        subtype='FACTOR')
+    scene.pt_profile = BoolProperty(
+        name="Profile",
+        description="Record timings, pixel counts and bytes moved by every operator",
+        default=False,
+        update=update_profiler)
+    scene.pt_profile_memory = BoolProperty(
+        name="Track Memory",
+        description="Record the peak memory of every operator (tracemalloc, slow)",
+        default=False,
+        update=update_profiler)
+    scene.pt_profile_size = IntProperty(
+        name="Records",
+        description="Number of profiling records kept",
+        default=DEFAULT_PROFILE_SIZE,
+        min=1,
+        max=65536,
+        update=update_profiler)
+    scene.pt_profile_path = StringProperty(
+        name="Profile File",
+        description="File written by Dump Profile (.json or .csv)",
+        default="//paint_tools_profile.json",
+        subtype='FILE_PATH')
+    scene.pt_redraw_fps = IntProperty(
+        name="Redraw Rate",
+        description="Most image editor redraws per second while dragging a selection",
+        default=DEFAULT_REDRAW_FPS,
+        min=1,
+        max=240)
+    scene.pt_stroke_width = FloatProperty(
+        name="Stroke Width",
+        description="Width of lines and outlines (pixel)",
+        default=DEFAULT_STROKE_WIDTH,
+        min=0.1,
+        max=256.0)
+    scene.pt_shape_fill = BoolProperty(
+        name="Fill Shape",
+        description="Fill rectangles and ellipses instead of outlining them",
+        default=False)
+    scene.pt_storage_mode = EnumProperty(
+        name="Storage",
+        description="Pixel format of cached images",
+        items=[
+            ('FLOAT32', "Float", "32 bit float for every image"),
+            ('AUTO', "Auto",
+             "8 bit images as 8 bit integers (4x less memory), float "
+             "images as 32 bit float"),
+            ('COMPACT', "Compact",
+             "8 bit images as 8 bit integers, float images as 16 bit float"),
+        ],
+        default=DEFAULT_STORAGE_MODE)
+    scene.pt_background = BoolProperty(
+        name="Run in Background",
+        description="Compute fills, color operations, pipelines and filters "
+                    "on a worker thread; results are written back when done",
+        default=False)
+    scene.pt_job_workers = IntProperty(
+        name="Job Workers",
+        description="Background jobs running at once, on different images "
+                    "(0: one per CPU)",
+        default=DEFAULT_JOB_WORKERS,
+        min=0,
+        max=64)
+
+
+def clear_props():
+    scene = bpy.types.Scene
+    del scene.pt_fill_color
+    del scene.pt_props
+    del scene.pt_binarize_threshold
+    del scene.pt_binarize_threshold_color
+    del scene.pt_gray_scale_color
+    del scene.pt_change_brightness_value
+    del scene.pt_tile_size
+    del scene.pt_memory_limit
+    del scene.pt_workers
+    del scene.pt_use_cache
+    del scene.pt_cache_lazy_flush
+    del scene.pt_cache_budget
+    del scene.pt_pipeline_op
+    del scene.pt_clipboard_slot
+    del scene.pt_clipboard_format
+    del scene.pt_clipboard_compression
+    del scene.pt_clipboard_budget
+    del scene.pt_use_history
+    del scene.pt_history_limit
+    del scene.pt_preview
+    del scene.pt_preview_mode
+    del scene.pt_preview_max_size
+    del scene.pt_show_stats
+    del scene.pt_stats_memory
+    del scene.pt_wand_tolerance
+    del scene.pt_filter_radius
+    del scene.pt_sharpen_amount
+    del scene.pt_resize_scale
+    del scene.pt_resize_filter
+    del scene.pt_blend_mode
+    del scene.pt_blend_opacity
+    del scene.pt_profile
+    del scene.pt_profile_memory
+    del scene.pt_profile_size
+    del scene.pt_profile_path
+    del scene.pt_redraw_fps
+    del scene.pt_stroke_width
+    del scene.pt_shape_fill
+    del scene.pt_storage_mode
+    del scene.pt_background
+    del scene.pt_job_workers
@@ -0,0 +1,92 @@
+import math
+
+import numpy as np
+
+from .formats import get_scale
+
+
+def downsample_half(src, out, x0=0, y0=0, x1=None, y1=None):
+    # 2x2 box filter of src into the (x0, y0)-(x1, y1) box of out; levels
+    # above the base are float32 whatever the base is stored as
+    if x1 is None:
+        x1 = out.shape[1]
+    if y1 is None:
+        y1 = out.shape[0]
+    dst = out[y0:y1, x0:x1]
+    sy0, sy1 = y0 * 2, y1 * 2
+    sx0, sx1 = x0 * 2, x1 * 2
+    np.add(src[sy0:sy1:2, sx0:sx1:2], src[sy0 + 1:sy1:2, sx0:sx1:2], out=dst,
+           dtype=dst.dtype)
+    dst += src[sy0:sy1:2, sx0 + 1:sx1:2]
+    dst += src[sy0 + 1:sy1:2, sx0 + 1:sx1:2]
+    dst *= 0.25 / get_scale(src.dtype)
+    return out
+
+
+class MipPyramid():
+
+    def __init__(self, base):
+        self.levels = [base]
+        # per level list of boxes that still have to be recomputed
+        self.__dirty = [[]]
+
+    def num_levels(self):
+        h, w = self.levels[0].shape[:2]
+        return int(math.log(max(1, min(w, h)), 2)) + 1
+
+    def get_level_size(self, level):
+        h, w = self.levels[0].shape[:2]
+        return (max(1, w >> level), max(1, h >> level))
+
+    def level_for_zoom(self, zoom):
+        # zoom is screen pixels per image pixel
+        if zoom <= 0.0 or zoom >= 1.0:
+            return 0
+        level = int(math.floor(math.log(1.0 / zoom, 2)))
+        return min(level, self.num_levels() - 1)
+
+    def get_level(self, level):
+        level = min(level, self.num_levels() - 1)
+        while len(self.levels) <= level:
+            parent = self.levels[-1]
+            w, h = self.get_level_size(len(self.levels))
+            out = np.empty((h, w, 4), dtype=np.float32)
+            downsample_half(parent, out)
+            self.levels.append(out)
+            self.__dirty.append([])
+        for n in range(1, level + 1):
+            self.__update(n)
+        return self.levels[level]
+
+    def __update(self, level):
+        for x0, y0, x1, y1 in self.__dirty[level]:
+            downsample_half(self.levels[level - 1], self.levels[level],
+                            x0, y0, x1, y1)
+        self.__dirty[level] = []
+
+    def invalidate(self, x0, y0, x1, y1):
+        x0 = max(0, x0)
+        y0 = max(0, y0)
+        for n in range(1, len(self.levels)):
+            x0 //= 2
+            y0 //= 2
+            x1 = (x1 + 1) // 2
+            y1 = (y1 + 1) // 2
+            h, w = self.levels[n].shape[:2]
+            box = (min(x0, w), min(y0, h), min(x1, w), min(y1, h))
+            if box[0] < box[2] and box[1] < box[3]:
+                self.__dirty[n].append(box)
+
+    def get_region(self, level, rect):
+        # (x0, y0, x1, y1) of level 0 scaled down to the level
+        pixels = self.get_level(level)
+        s = 1 << level
+        h, w = pixels.shape[:2]
+        x0 = min(max(0, rect[0] // s), w)
+        y0 = min(max(0, rect[1] // s), h)
+        x1 = min(max(x0, -(-rect[2] // s)), w)
+        y1 = min(max(y0, -(-rect[3] // s)), h)
+        return pixels[y0:y1, x0:x1]
+
+    def memory_usage(self):
+        return sum(p.nbytes for p in self.levels[1:])
@@ -0,0 +1,212 @@
+import numpy as np
+
+from .composite import DEFAULT_BLEND_MODE, composite
+
+
+DEFAULT_STROKE_WIDTH = 1.0
+# long segments are cut into pieces of this length, so that a diagonal
+# line does not cost its whole bounding box
+SEGMENT_CHUNK = 32.0
+SHAPES = ('LINE', 'RECT', 'ELLIPSE')
+
+
+# Shapes are rasterized as coverage: the distance from every pixel center
+# in the shape's bounding box to the shape, turned into a one pixel wide
+# anti-aliasing ramp. Batches of primitives share one flat index grid.
+
+
+def get_grid(boxes, width, height):
+    # flat (ids, xs, ys) of all pixels in the (n, 4) boxes clipped to the
+    # image; the work is proportional to the total box area
+    boxes = np.asarray(boxes, dtype=np.float64).reshape(-1, 4)
+    x0 = np.clip(np.floor(boxes[:, 0]), 0, width).astype(np.intp)
+    y0 = np.clip(np.floor(boxes[:, 1]), 0, height).astype(np.intp)
+    x1 = np.clip(np.ceil(boxes[:, 2]), 0, width).astype(np.intp)
+    y1 = np.clip(np.ceil(boxes[:, 3]), 0, height).astype(np.intp)
+    w = np.maximum(0, x1 - x0)
+    h = np.maximum(0, y1 - y0)
+    counts = w * h
+    total = int(counts.sum())
+    ids = np.repeat(np.arange(len(counts)), counts)
+    local = np.arange(total) - np.repeat(np.cumsum(counts) - counts, counts)
+    bw = w[ids]
+    xs = x0[ids] + local % np.maximum(bw, 1)
+    ys = y0[ids] + local // np.maximum(bw, 1)
+    return (ids, xs, ys)
+
+
+def ramp(d, half_width):
+    cov = np.subtract(half_width + 0.5, d)
+    return np.clip(cov, 0.0, 1.0, out=cov)
+
+
+def segment_distance(px, py, segs):
+    ax, ay, bx, by = segs[:, 0], segs[:, 1], segs[:, 2], segs[:, 3]
+    dx = bx - ax
+    dy = by - ay
+    length2 = dx * dx + dy * dy
+    t = ((px - ax) * dx + (py - ay) * dy) / np.where(length2 > 0, length2, 1)
+    np.clip(t, 0.0, 1.0, out=t)
+    return np.hypot(px - ax - t * dx, py - ay - t * dy)
+
+
+def box_distance(px, py, rects):
+    # signed: negative inside
+    cx = (rects[:, 0] + rects[:, 2]) * 0.5
+    cy = (rects[:, 1] + rects[:, 3]) * 0.5
+    qx = np.abs(px - cx) - (rects[:, 2] - rects[:, 0]) * 0.5
+    qy = np.abs(py - cy) - (rects[:, 3] - rects[:, 1]) * 0.5
+    outside = np.hypot(np.maximum(qx, 0.0), np.maximum(qy, 0.0))
+    return outside + np.minimum(np.maximum(qx, qy), 0.0)
+
+
+def ellipse_distance(px, py, ellipses):
+    # signed, first order approximation (g - 1) / |grad g| of the distance
+    # to g(p) = |((x - cx) / rx, (y - cy) / ry)| = 1
+    rx = np.maximum(ellipses[:, 2], 1.0e-6)
+    ry = np.maximum(ellipses[:, 3], 1.0e-6)
+    dx = px - ellipses[:, 0]
+    dy = py - ellipses[:, 1]
+    g = np.hypot(dx / rx, dy / ry)
+    grad = np.hypot(dx / (rx * rx), dy / (ry * ry))
+    d = np.where(grad > 0, (g - 1.0) * g / np.where(grad > 0, grad, 1), 0)
+    return np.where(grad > 0, d, -np.minimum(rx, ry))
+
+
+def split_segments(segs, chunk=SEGMENT_CHUNK):
+    # the union of the pieces is the segment, so coverage does not change
+    length = np.hypot(segs[:, 2] - segs[:, 0], segs[:, 3] - segs[:, 1])
+    pieces = np.maximum(1, np.ceil(length / chunk)).astype(np.intp)
+    if np.all(pieces == 1):
+        return segs
+    ids = np.repeat(np.arange(len(segs)), pieces)
+    k = np.arange(len(ids)) - np.repeat(np.cumsum(pieces) - pieces, pieces)
+    n = pieces[ids]
+    a = segs[ids, :2]
+    d = segs[ids, 2:] - a
+    t0 = (k / n)[:, np.newaxis]
+    t1 = ((k + 1) / n)[:, np.newaxis]
+    return np.concatenate([a + d * t0, a + d * t1], axis=1)
+
+
+def line_coverage(segs, stroke, width, height):
+    segs = split_segments(np.asarray(segs, dtype=np.float64).reshape(-1, 4))
+    pad = stroke * 0.5 + 1.0
+    boxes = np.stack([
+        np.minimum(segs[:, 0], segs[:, 2]) - pad,
+        np.minimum(segs[:, 1], segs[:, 3]) - pad,
+        np.maximum(segs[:, 0], segs[:, 2]) + pad,
+        np.maximum(segs[:, 1], segs[:, 3]) + pad], axis=1)
+    ids, xs, ys = get_grid(boxes, width, height)
+    d = segment_distance(xs + 0.5, ys + 0.5, segs[ids])
+    return (xs, ys, ramp(d, stroke * 0.5))
+
+
+def rect_edges(rects, stroke):
+    # the outline as four filled bands; they overlap in full squares at
+    # the corners, which gives mitred joins instead of round ones
+    h = stroke * 0.5
+    x0, y0, x1, y1 = rects[:, 0], rects[:, 1], rects[:, 2], rects[:, 3]
+    return np.stack([
+        np.stack([x0 - h, y0 - h, x1 + h, y0 + h], axis=1),
+        np.stack([x1 - h, y0 - h, x1 + h, y1 + h], axis=1),
+        np.stack([x0 - h, y1 - h, x1 + h, y1 + h], axis=1),
+        np.stack([x0 - h, y0 - h, x0 + h, y1 + h], axis=1)],
+        axis=1).reshape(-1, 4)
+
+
+def rect_coverage(rects, stroke, width, height, fill=False):
+    # the cost of an outline follows the perimeter, not the area
+    rects = np.asarray(rects, dtype=np.float64).reshape(-1, 4)
+    if not fill:
+        rects = rect_edges(rects, stroke)
+    boxes = rects + [-1.0, -1.0, 1.0, 1.0]
+    ids, xs, ys = get_grid(boxes, width, height)
+    d = box_distance(xs + 0.5, ys + 0.5, rects[ids])
+    return (xs, ys, ramp(d, 0.0))
+
+
+def ellipse_coverage(ellipses, stroke, width, height, fill=False):
+    ellipses = np.asarray(ellipses, dtype=np.float64).reshape(-1, 4)
+    pad = stroke * 0.5 + 1.0
+    boxes = np.stack([
+        ellipses[:, 0] - ellipses[:, 2] - pad,
+        ellipses[:, 1] - ellipses[:, 3] - pad,
+        ellipses[:, 0] + ellipses[:, 2] + pad,
+        ellipses[:, 1] + ellipses[:, 3] + pad], axis=1)
+    ids, xs, ys = get_grid(boxes, width, height)
+    d = ellipse_distance(xs + 0.5, ys + 0.5, ellipses[ids])
+    if fill:
+        return (xs, ys, ramp(d, 0.0))
+    return (xs, ys, ramp(np.abs(d), stroke * 0.5))
+
+
+def draw_coverage(pixels, xs, ys, cov, color, mode=DEFAULT_BLEND_MODE,
+                  opacity=1.0):
+    # overlapping primitives are merged with max so that joins and
+    # crossings are not drawn twice; returns the touched box or None
+    width = pixels.shape[1]
+    keep = cov > 0.0
+    flat = ys[keep] * width + xs[keep]
+    cov = cov[keep]
+    if flat.size == 0:
+        return None
+    flat, inverse = np.unique(flat, return_inverse=True)
+    if len(flat) != len(cov):
+        merged = np.zeros(len(flat), dtype=np.float64)
+        np.maximum.at(merged, inverse, cov)
+        cov = merged
+    else:
+        cov = cov[np.argsort(inverse)]
+    ys, xs = np.divmod(flat, width)
+
+    alpha = color[3] if len(color) > 3 else 1.0
+    dst = pixels[ys, xs]
+    if mode == 'REPLACE':
+        # coverage still blends the edges into what was there
+        c = np.array([color[0], color[1], color[2], alpha], dtype=np.float32)
+        weight = (cov * opacity).astype(np.float32)[:, np.newaxis]
+        dst += (c - dst) * weight
+    else:
+        src = np.empty((len(flat), 4), dtype=np.float32)
+        src[:, :3] = color[:3]
+        src[:, 3] = cov * alpha
+        composite(dst, src, mode, opacity)
+    pixels[ys, xs] = dst
+    return (int(xs.min()), int(ys.min()), int(xs.max()) + 1,
+            int(ys.max()) + 1)
+
+
+def draw_lines(pixels, segs, color, stroke=DEFAULT_STROKE_WIDTH,
+               mode=DEFAULT_BLEND_MODE, opacity=1.0):
+    # segs: (n, 4) x0, y0, x1, y1 in pixel units, pixel centers at +0.5
+    h, w = pixels.shape[:2]
+    xs, ys, cov = line_coverage(segs, stroke, w, h)
+    return draw_coverage(pixels, xs, ys, cov, color, mode, opacity)
+
+
+def draw_polyline(pixels, points, color, stroke=DEFAULT_STROKE_WIDTH,
+                  mode=DEFAULT_BLEND_MODE, opacity=1.0, closed=False):
+    points = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+    if closed and len(points) > 2:
+        points = np.concatenate([points, points[:1]])
+    if len(points) < 2:
+        return None
+    segs = np.concatenate([points[:-1], points[1:]], axis=1)
+    return draw_lines(pixels, segs, color, stroke, mode, opacity)
+
+
+def draw_rects(pixels, rects, color, stroke=DEFAULT_STROKE_WIDTH,
+               mode=DEFAULT_BLEND_MODE, opacity=1.0, fill=False):
+    # rects: (n, 4) x0, y0, x1, y1; the stroke is centered on the edges
+    h, w = pixels.shape[:2]
+    xs, ys, cov = rect_coverage(rects, stroke, w, h, fill)
+    return draw_coverage(pixels, xs, ys, cov, color, mode, opacity)
+
+
+def draw_ellipses(pixels, ellipses, color, stroke=DEFAULT_STROKE_WIDTH,
+                  mode=DEFAULT_BLEND_MODE, opacity=1.0, fill=False):
+    # ellipses: (n, 4) cx, cy, rx, ry
+    h, w = pixels.shape[:2]
+    xs, ys, cov = ellipse_coverage(ellipses, stroke, w, h, fill)
+    return draw_coverage(pixels, xs, ys, cov, color, mode, opacity)
@@ -0,0 +1,69 @@
+import time
+
+
+DEFAULT_REDRAW_FPS = 60
+
+
+class RedrawScheduler():
+
+    def __init__(self, max_fps=DEFAULT_REDRAW_FPS):
+        self.max_fps = max_fps
+        self.requested = 0
+        self.performed = 0
+        self.unchanged = 0
+        self.coalesced = 0
+        self.__state = None
+        self.__last = 0.0
+        self.__pending = None
+
+    def get_interval(self):
+        return 1.0 / max(1, self.max_fps)
+
+    def __perform(self, region, state, now):
+        region.tag_redraw()
+        self.performed += 1
+        self.__state = state
+        self.__last = now
+        self.__pending = None
+
+    def request(self, region, state, force=False):
+        # True when the region was tagged; a request that comes too soon is
+        # kept and performed by a later flush()
+        self.requested += 1
+        if not force and state == self.__state:
+            self.unchanged += 1
+            self.__pending = None
+            return False
+        now = time.perf_counter()
+        if not force and now - self.__last < self.get_interval():
+            self.coalesced += 1
+            self.__pending = (region, state)
+            return False
+        self.__perform(region, state, now)
+        return True
+
+    def flush(self):
+        if self.__pending is None:
+            return False
+        now = time.perf_counter()
+        if now - self.__last < self.get_interval():
+            return False
+        region, state = self.__pending
+        self.__perform(region, state, now)
+        return True
+
+    def has_pending(self):
+        return self.__pending is not None
+
+    def reset(self):
+        self.__state = None
+        self.__pending = None
+
+    def reset_stats(self):
+        self.requested = 0
+        self.performed = 0
+        self.unchanged = 0
+        self.coalesced = 0
+
+
+redraw_scheduler = RedrawScheduler()
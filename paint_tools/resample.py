@@ -0,0 +1,132 @@
+import math
+from collections import OrderedDict
+
+import numpy as np
+
+
+RESAMPLE_FILTERS = ('NEAREST', 'BILINEAR', 'LANCZOS')
+DEFAULT_RESAMPLE_FILTER = 'BILINEAR'
+# weight tables kept for repeated resizes between the same sizes
+DEFAULT_MAX_TABLES = 64
+LANCZOS_LOBES = 3
+
+
+def triangle(x):
+    return np.maximum(0.0, 1.0 - np.abs(x))
+
+
+def lanczos(x):
+    x = np.abs(x)
+    return np.where(
+        x < LANCZOS_LOBES, np.sinc(x) * np.sinc(x / LANCZOS_LOBES), 0.0)
+
+
+def get_support(filter_name):
+    if filter_name == 'BILINEAR':
+        return (triangle, 1.0)
+    elif filter_name == 'LANCZOS':
+        return (lanczos, float(LANCZOS_LOBES))
+    raise ValueError("Unknown filter: {}".format(filter_name))
+
+
+def make_weights(src, dst, filter_name):
+    # (indices, weights), both (dst, taps): output i is the weighted sum of
+    # the source samples indices[i]; edges are clamped
+    scale = dst / float(src)
+    centers = (np.arange(dst) + 0.5) / scale - 0.5
+    if filter_name == 'NEAREST':
+        indices = np.floor(centers + 0.5).astype(np.intp)
+        np.clip(indices, 0, src - 1, out=indices)
+        return (indices[:, np.newaxis], np.ones((dst, 1), dtype=np.float32))
+
+    kernel, support = get_support(filter_name)
+    # shrinking stretches the filter so that every source pixel counts
+    stretch = max(1.0, 1.0 / scale)
+    support *= stretch
+    taps = int(math.ceil(2.0 * support)) + 1
+    first = np.ceil(centers - support).astype(np.intp)
+    indices = first[:, np.newaxis] + np.arange(taps)
+    weights = kernel((indices - centers[:, np.newaxis]) / stretch)
+    total = weights.sum(axis=1, keepdims=True)
+    total[total == 0.0] = 1.0
+    weights /= total
+    # drop taps that are zero for every output sample
+    used = np.nonzero(np.any(weights != 0.0, axis=0))[0]
+    if len(used):
+        indices = indices[:, used[0]:used[-1] + 1]
+        weights = weights[:, used[0]:used[-1] + 1]
+    np.clip(indices, 0, src - 1, out=indices)
+    return (indices, weights.astype(np.float32))
+
+
+class Resampler():
+
+    def __init__(self, max_tables=DEFAULT_MAX_TABLES):
+        self.max_tables = max_tables
+        self.__tables = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get_weights(self, src, dst, filter_name):
+        key = (src, dst, filter_name)
+        table = self.__tables.get(key)
+        if table is not None:
+            self.hits += 1
+            self.__tables.move_to_end(key)
+            return table
+        self.misses += 1
+        table = make_weights(src, dst, filter_name)
+        self.__tables[key] = table
+        while len(self.__tables) > self.max_tables:
+            self.__tables.popitem(last=False)
+        return table
+
+    def resize_axis(self, pixels, dst, filter_name, axis):
+        indices, weights = self.get_weights(
+            pixels.shape[axis], dst, filter_name)
+        if indices.shape[1] == 1:
+            return np.take(pixels, indices[:, 0], axis=axis)
+        shape = [1] * pixels.ndim
+        shape[axis] = -1
+        out = None
+        for k in range(indices.shape[1]):
+            part = np.take(pixels, indices[:, k], axis=axis)
+            part *= weights[:, k].reshape(shape)
+            if out is None:
+                out = part
+            else:
+                out += part
+        return out
+
+    def resize(self, pixels, width, height, filter_name=DEFAULT_RESAMPLE_FILTER):
+        h, w = pixels.shape[:2]
+        if (w, h) == (width, height):
+            return pixels.copy()
+        # run the pass that shrinks the data most first
+        taps_y = self.get_weights(h, height, filter_name)[0].shape[1]
+        taps_x = self.get_weights(w, width, filter_name)[0].shape[1]
+        rows_first = height * w * taps_y + height * width * taps_x
+        cols_first = h * width * taps_x + height * width * taps_y
+        if rows_first <= cols_first:
+            tmp = self.resize_axis(pixels, height, filter_name, 0)
+            out = self.resize_axis(tmp, width, filter_name, 1)
+        else:
+            tmp = self.resize_axis(pixels, width, filter_name, 1)
+            out = self.resize_axis(tmp, height, filter_name, 0)
+        if filter_name == 'LANCZOS':
+            # the negative lobes ring past sharp edges
+            np.clip(out, 0.0, 1.0, out=out)
+        return out
+
+    def num_tables(self):
+        return len(self.__tables)
+
+    def clear(self):
+        self.__tables.clear()
+
+    def reset_stats(self):
+        self.hits = 0
+        self.misses = 0
+
+
+resampler = Resampler()
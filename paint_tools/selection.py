@@ -0,0 +1,181 @@
+import numpy as np
+
+
+DEFAULT_TOLERANCE = 0.1
+# rows processed at once while building masks, bounds the temporaries
+BAND_ROWS = 256
+# values compared at once by get_color_mask; small enough to stay in cache
+MASK_BAND_VALUES = 1 << 17
+# up to this many selected runs are filled as slices instead of through a
+# full size scratch mask
+SLICE_RUNS = 1 << 15
+
+
+def get_color_mask(pixels, color, tolerance, out=None):
+    # |pixel - color| <= tolerance on r, g and b; the color is tiled over
+    # whole rows so every numpy loop runs over a long contiguous axis
+    h, w = pixels.shape[:2]
+    mask = np.empty((h, w), dtype=bool) if out is None else out
+    c = np.zeros(4, dtype=pixels.dtype)
+    c[:3] = color[:3]
+    row = np.tile(c, w)
+    rows = max(1, MASK_BAND_VALUES // (w * 4))
+    d = np.empty((rows, w * 4), dtype=pixels.dtype)
+    m = np.empty((rows, w * 4), dtype=bool)
+    # the four channel results of a pixel read as one uint32; alpha is
+    # ignored
+    rgb_bits = np.array([1, 1, 1, 0], dtype=np.uint8).view(np.uint32)[0]
+    for y in range(0, h, rows):
+        band = pixels[y:y + rows].reshape(-1, w * 4)
+        n = band.shape[0]
+        np.subtract(band, row, out=d[:n])
+        np.abs(d[:n], out=d[:n])
+        np.less_equal(d[:n], tolerance, out=m[:n])
+        bits = m[:n].view(np.uint32)
+        bits &= rgb_bits
+        np.equal(bits, rgb_bits, out=mask[y:y + n])
+    return mask
+
+
+def get_runs(mask):
+    # horizontal runs of True as flat positions of their starts and ends
+    # on a (h, w + 1) grid, so the keys of both grow along the image
+    h, w = mask.shape
+    keys = []
+    for y in range(0, h, BAND_ROWS):
+        band = mask[y:y + BAND_ROWS]
+        padded = np.zeros((band.shape[0], w + 2), dtype=bool)
+        padded[:, 1:-1] = band
+        # edges alternate start, end within each row
+        edges = np.flatnonzero(padded[:, 1:] ^ padded[:, :-1])
+        edges += y * (w + 1)
+        keys.append(edges)
+    keys = np.concatenate(keys)
+    return (keys[0::2], keys[1::2])
+
+
+def get_components(n, up, down):
+    # connected components of n nodes and the edges (up, down): the larger
+    # node of every edge hooks onto the smallest one it touches, pointer
+    # jumping takes every node to its root, then the roots and the edges
+    # between them are solved again as a smaller graph; a few rounds for
+    # any shape, unlike a breadth first search that needs one step per
+    # level
+    labels = np.arange(n)
+    if not len(up):
+        return labels
+    np.minimum.at(labels, np.maximum(up, down), np.minimum(up, down))
+    nodes = np.flatnonzero(labels != np.arange(n))
+    while len(nodes):
+        parent = labels[nodes]
+        root = labels[parent]
+        labels[nodes] = root
+        nodes = nodes[root != parent]
+    roots = labels == np.arange(n)
+    index = np.cumsum(roots) - 1
+    labels = index[labels]
+    del roots, index
+    lu = labels[up]
+    ld = labels[down]
+    # edges inside a component are done
+    keep = lu != ld
+    sub = get_components(int(labels.max()) + 1, lu[keep], ld[keep])
+    return sub[labels]
+
+
+def flood_fill(mask, x, y):
+    # 4-connected region of mask around (x, y), found on runs
+    h, w = mask.shape
+    out = np.zeros((h, w), dtype=bool)
+    if not (0 <= x < w and 0 <= y < h) or not mask[y, x]:
+        return out
+
+    starts, ends = get_runs(mask)
+    stride = w + 1
+    # runs of the next row with end > start and start < end
+    lo = np.searchsorted(ends, starts + stride, side='right')
+    hi = np.searchsorted(starts, ends + stride, side='left')
+    counts = np.maximum(hi - lo, 0)
+    up = np.repeat(np.arange(len(starts)), counts)
+    down = np.repeat(lo - (np.cumsum(counts) - counts), counts)
+    down += np.arange(len(up))
+    del lo, hi, counts
+    labels = get_components(len(starts), up, down)
+    del up, down
+
+    # first run that ends after the seed contains it
+    seed = int(np.searchsorted(ends, y * stride + x, side='right'))
+    sel = np.flatnonzero(labels == labels[seed])
+    starts = starts[sel]
+    ends = ends[sel]
+    if len(sel) <= SLICE_RUNS:
+        flat = out.reshape(-1)
+        rows = starts // stride
+        for r, s, e in zip(rows.tolist(), (starts - rows).tolist(),
+                           (ends - rows).tolist()):
+            flat[s:e] = True
+        return out
+    marks = np.zeros(h * stride, dtype=bool)
+    marks[starts] = True
+    marks[ends] = True
+    np.logical_xor.accumulate(
+        marks.reshape(h, stride)[:, :w], axis=1, out=out)
+    return out
+
+
+class MaskSelection():
+
+    def __init__(self, mask):
+        self.height, self.width = mask.shape
+        self.packed = np.packbits(mask, axis=1)
+        ys, xs = np.nonzero(mask.any(axis=1))[0], np.nonzero(mask.any(axis=0))[0]
+        if len(ys) == 0:
+            self.bbox = (0, 0, 0, 0)
+        else:
+            self.bbox = (int(xs[0]), int(ys[0]), int(xs[-1]) + 1, int(ys[-1]) + 1)
+        self.count = int(np.count_nonzero(mask))
+
+    def get_rect(self):
+        x0, y0, x1, y1 = self.bbox
+        return {'x0': x0, 'y0': y0, 'x1': x1, 'y1': y1}
+
+    def get_mask(self, x0, y0, x1, y1):
+        # unpack only the bytes covering the box
+        b0 = x0 // 8
+        b1 = (x1 + 7) // 8
+        bits = np.unpackbits(self.packed[y0:y1, b0:b1], axis=1)
+        return bits[:, x0 - b0 * 8:x1 - b0 * 8].view(bool)
+
+    def memory_usage(self):
+        return self.packed.nbytes
+
+
+def magic_wand(pixels, x, y, tolerance=DEFAULT_TOLERANCE):
+    h, w = pixels.shape[:2]
+    return magic_wand_rows(
+        lambda y0, y1: pixels[y0:y1], w, h, x, y, tolerance)
+
+
+def magic_wand_rows(read_rows, width, height, x, y,
+                    tolerance=DEFAULT_TOLERANCE):
+    # read_rows(y0, y1) returns float rows of the image, so a streamed
+    # source is never copied whole
+    if not (0 <= x < width and 0 <= y < height):
+        return None
+    color = read_rows(y, y + 1)[0, x, :3].copy()
+    mask = np.empty((height, width), dtype=bool)
+    for y0 in range(0, height, BAND_ROWS):
+        y1 = min(y0 + BAND_ROWS, height)
+        get_color_mask(read_rows(y0, y1), color, tolerance, mask[y0:y1])
+    return MaskSelection(flood_fill(mask, x, y))
+
+
+def apply_masked(view, mask, kernel, scratch=None):
+    # run the kernel on a copy and take only the selected pixels from it
+    if scratch is None:
+        scratch = view.copy()
+    else:
+        scratch[...] = view
+    kernel(scratch)
+    np.copyto(view, scratch, where=mask[..., np.newaxis])
+    return view
@@ -0,0 +1,167 @@
+import numpy as np
+
+from .formats import get_scale, to_float
+
+
+DEFAULT_STATS_MEMORY = 512 * 1024 * 1024
+# sum and sum of squares tables, float64 RGBA each
+SAT_BYTES_PER_PIXEL = 2 * 4 * 8
+HISTOGRAM_BINS = 16
+
+
+class IntegralStats():
+
+    def __init__(self, pixels):
+        self.pixels = pixels
+        self.sums = None
+        self.squares = None
+        # bounding box of pending changes as [x0, y0, x1, y1]
+        self.__dirty = None
+
+    def memory_usage(self):
+        if self.sums is None:
+            return 0
+        return self.sums.nbytes + self.squares.nbytes
+
+    def invalidate(self, x0, y0, x1, y1):
+        if self.__dirty is None:
+            self.__dirty = [x0, y0, x1, y1]
+        else:
+            d = self.__dirty
+            self.__dirty = [min(d[0], x0), min(d[1], y0),
+                            max(d[2], x1), max(d[3], y1)]
+
+    def __build(self):
+        h, w = self.pixels.shape[:2]
+        self.sums = np.zeros((h + 1, w + 1, 4), dtype=np.float64)
+        self.squares = np.zeros((h + 1, w + 1, 4), dtype=np.float64)
+        p = self.pixels.astype(np.float64)
+        if self.pixels.dtype == np.uint8:
+            p /= get_scale(np.uint8)
+        np.cumsum(np.cumsum(p, axis=0), axis=1, out=self.sums[1:, 1:])
+        p *= p
+        np.cumsum(np.cumsum(p, axis=0), axis=1, out=self.squares[1:, 1:])
+        self.__dirty = None
+
+    def __update_table(self, table, values, x0, y0, y1):
+        # only table[y0 + 1:, x0 + 1:] depends on the changed pixels; it
+        # is rebuilt from per-row prefix sums, which are recomputed for the
+        # changed rows and recovered from the old table for the others
+        rows = table[y0 + 1:, x0 + 1:] - table[y0:-1, x0 + 1:]
+        n = y1 - y0
+        rows[:n] = np.cumsum(values, axis=1)
+        rows[:n] += (table[y0 + 1:y1 + 1, x0] - table[y0:y1, x0])[:, np.newaxis]
+        np.cumsum(rows, axis=0, out=rows)
+        rows += table[y0, x0 + 1:]
+        table[y0 + 1:, x0 + 1:] = rows
+
+    def __update(self):
+        h, w = self.pixels.shape[:2]
+        x0, y0, x1, y1 = self.__dirty
+        x0 = min(max(0, x0), w)
+        y0 = min(max(0, y0), h)
+        y1 = min(max(y0, y1), h)
+        if x0 < w and y0 < y1:
+            values = self.pixels[y0:y1, x0:].astype(np.float64)
+            if self.pixels.dtype == np.uint8:
+                values /= get_scale(np.uint8)
+            self.__update_table(self.sums, values, x0, y0, y1)
+            values *= values
+            self.__update_table(self.squares, values, x0, y0, y1)
+        self.__dirty = None
+
+    def get_tables(self):
+        if self.sums is None:
+            self.__build()
+        elif self.__dirty is not None:
+            self.__update()
+        return (self.sums, self.squares)
+
+    def query(self, x0, y0, x1, y1):
+        sums, squares = self.get_tables()
+        h, w = self.pixels.shape[:2]
+        x0 = min(max(0, x0), w)
+        y0 = min(max(0, y0), h)
+        x1 = min(max(x0, x1), w)
+        y1 = min(max(y0, y1), h)
+        count = (x1 - x0) * (y1 - y0)
+        if count == 0:
+            return None
+
+        s = sums[y1, x1] - sums[y0, x1] - sums[y1, x0] + sums[y0, x0]
+        sq = (squares[y1, x1] - squares[y0, x1] - squares[y1, x0] +
+              squares[y0, x0])
+        mean = s / count
+        var = np.maximum(sq / count - mean * mean, 0.0)
+
+        return {'count': count, 'mean': mean, 'var': var, 'std': np.sqrt(var)}
+
+
+def get_region_stats(pixels, bins=HISTOGRAM_BINS):
+    # full pass over the region for what summed-area tables can't answer
+    if pixels.size == 0:
+        return None
+    if pixels.dtype == np.uint8:
+        pixels = to_float(pixels)
+    flat = pixels.reshape((-1, 4))
+    hist = [np.histogram(flat[:, c], bins=bins, range=(0.0, 1.0))[0]
+            for c in range(4)]
+    return {
+        'min': flat.min(axis=0),
+        'max': flat.max(axis=0),
+        'histogram': np.array(hist),
+    }
+
+
+class ImageStats():
+
+    def __init__(self, pyramid, memory_limit=DEFAULT_STATS_MEMORY):
+        # the level matching the view zoom is summarised, but never one
+        # finer than the first that fits the memory limit, so results of
+        # large or zoomed out images are approximate
+        self.pyramid = pyramid
+        self.level = 0
+        while True:
+            w, h = pyramid.get_level_size(self.level)
+            if (w + 1) * (h + 1) * SAT_BYTES_PER_PIXEL <= memory_limit or \
+                    self.level >= pyramid.num_levels() - 1:
+                break
+            self.level += 1
+        # level -> IntegralStats, built on the first query at that level
+        self.integrals = {}
+
+    def memory_usage(self):
+        return sum(i.memory_usage() for i in self.integrals.values())
+
+    def get_level(self, zoom=1.0):
+        return max(self.level, self.pyramid.level_for_zoom(zoom))
+
+    def invalidate(self, x0, y0, x1, y1):
+        for level, integral in self.integrals.items():
+            s = 1 << level
+            integral.invalidate(x0 // s, y0 // s, -(-x1 // s), -(-y1 // s))
+
+    def __scaled(self, rect, level):
+        s = 1 << level
+        return (rect[0] // s, rect[1] // s, -(-rect[2] // s), -(-rect[3] // s))
+
+    def query(self, rect, zoom=1.0):
+        level = self.get_level(zoom)
+        pixels = self.pyramid.get_level(level)
+        integral = self.integrals.get(level)
+        if integral is None:
+            integral = IntegralStats(pixels)
+            self.integrals[level] = integral
+        result = integral.query(*self.__scaled(rect, level))
+        if result is not None:
+            result['level'] = level
+        return result
+
+    def region(self, rect, zoom=1.0):
+        level = self.get_level(zoom)
+        x0, y0, x1, y1 = self.__scaled(rect, level)
+        pixels = self.pyramid.get_level(level)
+        result = get_region_stats(pixels[max(0, y0):y1, max(0, x0):x1])
+        if result is not None:
+            result['level'] = level
+        return result
@@ -0,0 +1,285 @@
+import math
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from .pixel_io import DirtyRegions, pixel_transfer
+from .selection import apply_masked
+from .filters import pad_edges
+from .formats import from_float, is_native, to_float
+
+
+DEFAULT_TILE_SIZE = 256
+DEFAULT_MEMORY_LIMIT = 64 * 1024 * 1024
+# float32 RGBA tile plus room for the temporaries a kernel allocates
+TILE_BYTES_PER_PIXEL = 4 * 4 * 2
+# 0 lets the engine use one worker per CPU
+DEFAULT_WORKERS = 0
+
+
+def get_num_workers(workers):
+    if workers <= 0:
+        return os.cpu_count() or 1
+    return workers
+
+
+def iter_tiles(x0, y0, x1, y1, tile_width, tile_height):
+    for ty in range(y0, y1, tile_height):
+        for tx in range(x0, x1, tile_width):
+            yield (tx, ty, min(tx + tile_width, x1), min(ty + tile_height, y1))
+
+
+def clip_rect(width, height, rect):
+    x0 = min(max(0, rect['x0']), width)
+    y0 = min(max(0, rect['y0']), height)
+    x1 = min(max(0, rect['x1']), width)
+    y1 = min(max(0, rect['y1']), height)
+
+    return (x0, y0, max(x0, x1), max(y0, y1))
+
+
+class ImageTileSource():
+
+    streamed = True
+    storage = None
+
+    def __init__(self, image, transfer=None):
+        if transfer is None:
+            transfer = pixel_transfer
+        self.image = image
+        self.transfer = transfer
+        self.width = image.size[0]
+        self.height = image.size[1]
+        transfer.begin()
+
+    def view(self, x0, y0, x1, y1):
+        return None
+
+    def read(self, x0, y0, x1, y1, out):
+        return self.transfer.read_rect(self.image, x0, y0, x1, y1, out)
+
+    def write(self, x0, y0, x1, y1, src):
+        self.transfer.write_rect(self.image, x0, y0, x1, y1, src)
+
+    def update(self):
+        self.transfer.update(self.image)
+
+
+class ArrayTileSource():
+
+    def __init__(self, pixels, dirty=None):
+        self.pixels = pixels
+        self.height, self.width = pixels.shape[:2]
+        if dirty is None:
+            dirty = DirtyRegions(self.width, self.height)
+        self.dirty = dirty
+        # uint8 and float16 pixels are converted on read and write, only
+        # native kernels see them directly through view
+        self.storage = pixels.dtype
+        self.streamed = self.storage != np.float32
+
+    def view(self, x0, y0, x1, y1):
+        self.dirty.add(x0, y0, x1, y1)
+        return self.pixels[y0:y1, x0:x1]
+
+    def read(self, x0, y0, x1, y1, out):
+        return to_float(self.pixels[y0:y1, x0:x1], out)
+
+    def write(self, x0, y0, x1, y1, src):
+        self.dirty.add(x0, y0, x1, y1)
+        from_float(src, self.pixels[y0:y1, x0:x1])
+
+    def update(self):
+        pass
+
+
+class TileEngine():
+
+    def __init__(self, tile_size=DEFAULT_TILE_SIZE,
+                 memory_limit=DEFAULT_MEMORY_LIMIT, workers=DEFAULT_WORKERS):
+        self.tile_size = tile_size
+        self.memory_limit = memory_limit
+        self.workers = workers
+        self.__buffers = []
+        self.__executor = None
+        self.__executor_workers = 0
+
+    def get_workers(self):
+        return get_num_workers(self.workers)
+
+    def get_tile_size(self):
+        # every worker owns one tile buffer, so they share the memory limit
+        limit = self.memory_limit / self.get_workers()
+        side = int(math.sqrt(limit / TILE_BYTES_PER_PIXEL))
+        return max(1, min(self.tile_size, side))
+
+    def get_executor(self):
+        workers = self.get_workers()
+        if self.__executor is None or self.__executor_workers != workers:
+            self.shutdown()
+            self.__executor = ThreadPoolExecutor(max_workers=workers)
+            self.__executor_workers = workers
+        return self.__executor
+
+    def shutdown(self):
+        if self.__executor is not None:
+            self.__executor.shutdown()
+            self.__executor = None
+            self.__executor_workers = 0
+
+    def __tile_buffer(self, index, tw, th):
+        size = self.get_tile_size()
+        if self.__buffers and self.__buffers[0].shape[0] != size:
+            self.__buffers = []
+        while len(self.__buffers) <= index:
+            self.__buffers.append(
+                np.empty((size, size, 4), dtype=np.float32))
+        buf = self.__buffers[index]
+        # contiguous (th, tw, 4) block at the head of the tile buffer
+        return buf.reshape(-1)[:th * tw * 4].reshape((th, tw, 4))
+
+    def tiles(self, x0, y0, x1, y1):
+        size = self.get_tile_size()
+        return iter_tiles(x0, y0, x1, y1, size, size)
+
+    def __run(self, kernel, tiles):
+        if len(tiles) == 1 or self.get_workers() == 1:
+            for t in tiles:
+                kernel(t)
+            return
+        # tiles never overlap, so the result does not depend on scheduling
+        for f in [self.get_executor().submit(kernel, t) for t in tiles]:
+            f.result()
+
+    def __masked(self, kernel, mask, tiles):
+        # tiles outside the mask are dropped, fully selected ones take the
+        # plain kernel
+        masks = {}
+        for t in tiles:
+            m = mask.get_mask(*t)
+            if m.all():
+                masks[t] = None
+            elif m.any():
+                masks[t] = m
+        tiles = [t for t in tiles if t in masks]
+
+        def run(item):
+            buf, m = item
+            if m is None:
+                kernel(buf)
+            else:
+                apply_masked(buf, m, kernel)
+
+        return (run, tiles, masks)
+
+    def apply(self, source, rect, kernel, mask=None):
+        x0, y0, x1, y1 = clip_rect(source.width, source.height, rect)
+        tiles = list(self.tiles(x0, y0, x1, y1))
+        if mask is not None:
+            run, tiles, masks = self.__masked(kernel, mask, tiles)
+            wrap = lambda t, buf: (buf, masks[t])
+        else:
+            run = kernel
+            wrap = lambda t, buf: buf
+        if not source.streamed or (
+                source.storage is not None and is_native(kernel)):
+            self.__run(run, [wrap(t, source.view(*t)) for t in tiles])
+            source.update()
+            return (x0, y0, x1, y1)
+
+        # streamed sources are read and written on the calling thread, a
+        # batch of one tile per worker is computed concurrently in between
+        workers = self.get_workers()
+        for i in range(0, len(tiles), workers):
+            batch = tiles[i:i + workers]
+            bufs = []
+            for n, (tx0, ty0, tx1, ty1) in enumerate(batch):
+                tile = self.__tile_buffer(n, tx1 - tx0, ty1 - ty0)
+                source.read(tx0, ty0, tx1, ty1, tile)
+                bufs.append(tile)
+            self.__run(run, [wrap(t, b) for t, b in zip(batch, bufs)])
+            for (tx0, ty0, tx1, ty1), tile in zip(batch, bufs):
+                source.write(tx0, ty0, tx1, ty1, tile)
+        source.update()
+
+        return (x0, y0, x1, y1)
+
+    def apply_filter(self, source, rect, filt, halo, mask=None):
+        # neighbourhood filters see the original pixels around every tile:
+        # one band of tiles is read with a halo of rows and columns, and the
+        # original rows the next band needs above it are carried over
+        # before the band is overwritten
+        x0, y0, x1, y1 = clip_rect(source.width, source.height, rect)
+        if x0 >= x1 or y0 >= y1:
+            return (x0, y0, x1, y1)
+        size = self.get_tile_size()
+        hx0 = max(0, x0 - halo)
+        hx1 = min(source.width, x1 + halo)
+        carry = None
+        for by0 in range(y0, y1, size):
+            by1 = min(by0 + size, y1)
+            sy0 = max(0, by0 - halo)
+            sy1 = min(source.height, by1 + halo)
+            fresh = self.read(
+                source,
+                {'x0': hx0, 'y0': by0 if carry is not None else sy0,
+                 'x1': hx1, 'y1': sy1})
+            strip = fresh if carry is None else np.concatenate([carry, fresh])
+            carry = strip[max(0, by1 - halo) - sy0:by1 - sy0].copy()
+            strip = pad_edges(
+                strip, halo - (by0 - sy0), halo - (sy1 - by1),
+                halo - (x0 - hx0), halo - (hx1 - x1))
+
+            tiles = [(tx0, by0, min(tx0 + size, x1), by1)
+                     for tx0 in range(x0, x1, size)]
+            results = {}
+
+            def run(t):
+                tx0, ty0, tx1, ty1 = t
+                results[t] = filt(
+                    strip[:, tx0 - x0:tx1 - x0 + 2 * halo])
+
+            self.__run(run, tiles)
+            for t in tiles:
+                tx0, ty0, tx1, ty1 = t
+                tile = self.__tile_buffer(0, tx1 - tx0, ty1 - ty0)
+                tile[...] = strip[halo:halo + ty1 - ty0,
+                                  tx0 - x0 + halo:tx1 - x0 + halo]
+                rgb = results[t]
+                m = None if mask is None else mask.get_mask(*t)
+                if m is None:
+                    tile[..., :3] = rgb
+                elif m.any():
+                    np.copyto(tile[..., :3], rgb, where=m[..., np.newaxis])
+                else:
+                    continue
+                source.write(tx0, ty0, tx1, ty1, tile)
+        source.update()
+
+        return (x0, y0, x1, y1)
+
+    def read(self, source, rect):
+        x0, y0, x1, y1 = clip_rect(source.width, source.height, rect)
+        out = np.empty((y1 - y0, x1 - x0, 4), dtype=np.float32)
+        for tx0, ty0, tx1, ty1 in self.tiles(x0, y0, x1, y1):
+            tile = self.__tile_buffer(0, tx1 - tx0, ty1 - ty0)
+            source.read(tx0, ty0, tx1, ty1, tile)
+            out[ty0 - y0:ty1 - y0, tx0 - x0:tx1 - x0] = tile
+
+        return out
+
+    def write(self, source, x, y, pixels):
+        h, w = pixels.shape[:2]
+        x0, y0, x1, y1 = clip_rect(
+            source.width, source.height,
+            {'x0': x, 'y0': y, 'x1': x + w, 'y1': y + h})
+        for tx0, ty0, tx1, ty1 in self.tiles(x0, y0, x1, y1):
+            tile = self.__tile_buffer(0, tx1 - tx0, ty1 - ty0)
+            tile[...] = pixels[ty0 - y:ty1 - y, tx0 - x:tx1 - x]
+            source.write(tx0, ty0, tx1, ty1, tile)
+        source.update()
+
+        return (x0, y0, x1, y1)
+
+tile_engine = TileEngine()
@@ -0,0 +1,361 @@
+import bpy
+
+from .operators import (
+    PT_BoxRenderer,
+    PT_SelectAll,
+    PT_MagicWand,
+    PT_ClearMask,
+    PT_CopyRect,
+    PT_CutRect,
+    PT_PasteRect,
+    PT_ClearClipboard,
+    PT_FillRect,
+    PT_EraseRect,
+    PT_BinarizeRect,
+    PT_AutoThreshold,
+    PT_GrayScaleRect,
+    PT_ChangeBrightnessRect,
+    PT_InvertRect,
+    PT_BlurRect,
+    PT_BoxBlurRect,
+    PT_SharpenRect,
+    PT_EdgeDetectRect,
+    PT_CropRect,
+    PT_ResizeRect,
+    PT_DrawLine,
+    PT_DrawRect,
+    PT_DrawEllipse,
+    PT_PolylineAddPoint,
+    PT_PolylineDraw,
+    PT_PolylineClear,
+    PT_DumpProfile,
+    PT_ClearProfile,
+    PT_CancelJobs,
+    PT_FlushCache,
+    PT_ClearCache,
+    PT_Undo,
+    PT_Redo,
+    PT_ClearHistory,
+    PT_PipelineAddStep,
+    PT_PipelineRemoveStep,
+    PT_PipelineClear,
+    PT_PipelineRun,
+    PT_ApplyPreview,
+    PT_UpdateStatistics,
+)
+from .cache import image_cache
+from .clipboard import clipboard
+from .history import undo_history
+from .preview import preview_renderer
+from .profiling import profiler
+from .redraw import redraw_scheduler
+from .jobs import job_queue
+
+
+class IMAGE_PT_PT(bpy.types.Panel):
+    bl_space_type = 'IMAGE_EDITOR'
+    bl_region_type = 'TOOLS'
+    bl_label = 'Painting Tools'
+    bl_category = 'Paint Tools'
+
+    def draw_header(self, context):
+        layout = self.layout
+        layout.label(text="", icon='PLUGIN')
+
+    def draw_stats(self, col, sc):
+        props = sc.pt_props
+        stats = props.selection_stats
+        if stats is None:
+            col.label(text="No statistics (needs Use Cache)")
+            return
+        col.label(text="Pixels: {}{}".format(
+            stats['count'],
+            "  (level {})".format(stats['level']) if stats['level'] else ""))
+        region = props.region_stats
+        for i, c in enumerate("RGBA"):
+            text = "{}: mean {:.3f}  std {:.3f}".format(
+                c, stats['mean'][i], stats['std'][i])
+            if region is not None:
+                text += "  [{:.3f}, {:.3f}]".format(
+                    region['min'][i], region['max'][i])
+            col.label(text=text)
+        if region is not None:
+            for i, c in enumerate("RGB"):
+                hist = region['histogram'][i]
+                peak = max(1, hist.max())
+                col.label(text="{} {}".format(c, "".join(
+                    " .:-=+*#"[int(v * 7 / peak)] for v in hist)))
+
+    def draw_profile(self, col):
+        for r in reversed(profiler.last(5)):
+            col.label(text="{}: {:.1f} ms  {:.2f} Mpix  {:.1f} MB".format(
+                r['op'], r['seconds'] * 1000.0, r['pixels'] / 1.0e6,
+                (r['bytes_read'] + r['bytes_written']) / (1024.0 * 1024.0)))
+            phases = "  ".join(
+                "{} {:.1f}".format(k, v * 1000.0)
+                for k, v in sorted(r['phases'].items()))
+            if r['peak_memory'] is not None:
+                phases += "  peak {:.1f} MB".format(
+                    r['peak_memory'] / (1024.0 * 1024.0))
+            if phases:
+                col.label(text="    " + phases)
+
+    def draw_jobs(self, col):
+        jobs = job_queue.active()
+        for job in jobs:
+            col.label(text="{} ({}): {}".format(
+                job.name, job.image_name,
+                "{:.0f}%".format(job.progress * 100.0)
+                if job.state == 'RUNNING' else "queued"))
+        if jobs:
+            col.operator(PT_CancelJobs.bl_idname, text="Cancel", icon='X')
+
+    def draw(self, context):
+        sc = context.scene
+        props = sc.pt_props
+        layout = self.layout
+        layout.label(text="Selection")
+        if props.running == False:
+            layout.operator(
+                PT_BoxRenderer.bl_idname, text="Rectangular",
+                icon='BORDER_RECT')
+        else:
+            layout.operator(PT_BoxRenderer.bl_idname, text="", icon='PAUSE')
+
+            layout.separator()
+            layout.separator()
+
+            col = layout.column()
+            col.operator(
+                PT_SelectAll.bl_idname, text="Select All", icon='FULLSCREEN')
+            row = col.row(align=True)
+            row.operator(PT_MagicWand.bl_idname, text="Magic Wand")
+            row.prop(sc, "pt_wand_tolerance", text="")
+            if props.mask_selection is not None:
+                row.operator(PT_ClearMask.bl_idname, text="", icon='X')
+                col.label(text="Masked: {} px ({:.1f} KB)".format(
+                    props.mask_selection.count,
+                    props.mask_selection.memory_usage() / 1024.0))
+
+            layout.separator()
+
+            col = layout.column()
+            row = col.row(align=True)
+            row.operator(PT_Undo.bl_idname, text="Undo", icon='LOOP_BACK')
+            row.operator(PT_Redo.bl_idname, text="Redo", icon='LOOP_FORWARDS')
+            row.operator(PT_ClearHistory.bl_idname, text="", icon='X')
+            # steps of the shown image, memory of all of them
+            img = context.space_data.image
+            steps = (0, 0)
+            if img is not None:
+                steps = (undo_history.num_undo(img.name),
+                         undo_history.num_redo(img.name))
+            col.label(text="Steps: {} / {}  ({:.1f} MB)".format(
+                steps[0], steps[1],
+                undo_history.memory_usage() / (1024.0 * 1024.0)))
+
+            layout.separator()
+
+            col = layout.column()
+            row = col.row()
+            row.operator(PT_CopyRect.bl_idname, text="Copy")
+            row.operator(PT_CutRect.bl_idname, text="Cut")
+            row.operator(PT_PasteRect.bl_idname, text="Paste")
+            row = col.row(align=True)
+            row.prop(sc, "pt_blend_mode", text="")
+            row.prop(sc, "pt_blend_opacity", text="Opacity")
+            col.prop(sc, "pt_clipboard_slot", text="Slot")
+            row = col.row()
+            row.prop(sc, "pt_clipboard_format", text="")
+            row.prop(sc, "pt_clipboard_compression", text="")
+            for name, entry in clipboard.entries():
+                col.label(text="{}: {}x{} ({:.1f} KB)".format(
+                    name, entry['width'], entry['height'],
+                    len(entry['data']) / 1024.0))
+            row = col.row()
+            row.prop(sc, "pt_clipboard_budget", text="Budget (MB)")
+            row.operator(PT_ClearClipboard.bl_idname, text="", icon='X')
+
+            layout.separator()
+
+            col = layout.column()
+            col.operator(PT_FillRect.bl_idname, text="Fill", icon='TPAINT_HLT')
+            row = col.row()
+            row.label(text="Color:")
+            row.prop(sc, "pt_fill_color", text="")
+
+            layout.separator()
+
+            layout.label(text="Shapes")
+            col = layout.column()
+            row = col.row(align=True)
+            row.operator(PT_DrawLine.bl_idname, text="Line")
+            row.operator(PT_DrawRect.bl_idname, text="Rect")
+            row.operator(PT_DrawEllipse.bl_idname, text="Ellipse")
+            row = col.row()
+            row.prop(sc, "pt_stroke_width", text="Width")
+            row.prop(sc, "pt_shape_fill", text="Fill")
+            row = col.row(align=True)
+            row.operator(
+                PT_PolylineAddPoint.bl_idname,
+                text="Add Point ({})".format(len(props.polyline)))
+            row.operator(PT_PolylineDraw.bl_idname, text="Polyline")
+            row.operator(PT_PolylineClear.bl_idname, text="", icon='X')
+
+            layout.separator()
+
+            col = layout.column()
+            col.operator(PT_EraseRect.bl_idname, text="Erase", icon='X_VEC')
+
+            layout.separator()
+
+            col = layout.column()
+            col.operator(
+                PT_BinarizeRect.bl_idname, text="Binarize", icon='IMAGE_ALPHA')
+            split = layout.split()
+            col = split.column()
+            col.label(text="Threshold:")
+            row = col.row(align=True)
+            row.prop(sc, "pt_binarize_threshold", text="")
+            row.operator(PT_AutoThreshold.bl_idname, text="Auto")
+            col = split.column()
+            col.label(text="Color:")
+            col.prop(sc, "pt_binarize_threshold_color", text="")
+
+            layout.separator()
+
+            col = layout.column()
+            col.operator(
+                PT_GrayScaleRect.bl_idname, text="Gray Scale",
+                icon='IMAGE_ZDEPTH')
+            row = col.row()
+            row.label(text="Color:")
+            row.prop(sc, "pt_gray_scale_color", text="")
+
+            layout.separator()
+
+            col = layout.column()
+            col.operator(
+                PT_ChangeBrightnessRect.bl_idname, text="Change Brightness",
+                icon='LAMP_SUN')
+            row = col.row()
+            row.label(text="Brightness:")
+            row.prop(sc, "pt_change_brightness_value", text="")
+
+            layout.separator()
+
+            col = layout.column()
+            col.operator(
+                PT_InvertRect.bl_idname, text="Invert", icon="SEQ_CHROMA_SCOPE")
+
+            layout.separator()
+
+            layout.label(text="Filters")
+            col = layout.column()
+            row = col.row(align=True)
+            row.operator(PT_BlurRect.bl_idname, text="Blur")
+            row.operator(PT_BoxBlurRect.bl_idname, text="Box Blur")
+            row = col.row(align=True)
+            row.operator(PT_SharpenRect.bl_idname, text="Sharpen")
+            row.operator(PT_EdgeDetectRect.bl_idname, text="Edges")
+            col.prop(sc, "pt_filter_radius", text="Radius")
+            col.prop(sc, "pt_sharpen_amount", text="Amount")
+
+            layout.separator()
+
+            layout.label(text="New Image")
+            col = layout.column()
+            col.operator(PT_CropRect.bl_idname, text="Crop")
+            row = col.row(align=True)
+            row.operator(PT_ResizeRect.bl_idname, text="Resize")
+            row.prop(sc, "pt_resize_scale", text="")
+            col.prop(sc, "pt_resize_filter", text="")
+
+            layout.separator()
+
+            row = layout.row()
+            row.prop(sc, "pt_show_stats", text="Statistics")
+            row.operator(
+                PT_UpdateStatistics.bl_idname, text="", icon='FILE_REFRESH')
+            if sc.pt_show_stats:
+                self.draw_stats(layout.column(align=True), sc)
+
+            layout.separator()
+
+            layout.label(text="Preview")
+            col = layout.column()
+            row = col.row()
+            row.prop(sc, "pt_preview", text="")
+            row.prop(sc, "pt_preview_mode", text="")
+            row.operator(PT_ApplyPreview.bl_idname, text="Apply")
+            col.prop(sc, "pt_preview_max_size", text="Size")
+            if sc.pt_preview:
+                col.label(text="{:.1f} ms / refresh ({:.0f} fps max)".format(
+                    preview_renderer.get_refresh_time() * 1000.0,
+                    preview_renderer.get_max_fps()))
+
+            layout.separator()
+
+            layout.label(text="Pipeline")
+            col = layout.column()
+            row = col.row(align=True)
+            row.prop(sc, "pt_pipeline_op", text="")
+            row.operator(PT_PipelineAddStep.bl_idname, text="", icon='ZOOMIN')
+            row.operator(
+                PT_PipelineRemoveStep.bl_idname, text="", icon='ZOOMOUT')
+            for i, line in enumerate(props.pipeline.describe()):
+                col.label(text="{}. {}".format(i + 1, line))
+            row = col.row()
+            row.operator(PT_PipelineRun.bl_idname, text="Run")
+            row.operator(PT_PipelineClear.bl_idname, text="Clear")
+
+            layout.separator()
+
+            layout.label(text="Background Jobs")
+            col = layout.column()
+            col.prop(sc, "pt_background", text="Run in Background")
+            col.prop(sc, "pt_job_workers", text="Job Workers")
+            self.draw_jobs(col)
+
+            layout.separator()
+
+            layout.label(text="Performance")
+            col = layout.column()
+            col.prop(sc, "pt_tile_size", text="Tile Size")
+            col.prop(sc, "pt_memory_limit", text="Memory Limit (MB)")
+            col.prop(sc, "pt_workers", text="Workers")
+            col.prop(sc, "pt_redraw_fps", text="Redraw Rate")
+            col.label(text="Redraws: {} / {} requested".format(
+                redraw_scheduler.performed, redraw_scheduler.requested))
+
+            layout.separator()
+
+            layout.label(text="Cache")
+            col = layout.column()
+            col.prop(sc, "pt_use_cache", text="Use Cache")
+            col.prop(sc, "pt_cache_lazy_flush", text="Lazy Flush")
+            col.prop(sc, "pt_cache_budget", text="Budget (MB)")
+            col.prop(sc, "pt_storage_mode", text="Storage")
+            row = col.row()
+            row.operator(PT_FlushCache.bl_idname, text="Flush")
+            row.operator(PT_ClearCache.bl_idname, text="Clear")
+            col.label(text="Hits: {}  Misses: {}  Evictions: {}".format(
+                image_cache.hits, image_cache.misses, image_cache.evictions))
+            col.label(text="Memory: {:.1f} MB  Stale: {}".format(
+                image_cache.memory_usage() / (1024.0 * 1024.0),
+                image_cache.stale))
+
+            layout.separator()
+
+            layout.label(text="Profiling")
+            col = layout.column()
+            row = col.row()
+            row.prop(sc, "pt_profile", text="Profile")
+            row.prop(sc, "pt_profile_memory", text="Memory")
+            col.prop(sc, "pt_profile_size", text="Records")
+            row = col.row(align=True)
+            row.prop(sc, "pt_profile_path", text="")
+            row.operator(PT_DumpProfile.bl_idname, text="Dump")
+            row.operator(PT_ClearProfile.bl_idname, text="", icon='X')
+            if sc.pt_profile:
+                self.draw_profile(col.column(align=True))
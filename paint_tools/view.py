@@ -0,0 +1,84 @@
+import numpy as np
+
+
+class ViewTransform():
+
+    # region <-> pixel mapping of an image editor: the view spans the image
+    # from (0, 0) to (1, 1), and view2d maps it linearly to the region
+    def __init__(self, width, height, x0, y0, x1, y1):
+        self.width = width
+        self.height = height
+        self.x0 = x0
+        self.y0 = y0
+        self.x1 = x1
+        self.y1 = y1
+        self.__origin = np.array([x0, y0], dtype=np.float64)
+        self.__extent = np.array([x1 - x0, y1 - y0], dtype=np.float64)
+        self.__size = np.array([width, height], dtype=np.float64)
+
+    def get_zoom(self):
+        # region pixels per image pixel
+        return (self.x1 - self.x0) / max(1, self.width)
+
+    def to_pixel(self, rx, ry):
+        return (int(self.width * ((rx - self.x0) / (self.x1 - self.x0))),
+                int(self.height * ((ry - self.y0) / (self.y1 - self.y0))))
+
+    def to_pixels(self, points):
+        # (n, 2) region points to (n, 2) pixels, truncated like to_pixel
+        p = np.asarray(points, dtype=np.float64) - self.__origin
+        p /= self.__extent
+        p *= self.__size
+        return p.astype(np.intp)
+
+    def to_region(self, px, py):
+        return (self.x0 + px / self.width * (self.x1 - self.x0),
+                self.y0 + py / self.height * (self.y1 - self.y0))
+
+    def to_regions(self, pixels):
+        p = np.asarray(pixels, dtype=np.float64) / self.__size
+        p *= self.__extent
+        p += self.__origin
+        return p
+
+    def clamp_region(self, rx, ry):
+        return (min(max(rx, self.x0), self.x1), min(max(ry, self.y0), self.y1))
+
+
+class ViewCache():
+
+    # one transform per image editor region; two editors showing the same
+    # image at different zoom levels map differently
+    def __init__(self):
+        self.transforms = {}
+        self.captures = 0
+        self.hits = 0
+
+    def capture(self, key, view2d, width, height):
+        self.transforms.pop(key, None)
+        if width <= 0 or height <= 0:
+            return None
+        x0, y0 = view2d.view_to_region(0.0, 0.0, clip=False)
+        x1, y1 = view2d.view_to_region(1.0, 1.0, clip=False)
+        if x0 == x1 or y0 == y1:
+            return None
+        transform = ViewTransform(width, height, x0, y0, x1, y1)
+        self.transforms[key] = transform
+        self.captures += 1
+        return transform
+
+    def get(self, key):
+        transform = self.transforms.get(key)
+        if transform is not None:
+            self.hits += 1
+        return transform
+
+    def invalidate(self, key=None):
+        # all regions when no key is given
+        if key is None:
+            self.transforms.clear()
+        else:
+            self.transforms.pop(key, None)
+
+
+view_cache = ViewCache()
@@ -0,0 +1,105 @@
+import numpy as np
+
+
+# The per-pixel implementations the operators used before paint_tools.core,
+# kept as the reference the vectorized kernels are checked against. They
+# work on a flat float64 RGBA array like img.pixels[:] and expect a rect
+# already clipped to the image.
+
+def reshape(img):
+    return img['pixels'].reshape((img['height'], img['width'], 4))
+
+
+def fill_rect(img, rect, color):
+    x0, y0, x1, y1 = rect['x0'], rect['y0'], rect['x1'], rect['y1']
+    reshape(img)[y0:y1, x0:x1] = [color[0], color[1], color[2], 1.0]
+
+
+def copy_rect(img, rect):
+    x0, y0, x1, y1 = rect['x0'], rect['y0'], rect['x1'], rect['y1']
+    return {'pixels': reshape(img)[y0:y1, x0:x1].copy(),
+            'width': x1 - x0, 'height': y1 - y0}
+
+
+def cut_rect(img, rect):
+    info = copy_rect(img, rect)
+    x0, y0, x1, y1 = rect['x0'], rect['y0'], rect['x1'], rect['y1']
+    reshape(img)[y0:y1, x0:x1] = 0.0
+    return info
+
+
+def paste_rect(img, p, copied):
+    # per pixel, dropping what falls outside the image; the original slice
+    # assignment raised or wrapped around there
+    w = img['width']
+    h = img['height']
+    pixels = img['pixels']
+    for y in range(copied['height']):
+        for x in range(copied['width']):
+            px = int(p[0]) + x
+            py = int(p[1]) - copied['height'] + y
+            if 0 <= px < w and 0 <= py < h:
+                offset = (py * w + px) * 4
+                pixels[offset:offset + 4] = copied['pixels'][y, x]
+
+
+def binarize_rect(img, rect, threshold, color):
+    x0, y0, x1, y1 = rect['x0'], rect['y0'], rect['x1'], rect['y1']
+    pixels_rect = reshape(img)[y0:y1, x0:x1]
+    t = threshold / 255.0
+    i = ['RED', 'GREEN', 'BLUE'].index(color)
+    fill_black = pixels_rect[:, :, i] < t
+    fill_white = pixels_rect[:, :, i] > t
+    pixels_rect[fill_black, :3] = 0.0
+    pixels_rect[fill_white, :3] = 1.0
+
+
+def gray_scale_rect(img, rect, color):
+    x0, y0, x1, y1 = rect['x0'], rect['y0'], rect['x1'], rect['y1']
+    w = img['width']
+    pixels = img['pixels']
+    for y in range(y1 - y0):
+        for x in range(x1 - x0):
+            offset = ((y + y0) * w + x + x0) * 4
+            if color in ('RED', 'GREEN', 'BLUE'):
+                i = ['RED', 'GREEN', 'BLUE'].index(color)
+                c = pixels[offset + i]
+            elif color == 'AVERAGE':
+                c = pixels[offset] + pixels[offset + 1] + pixels[offset + 2]
+                c = c / 3
+            elif color == 'NTSC':
+                c = 0.298912 * pixels[offset]
+                c = c + 0.586611 * pixels[offset + 1]
+                c = c + 0.114478 * pixels[offset + 2]
+            pixels[offset:offset + 3] = c
+
+
+def change_brightness_rect(img, rect, brightness):
+    x0, y0, x1, y1 = rect['x0'], rect['y0'], rect['x1'], rect['y1']
+    w = img['width']
+    pixels = img['pixels']
+    b = brightness / 255.0
+    for y in range(y1 - y0):
+        for x in range(x1 - x0):
+            offset = ((y + y0) * w + x + x0) * 4
+            pixels[offset] = pixels[offset] + b
+            pixels[offset + 1] = pixels[offset + 1] + b
+            pixels[offset + 2] = pixels[offset + 2] + b
+
+
+def invert_rect(img, rect):
+    x0, y0, x1, y1 = rect['x0'], rect['y0'], rect['x1'], rect['y1']
+    w = img['width']
+    pixels = img['pixels']
+    for y in range(y1 - y0):
+        for x in range(x1 - x0):
+            offset = ((y + y0) * w + x + x0) * 4
+            pixels[offset] = 1.0 - pixels[offset]
+            pixels[offset + 1] = 1.0 - pixels[offset + 1]
+            pixels[offset + 2] = 1.0 - pixels[offset + 2]
+
+
+def new_img(pixels):
+    h, w = pixels.shape[:2]
+    return {'pixels': pixels.astype(np.float64).reshape(-1),
+            'width': w, 'height': h}
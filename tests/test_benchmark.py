@@ -0,0 +1,44 @@
+import io
+
+from paint_tools import benchmark
+
+
+def test_compare_flags_only_slower_cases(tmp_path):
+    path = str(tmp_path / "baseline.json")
+    base = [
+        {'op': 'fill', 'size': 512, 'selection': 1.0, 'seconds': 0.010},
+        {'op': 'invert', 'size': 512, 'selection': 1.0, 'seconds': 0.010},
+    ]
+    benchmark.save_results('ops', base, path)
+    now = [
+        {'op': 'fill', 'size': 512, 'selection': 1.0, 'seconds': 0.011},
+        {'op': 'invert', 'size': 512, 'selection': 1.0, 'seconds': 0.020},
+        # not in the baseline
+        {'op': 'erase', 'size': 512, 'selection': 1.0, 'seconds': 1.0},
+    ]
+    regressions = benchmark.compare_results(
+        'ops', now, path, 1.25, out=io.StringIO())
+    assert regressions == ['ops invert size=512 selection=1.0']
+
+
+def test_main_fails_on_regression(tmp_path):
+    path = str(tmp_path / "baseline.json")
+    argv = ["--sizes", "64", "--selections", "1.0", "--repeat", "1",
+            "--ops", "fill"]
+    assert benchmark.main(argv + ["--save", path]) == 0
+    # nothing is faster than zero times the baseline
+    assert benchmark.main(
+        argv + ["--compare", path, "--threshold", "0"]) == 1
+
+
+def test_wand_selects_a_large_region_within_budget(monkeypatch):
+    results = benchmark.run_wand([256], 1, out=io.StringIO())
+    radial = [r for r in results if r['op'] == 'wand_radial'][0]
+    assert 0.3 < radial['selected'] < 0.5
+    assert radial['budget'] is not None
+    assert [r['budget'] for r in results if r['op'] == 'wand_noise'] == [None]
+    argv = ["--wand", "--sizes", "64", "--repeat", "1"]
+    monkeypatch.setattr(benchmark, 'WAND_BUDGET', 1.0e6)
+    assert benchmark.main(argv) == 0
+    monkeypatch.setattr(benchmark, 'WAND_BUDGET', 0.0)
+    assert benchmark.main(argv) == 1
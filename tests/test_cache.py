@@ -0,0 +1,165 @@
+import numpy as np
+
+from paint_tools.cache import ImageCache
+from paint_tools.pixel_io import NumpyImage, NumpyPixelIO, PixelTransfer
+
+
+def new_cache():
+    cache = ImageCache(transfer=PixelTransfer(NumpyPixelIO()))
+    cache.lazy_flush = True
+    return cache
+
+
+def new_image(name="img", width=8, height=6, value=0.25):
+    pixels = np.full(width * height * 4, value, dtype=np.float32)
+    return NumpyImage(name, width, height, pixels)
+
+
+def edit(cache, image, value=1.0):
+    source = cache.get_source(image)
+    source.view(0, 0, 2, 2)[...] = value
+    source.update()
+
+
+def test_lazy_edits_stay_until_flushed():
+    cache = new_cache()
+    image = new_image()
+    edit(cache, image)
+    assert image.pixels[0] == 0.25
+    assert cache.is_dirty()
+    cache.flush()
+    assert image.pixels[0] == 1.0
+    assert not cache.is_dirty()
+
+
+def test_revalidate_keeps_unchanged_images():
+    cache = new_cache()
+    image = new_image()
+    edit(cache, image)
+    cache.revalidate({image.name: image})
+    assert image in cache
+    assert cache.is_dirty()
+    cache.flush()
+    assert image.pixels[0] == 1.0
+
+
+def test_revalidate_drops_replaced_and_resized_images():
+    cache = new_cache()
+    a = new_image("a")
+    b = new_image("b")
+    c = new_image("c")
+    for image in (a, b, c):
+        cache.get(image)
+    replaced = new_image("b", value=0.5)
+    resized = new_image("c", width=4)
+    cache.revalidate({"a": a, "b": replaced, "c": resized})
+    assert a in cache
+    assert replaced not in cache
+    assert resized not in cache
+    assert cache.get(replaced)['pixels'][0, 0, 0] == 0.5
+
+
+def test_revalidate_drops_removed_images():
+    cache = new_cache()
+    image = new_image()
+    cache.get(image)
+    cache.revalidate({})
+    assert len(cache) == 0
+
+
+def paint(image, x0, y0, x1, y1, value):
+    # an edit made outside Paint Tools, like a brush stroke
+    w, h = image.size
+    image.pixels.reshape(h, w, 4)[y0:y1, x0:x1] = value
+    image.is_dirty = True
+
+
+def pixel(image, x, y):
+    w, h = image.size
+    return image.pixels.reshape(h, w, 4)[y, x, 0]
+
+
+def fill_most(cache, image, value):
+    # dirty over half the image, so the write-back is a bulk write
+    source = cache.get_source(image)
+    source.view(0, 0, image.size[0], image.size[1] - 1)[...] = value
+    source.update()
+
+
+def test_external_edit_between_two_operators():
+    cache = new_cache()
+    cache.lazy_flush = False
+    image = new_image()
+    edit(cache, image)
+    paint(image, 4, 5, 6, 6, 0.75)
+    fill_most(cache, image, 0.5)
+    assert cache.stale == 1
+    # the stroke on the last row survives the bulk write of the second op
+    assert pixel(image, 4, 5) == 0.75
+    assert pixel(image, 0, 5) == 0.25
+    assert pixel(image, 0, 0) == 0.5
+
+
+def test_external_edit_under_lazy_edits():
+    cache = new_cache()
+    image = new_image()
+    fill_most(cache, image, 0.5)
+    paint(image, 0, 0, 8, 6, 0.75)
+    cache.flush()
+    # the pending edit lands on its own rect, the stroke stays elsewhere
+    assert pixel(image, 0, 0) == 0.5
+    assert pixel(image, 0, 5) == 0.75
+    assert image not in cache
+
+
+def test_clean_image_is_not_read_again():
+    cache = new_cache()
+    image = new_image()
+    image.is_dirty = False
+    cache.get(image)
+    image.pixels[:] = 0.0
+    # nothing marked the image changed, so the entry is trusted
+    assert cache.get_source(image).pixels[0, 0, 0] == 0.25
+    cache.expect_changes()
+    assert cache.get_source(image).pixels[0, 0, 0] == 0.0
+
+
+def test_unchanged_dirty_image_keeps_its_entry():
+    cache = new_cache()
+    cache.lazy_flush = False
+    image = new_image()
+    edit(cache, image)
+    entry = cache.get(image)
+    edit(cache, image, 0.5)
+    assert cache.get(image) is entry
+    assert cache.stale == 0
+
+
+def resize(image, width, height):
+    # Image.scale keeps the datablock and its name
+    image.size = (width, height)
+    image.pixels = np.full(width * height * 4, 0.125, dtype=np.float32)
+    image.is_dirty = True
+
+
+def test_resize_between_two_operators():
+    cache = new_cache()
+    image = new_image()
+    edit(cache, image)
+    resize(image, 4, 3)
+    source = cache.get_source(image)
+    assert source.pixels.shape == (3, 4, 4)
+    # the edits made for the old size are not written into the new one
+    assert np.all(image.pixels == 0.125)
+    fill_most(cache, image, 0.5)
+    cache.flush()
+    assert pixel(image, 0, 0) == 0.5
+
+
+def test_flush_after_resize_writes_nothing():
+    cache = new_cache()
+    image = new_image()
+    edit(cache, image)
+    resize(image, 16, 12)
+    assert cache.flush() == 0
+    assert np.all(image.pixels == 0.125)
@@ -0,0 +1,95 @@
+import io
+import os
+
+import numpy as np
+import pytest
+
+from paint_tools import cli
+
+imageio = pytest.importorskip("imageio")
+
+
+def write_images(root):
+    # RGB, RGBA and gray PNGs, one in a sub directory
+    rng = np.random.RandomState(0)
+    images = {
+        'rgb.png': rng.randint(0, 256, (20, 30, 3)).astype(np.uint8),
+        'rgba.png': rng.randint(0, 256, (16, 12, 4)).astype(np.uint8),
+        os.path.join('sub', 'gray.png'):
+            rng.randint(0, 256, (9, 14)).astype(np.uint8),
+    }
+    os.makedirs(os.path.join(root, 'sub'))
+    for rel, data in images.items():
+        cli.imageio.imwrite(os.path.join(root, rel), data)
+    return images
+
+
+def inverted(data):
+    out = 255 - data
+    if data.ndim == 3 and data.shape[2] == 4:
+        out[..., 3] = data[..., 3]
+    return out
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_cli_inverts_a_directory(tmp_path, workers):
+    src = str(tmp_path / "in")
+    dst = str(tmp_path / "out")
+    images = write_images(src)
+    assert cli.main(
+        [src, "-o", dst, "--op", "invert", "-j", str(workers)]) == 0
+    for rel, data in images.items():
+        result = np.asarray(cli.imageio.imread(os.path.join(dst, rel)))
+        np.testing.assert_array_equal(result, inverted(data))
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_cli_rect_and_resize(tmp_path, workers):
+    src = str(tmp_path / "in")
+    dst = str(tmp_path / "out")
+    images = write_images(src)
+    # bottom-left origin: the rect is the two bottom rows of the file
+    assert cli.main(
+        [src, "-o", dst, "--op", "fill:color=0/0/0", "--rect", "0", "0",
+         "1000", "2", "-j", str(workers)]) == 0
+    result = np.asarray(cli.imageio.imread(os.path.join(dst, 'rgb.png')))
+    expected = images['rgb.png'].copy()
+    expected[-2:] = 0
+    np.testing.assert_array_equal(result, expected)
+
+    assert cli.main(
+        [src, "-o", dst, "--resize", "7", "5", "--filter", "bilinear",
+         "-j", str(workers)]) == 0
+    for rel, data in images.items():
+        result = np.asarray(cli.imageio.imread(os.path.join(dst, rel)))
+        assert result.shape[:2] == (5, 7)
+        assert result.shape[2:] == data.shape[2:]
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_cli_exits_with_1_on_a_broken_file(tmp_path, workers):
+    src = str(tmp_path / "in")
+    dst = str(tmp_path / "out")
+    images = write_images(src)
+    with open(os.path.join(src, 'broken.png'), 'wb') as f:
+        f.write(b'not a png')
+    assert cli.main(
+        [src, "-o", dst, "--op", "invert", "-j", str(workers)]) == 1
+    # the other files are still written
+    for rel in images:
+        assert os.path.isfile(os.path.join(dst, rel))
+    assert not os.path.exists(os.path.join(dst, 'broken.png'))
+
+    out = io.StringIO()
+    stats = cli.run(
+        cli.find_images([src]), dst, [{'op': 'INVERT', 'params': {}}],
+        workers=workers, out=out)
+    assert (stats['images'], stats['errors']) == (3, 1)
+    assert "error:" in out.getvalue()
+    assert "3 images (1 errors)" in out.getvalue()
+
+
+def test_cli_needs_something_to_do(tmp_path):
+    with pytest.raises(SystemExit) as e:
+        cli.main([str(tmp_path), "-o", str(tmp_path / "out")])
+    assert e.value.code == 2
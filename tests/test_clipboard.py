@@ -0,0 +1,28 @@
+import numpy as np
+
+from paint_tools.clipboard import Clipboard, get_format
+from paint_tools.pixel_io import NumpyImage
+
+
+def test_auto_format_follows_the_image():
+    image = NumpyImage("img", 2, 2)
+    image.is_float = False
+    assert get_format('AUTO', image) == 'UINT8'
+    image.is_float = True
+    assert get_format('AUTO', image) == 'FLOAT32'
+    assert get_format('HALF', image) == 'HALF'
+
+
+def test_default_store_is_lossless():
+    pixels = np.array([[[1.0e-4, 1.0 / 3.0, 70000.0, 1.0]]], np.float32)
+    clipboard = Clipboard()
+    clipboard.store("slot", pixels)
+    assert np.array_equal(clipboard.load("slot"), pixels)
+
+
+def test_uint8_keeps_8_bit_images_exact():
+    values = np.arange(256, dtype=np.float32) / 255.0
+    pixels = np.repeat(values, 4).reshape((16, 16, 4))
+    clipboard = Clipboard()
+    clipboard.store("slot", pixels, 'UINT8')
+    assert np.array_equal(clipboard.load("slot"), pixels)
@@ -0,0 +1,102 @@
+import itertools
+
+import numpy as np
+import pytest
+
+from paint_tools.composite import (
+    BLEND_MODES, DEFAULT_BLEND_MODE, composite, composite_at,
+    kernel_fill_blend)
+
+
+ALPHAS = [0.0, 0.4, 1.0]
+
+
+def blend_pixel(d, s, mode, opacity):
+    # one straight alpha pixel at a time, from the separable blend formula
+    # co = sa (1 - da) cs + sa da B(cs, cd) + (1 - sa) da cd
+    if mode == 'REPLACE':
+        return [dc + (sc - dc) * opacity for dc, sc in zip(d, s)]
+    da = d[3]
+    sa = s[3] * opacity
+    ao = sa + (1.0 - sa) * da
+    out = []
+    for cd, cs in zip(d[:3], s[:3]):
+        if mode == 'PREMULTIPLIED':
+            co = cs * opacity + (1.0 - sa) * da * cd
+        elif mode == 'ADD':
+            co = sa * cs + da * cd
+        else:
+            b = {'OVER': cs,
+                 'MULTIPLY': cs * cd,
+                 'SCREEN': cs + cd - cs * cd}[mode]
+            co = sa * (1.0 - da) * cs + sa * da * b + (1.0 - sa) * da * cd
+        out.append(co / ao if ao > 0.0 else 0.0)
+    return out + [ao]
+
+
+def new_pixels(seed):
+    # every pair of source and destination alphas
+    rng = np.random.RandomState(seed)
+    pairs = list(itertools.product(ALPHAS, ALPHAS))
+    dst = rng.random_sample((len(pairs), 4)).astype(np.float32)
+    src = rng.random_sample((len(pairs), 4)).astype(np.float32)
+    dst[:, 3] = [p[0] for p in pairs]
+    src[:, 3] = [p[1] for p in pairs]
+    return dst, src
+
+
+@pytest.mark.parametrize("opacity", [1.0, 0.5, 0.0])
+@pytest.mark.parametrize("mode", BLEND_MODES)
+def test_blend_modes_match_the_formulas(mode, opacity):
+    dst, src = new_pixels(1)
+    if mode == 'PREMULTIPLIED':
+        src[:, :3] *= src[:, 3:]
+    expected = [blend_pixel(d, s, mode, opacity)
+                for d, s in zip(dst.tolist(), src.tolist())]
+    composite(dst, src, mode, opacity)
+    np.testing.assert_allclose(dst, expected, rtol=0, atol=2.0e-6)
+
+
+@pytest.mark.parametrize("mode", ['OVER', 'MULTIPLY', 'SCREEN'])
+def test_transparent_source_keeps_the_destination(mode):
+    dst, src = new_pixels(2)
+    src[:, 3] = 0.0
+    visible = dst[:, 3] > 0.0
+    before = dst.copy()
+    composite(dst, src, mode)
+    np.testing.assert_allclose(dst[visible], before[visible], atol=1.0e-6)
+    assert not dst[~visible].any()
+
+
+def test_opaque_over_is_replace():
+    dst, src = new_pixels(3)
+    src[:, 3] = 1.0
+    composite(dst, src, 'OVER')
+    np.testing.assert_array_equal(dst, src)
+
+
+def test_default_mode_overwrites():
+    # Paste and Fill keep replacing the pixels, alpha included
+    assert DEFAULT_BLEND_MODE == 'REPLACE'
+    dst, src = new_pixels(4)
+    composite(dst, src)
+    np.testing.assert_array_equal(dst, src)
+    pixels = np.ones((4, 5, 4), dtype=np.float32)
+    kernel_fill_blend(pixels, (0.2, 0.3, 0.4, 0.0))
+    np.testing.assert_allclose(
+        pixels, np.broadcast_to([0.2, 0.3, 0.4, 0.0], pixels.shape))
+
+
+def test_composite_at_clips_to_the_image():
+    pixels = np.zeros((6, 8, 4), dtype=np.float32)
+    src = np.ones((4, 4, 4), dtype=np.float32)
+    assert composite_at(pixels, 6, -2, src) == (6, 0, 8, 2)
+    assert pixels[0:2, 6:8].all()
+    assert np.count_nonzero(pixels[..., 0]) == 4
+    assert composite_at(pixels, 8, 0, src) is None
+
+
+def test_unknown_mode_raises():
+    dst, src = new_pixels(5)
+    with pytest.raises(ValueError):
+        composite(dst, src, 'DIFFERENCE')
@@ -0,0 +1,117 @@
+import numpy as np
+import pytest
+
+from paint_tools import core
+
+from . import baseline
+
+
+WIDTH = 37
+HEIGHT = 23
+
+RECTS = [
+    {'x0': 3, 'y0': 2, 'x1': 20, 'y1': 15},
+    {'x0': 0, 'y0': 0, 'x1': WIDTH, 'y1': HEIGHT},
+    # clipped by clip_rect at every side
+    {'x0': -5, 'y0': -4, 'x1': 10, 'y1': 8},
+    {'x0': 30, 'y0': 18, 'x1': WIDTH + 9, 'y1': HEIGHT + 6},
+    {'x0': -3, 'y0': 5, 'x1': WIDTH + 3, 'y1': 6},
+    # empty after clipping
+    {'x0': WIDTH + 1, 'y0': 0, 'x1': WIDTH + 5, 'y1': 4},
+    {'x0': 7, 'y0': 7, 'x1': 7, 'y1': 12},
+]
+
+
+def random_pixels(seed=0):
+    rng = np.random.RandomState(seed)
+    return rng.random_sample((HEIGHT, WIDTH, 4)).astype(np.float32)
+
+
+def clipped(pixels, rect):
+    x0, y0, x1, y1 = core.clip_rect(pixels, rect)
+    return {'x0': x0, 'y0': y0, 'x1': x1, 'y1': y1}
+
+
+def run_both(rect, op, ref):
+    pixels = random_pixels()
+    img = baseline.new_img(pixels)
+    ref(img, clipped(pixels, rect))
+    op(pixels, rect)
+    return pixels, baseline.reshape(img)
+
+
+def assert_same(actual, expected):
+    np.testing.assert_allclose(actual, expected, rtol=0, atol=1e-6)
+
+
+@pytest.mark.parametrize('rect', RECTS)
+def test_fill(rect):
+    color = (0.25, 0.5, 0.75)
+    assert_same(*run_both(
+        rect, lambda p, r: core.fill(p, r, color),
+        lambda img, r: baseline.fill_rect(img, r, color)))
+
+
+@pytest.mark.parametrize('rect', RECTS)
+def test_cut(rect):
+    pixels = random_pixels()
+    img = baseline.new_img(pixels)
+    expected = baseline.cut_rect(img, clipped(pixels, rect))
+    actual = core.cut(pixels, rect)
+    assert actual['width'] == expected['width']
+    assert actual['height'] == expected['height']
+    assert_same(actual['pixels'], expected['pixels'])
+    assert_same(pixels, baseline.reshape(img))
+
+
+@pytest.mark.parametrize('rect', RECTS)
+@pytest.mark.parametrize('offset', [(0, 0), (11, -6), (-8, 9), (30, 20)])
+def test_paste(rect, offset):
+    copied = core.copy(random_pixels(1), rect)
+    p = (rect['x0'] + offset[0], rect['y1'] + offset[1])
+    pixels = random_pixels()
+    img = baseline.new_img(pixels)
+    baseline.paste_rect(img, p, copied)
+    core.paste(pixels, p, copied)
+    assert_same(pixels, baseline.reshape(img))
+
+
+@pytest.mark.parametrize('rect', RECTS)
+@pytest.mark.parametrize('color', ['NTSC', 'AVERAGE', 'RED', 'GREEN', 'BLUE'])
+def test_gray_scale(rect, color):
+    assert_same(*run_both(
+        rect, lambda p, r: core.gray_scale(p, r, color),
+        lambda img, r: baseline.gray_scale_rect(img, r, color)))
+
+
+@pytest.mark.parametrize('rect', RECTS)
+@pytest.mark.parametrize('color', ['RED', 'GREEN', 'BLUE'])
+@pytest.mark.parametrize('threshold', [0, 100, 128, 255])
+def test_binarize(rect, color, threshold):
+    assert_same(*run_both(
+        rect, lambda p, r: core.binarize(p, r, threshold / 255.0, color),
+        lambda img, r: baseline.binarize_rect(img, r, threshold, color)))
+
+
+@pytest.mark.parametrize('rect', RECTS)
+def test_invert(rect):
+    assert_same(*run_both(
+        rect, core.invert, baseline.invert_rect))
+
+
+@pytest.mark.parametrize('rect', RECTS)
+@pytest.mark.parametrize('value', [-40, 0, 40])
+def test_brightness(rect, value):
+    # the loops did not clamp; the kernels keep the result in [0, 1]
+    pixels, expected = run_both(
+        rect, lambda p, r: core.brightness(p, r, value / 255.0),
+        lambda img, r: baseline.change_brightness_rect(img, r, value))
+    assert_same(pixels, np.clip(expected, 0.0, 1.0))
+
+
+def test_clip_rect():
+    pixels = random_pixels()
+    assert core.clip_rect(pixels, RECTS[2]) == (0, 0, 10, 8)
+    assert core.clip_rect(pixels, RECTS[3]) == (30, 18, WIDTH, HEIGHT)
+    x0, y0, x1, y1 = core.clip_rect(pixels, RECTS[5])
+    assert x0 == x1
@@ -0,0 +1,75 @@
+import numpy as np
+import pytest
+
+from paint_tools import filters
+from paint_tools.tiles import ArrayTileSource, TileEngine
+
+
+TILE = 16
+RECTS = [
+    # tile seams inside the rect, away from the image border
+    {'x0': 5, 'y0': 7, 'x1': 60, 'y1': 51},
+    # the whole image: every side is a border
+    {'x0': 0, 'y0': 0, 'x1': 70, 'y1': 58},
+    # sticking out of the image on the right and the top
+    {'x0': 33, 'y0': 20, 'x1': 90, 'y1': 80},
+    # thinner than one tile, on the bottom border
+    {'x0': 3, 'y0': 0, 'x1': 64, 'y1': 3},
+]
+
+
+def new_pixels(seed=0):
+    rng = np.random.RandomState(seed)
+    return rng.random_sample((58, 70, 4)).astype(np.float32)
+
+
+def apply_tiled(pixels, rect, name, workers=1, **params):
+    filt, halo = filters.get_filter(name, **params)
+    source = ArrayTileSource(pixels)
+    TileEngine(tile_size=TILE, workers=workers).apply_filter(
+        source, rect, filt, halo)
+    return source.pixels
+
+
+@pytest.mark.parametrize("rect", RECTS, ids=['inside', 'image', 'clipped',
+                                             'thin'])
+@pytest.mark.parametrize("radius", [1, 3, 8, 20])
+@pytest.mark.parametrize("name", filters.FILTERS)
+def test_tiled_filter_matches_whole_array(name, radius, rect):
+    # radius 20 has a halo wider than the tiles, so bands carry over
+    # more rows than they hold
+    params = {'radius': radius}
+    if name == 'SHARPEN':
+        params['amount'] = 0.7
+    expected = new_pixels()
+    filters.apply(expected, rect, name, **params)
+    result = apply_tiled(new_pixels(), rect, name, **params)
+    np.testing.assert_allclose(result, expected, rtol=0, atol=1.0e-5)
+
+
+def test_tiled_filter_leaves_outside_the_rect_alone():
+    rect = RECTS[0]
+    before = new_pixels()
+    result = apply_tiled(new_pixels(), rect, 'GAUSSIAN', radius=5)
+    inside = np.zeros(before.shape[:2], dtype=bool)
+    inside[rect['y0']:rect['y1'], rect['x0']:rect['x1']] = True
+    np.testing.assert_array_equal(result[~inside], before[~inside])
+    # alpha is not filtered
+    np.testing.assert_array_equal(result[..., 3], before[..., 3])
+
+
+def test_tiled_filter_is_the_same_on_more_workers():
+    rect = RECTS[1]
+    one = apply_tiled(new_pixels(), rect, 'BOX', radius=4)
+    three = apply_tiled(new_pixels(), rect, 'BOX', workers=3, radius=4)
+    np.testing.assert_array_equal(one, three)
+
+
+@pytest.mark.parametrize("radius", [2, 12])
+def test_fft_and_direct_gaussian_agree_on_edge_padding(radius):
+    pixels = new_pixels(1)
+    halo = filters.get_filter('GAUSSIAN', radius)[1]
+    block = filters.pad_edges(pixels, halo, halo, halo, halo)
+    np.testing.assert_allclose(
+        filters.gaussian(block, radius, use_fft=True),
+        filters.gaussian(block, radius, use_fft=False), rtol=0, atol=1.0e-5)
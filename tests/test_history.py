@@ -0,0 +1,126 @@
+import numpy as np
+
+from paint_tools.history import UndoHistory
+from paint_tools.tiles import ArrayTileSource
+
+
+RECT = {'x0': 10, 'y0': 5, 'x1': 90, 'y1': 70}
+
+
+def new_source(width=100, height=80, seed=0):
+    rng = np.random.RandomState(seed)
+    return ArrayTileSource(
+        rng.random_sample((height, width, 4)).astype(np.float32))
+
+
+def edit(history, source):
+    history.record("Fill", "img", source, RECT)
+    source.view(10, 5, 90, 70)[...] = 1.0
+
+
+def test_undo_and_redo_restore_the_tiles():
+    history = UndoHistory(tile_size=16)
+    source = new_source()
+    before = source.pixels.copy()
+    edit(history, source)
+    after = source.pixels.copy()
+    assert history.undo(source) is not None
+    assert np.array_equal(source.pixels, before)
+    assert history.redo(source) is not None
+    assert np.array_equal(source.pixels, after)
+
+
+def test_resized_image_drops_its_steps():
+    history = UndoHistory(tile_size=16)
+    edit(history, new_source())
+    edit(history, new_source())
+    resized = new_source(width=50)
+    before = resized.pixels.copy()
+    assert history.undo(resized) is None
+    assert history.num_undo() == 0
+    assert np.array_equal(resized.pixels, before)
+
+
+def test_resized_image_drops_its_redo_steps():
+    history = UndoHistory(tile_size=16)
+    source = new_source()
+    edit(history, source)
+    history.undo(source)
+    assert history.redo(new_source(height=40)) is None
+    assert history.num_redo() == 0
+
+
+class CountingSource(ArrayTileSource):
+
+    def __init__(self, pixels):
+        ArrayTileSource.__init__(self, pixels)
+        self.reads = 0
+
+    def read(self, x0, y0, x1, y1, out):
+        self.reads += 1
+        return ArrayTileSource.read(self, x0, y0, x1, y1, out)
+
+
+def test_snapshot_reads_a_rect_per_row_of_tiles():
+    history = UndoHistory(tile_size=16)
+    source = CountingSource(new_source().pixels)
+    step = history.record("Fill", "img", source, RECT)
+    # tiles 0..96 x 0..80 of the 16px grid, five rows of them
+    assert len(step['tiles']) == 6 * 5
+    assert source.reads == 5
+
+
+def test_steps_are_scoped_per_image():
+    history = UndoHistory(tile_size=16)
+    a, b = new_source(seed=1), new_source(seed=2)
+    before_a = a.pixels.copy()
+    history.record("Fill", "a", a, RECT)
+    a.view(10, 5, 90, 70)[...] = 1.0
+    history.seal("a", a)
+    edit(history, b)
+    history.seal("img", b)
+    assert history.num_undo("a") == 1 and history.num_undo("img") == 1
+    # the newer edit of the other image is left alone
+    after_b = b.pixels.copy()
+    assert history.undo(a, "a") is not None
+    assert np.array_equal(a.pixels, before_a)
+    assert np.array_equal(b.pixels, after_b)
+    assert history.num_undo("a") == 0 and history.num_redo("a") == 1
+    # a new edit of one image keeps the redo steps of the other
+    edit(history, b)
+    assert history.num_redo("a") == 1
+
+
+def test_outside_change_drops_the_history():
+    history = UndoHistory(tile_size=16)
+    source = new_source()
+    edit(history, source)
+    history.seal("img", source)
+    # painted over outside the history
+    source.pixels[20, 20] = 0.5
+    changed = source.pixels.copy()
+    assert history.undo(source, "img") is None
+    assert history.num_undo("img") == 0
+    assert np.array_equal(source.pixels, changed)
+
+
+def test_outside_change_after_undo_drops_the_redo():
+    history = UndoHistory(tile_size=16)
+    source = new_source()
+    edit(history, source)
+    history.seal("img", source)
+    history.undo(source, "img")
+    source.pixels[20, 20] = 0.5
+    assert history.redo(source, "img") is None
+    assert history.num_redo("img") == 0
+
+
+def test_seal_leaves_sealed_steps_alone():
+    history = UndoHistory(tile_size=16)
+    source = new_source()
+    edit(history, source)
+    history.seal("img", source)
+    source.pixels[20, 20] = 0.5
+    # an edit that recorded nothing must not hide the change
+    history.seal("img", source)
+    assert history.undo(source, "img") is None
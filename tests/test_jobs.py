@@ -0,0 +1,162 @@
+import time
+
+import numpy as np
+
+from paint_tools import core, filters
+from paint_tools.jobs import (
+    JOB_BAND_ROWS, Job, JobQueue, filter_compute, kernel_compute)
+from paint_tools.tiles import ArrayTileSource, TileEngine
+
+
+RECT = (8, 10, 90, 250)
+
+
+def new_source(seed=0):
+    rng = np.random.RandomState(seed)
+    return ArrayTileSource(
+        rng.random_sample((300, 100, 4)).astype(np.float32))
+
+
+def run_queue(queue, source, engine, timeout=10.0):
+    # polls like PT_JobRunner until the queue drains
+    committed = []
+    reports = []
+
+    def start(job):
+        job.take_snapshot(source, engine)
+        queue.start(job)
+
+    def commit(job):
+        job.commit(source, engine)
+        committed.append(job)
+        return True
+
+    end = time.time() + timeout
+    while len(queue) and time.time() < end:
+        reports += queue.poll(start, commit)[1]
+        time.sleep(0.001)
+    assert len(queue) == 0
+    return committed, reports
+
+
+def test_progress_is_reported_per_band():
+    seen = []
+
+    def kernel(pixels):
+        seen.append(job.progress)
+        core.kernel_invert(pixels)
+
+    job = Job("Invert", "img", RECT, kernel_compute(kernel))
+    job.take_snapshot(new_source(), TileEngine())
+    job.run()
+    height = RECT[3] - RECT[1]
+    assert seen == [min(y, height) / float(height)
+                    for y in range(0, height, JOB_BAND_ROWS)]
+    assert job.progress == 1.0
+    assert job.state == 'DONE'
+
+
+def test_commit_applies_the_result():
+    source = new_source()
+    expected = source.pixels.copy()
+    x0, y0, x1, y1 = RECT
+    core.kernel_invert(expected[y0:y1, x0:x1])
+    queue = JobQueue(workers=2)
+    queue.submit(Job("Invert", "img", RECT,
+                     kernel_compute(core.kernel_invert)))
+    committed, reports = run_queue(queue, source, TileEngine())
+    assert len(committed) == 1 and reports == []
+    np.testing.assert_array_equal(source.pixels, expected)
+    queue.shutdown()
+
+
+def test_filter_commit_matches_the_tile_engine():
+    filt, halo = filters.get_filter('GAUSSIAN', 3)
+    engine = TileEngine(tile_size=32)
+    expected = new_source()
+    rect = dict(zip(('x0', 'y0', 'x1', 'y1'), RECT))
+    engine.apply_filter(expected, rect, filt, halo)
+    source = new_source()
+    queue = JobQueue()
+    queue.submit(Job("Blur", "img", RECT, filter_compute(filt, halo),
+                     halo=halo))
+    run_queue(queue, source, engine)
+    np.testing.assert_allclose(
+        source.pixels, expected.pixels, rtol=0, atol=1.0e-6)
+    queue.shutdown()
+
+
+def test_cancel_leaves_the_image_untouched():
+    source = new_source()
+    before = source.pixels.copy()
+
+    def kernel(pixels):
+        core.kernel_invert(pixels)
+        job.cancel()
+
+    job = Job("Invert", "img", RECT, kernel_compute(kernel))
+    queued = Job("Erase", "img", RECT, kernel_compute(core.kernel_erase))
+    queue = JobQueue()
+    queue.submit(job)
+    queue.submit(queued)
+    queued.cancel()
+    # a queued job never starts; the running one stops after a band
+    assert queued.state == 'CANCELLED'
+    committed, reports = run_queue(queue, source, TileEngine())
+    assert committed == [] and reports == []
+    assert job.state == 'CANCELLED' and job.result is None
+    assert job.progress < 1.0
+    np.testing.assert_array_equal(source.pixels, before)
+    queue.shutdown()
+
+
+def test_failure_resets_the_job_and_the_queue():
+    def fail(job):
+        raise ValueError("out of memory")
+
+    source = new_source()
+    before = source.pixels.copy()
+    failed = Job("Blur", "img", RECT, fail)
+    after = Job("Invert", "img", RECT, kernel_compute(core.kernel_invert))
+    queue = JobQueue()
+    queue.submit(failed)
+    queue.submit(after)
+    committed, reports = run_queue(queue, source, TileEngine())
+    assert reports == [('ERROR', "Blur: out of memory")]
+    assert failed.state == 'FAILED' and failed.snapshot is None
+    # the next job on the same image still runs
+    assert committed == [after]
+    x0, y0, x1, y1 = RECT
+    core.kernel_invert(before[y0:y1, x0:x1])
+    np.testing.assert_array_equal(source.pixels, before)
+    queue.shutdown()
+
+
+def test_failed_start_and_commit_are_reported():
+    queue = JobQueue()
+    job = queue.submit(Job("Fill", "img", RECT, kernel_compute(
+        core.kernel_invert)))
+
+    def start(job):
+        raise RuntimeError("image is gone")
+
+    assert queue.poll(start, None) == (False, [])
+    assert job.state == 'FAILED'
+    assert queue.poll(start, None) == (
+        False, [('ERROR', "Fill: image is gone")])
+    assert len(queue) == 0
+
+    job = queue.submit(Job("Fill", "img", RECT, kernel_compute(
+        core.kernel_invert)))
+    job.state = 'DONE'
+
+    def commit(job):
+        raise RuntimeError("write failed")
+
+    assert queue.poll(None, commit) == (
+        False, [('ERROR', "Fill: write failed")])
+    job = queue.submit(Job("Fill", "img", RECT, kernel_compute(
+        core.kernel_invert)))
+    job.state = 'DONE'
+    assert queue.poll(None, lambda job: False) == (
+        False, [('WARNING', "Fill: image changed, result dropped")])
@@ -0,0 +1,92 @@
+import numpy as np
+import pytest
+
+from paint_tools import core
+from paint_tools.lut import LUT_SIZE, LutEngine, otsu_threshold
+
+
+def brute_force_otsu(hist):
+    # threshold t splitting the levels into < t and >= t with the largest
+    # between-class variance, the first one on ties
+    levels = np.arange(len(hist))
+    best, best_t = -1.0, None
+    for t in range(1, len(hist)):
+        w0 = hist[:t].sum()
+        w1 = hist[t:].sum()
+        if w0 == 0 or w1 == 0:
+            continue
+        m0 = (hist[:t] * levels[:t]).sum() / float(w0)
+        m1 = (hist[t:] * levels[t:]).sum() / float(w1)
+        v = w0 * w1 * (m0 - m1) ** 2
+        if v > best * (1.0 + 1.0e-12):
+            best, best_t = v, t
+    return best_t
+
+
+def bimodal(dark, bright, spread, n=20000, seed=0):
+    rng = np.random.RandomState(seed)
+    values = np.concatenate([rng.normal(dark, spread, n // 2),
+                             rng.normal(bright, spread, n // 2)])
+    values = np.clip(np.round(values), 0, LUT_SIZE - 1).astype(int)
+    return np.bincount(values, minlength=LUT_SIZE)
+
+
+def test_separated_modes_split_in_the_middle_of_the_gap():
+    hist = np.zeros(LUT_SIZE, dtype=np.int64)
+    hist[40:71] = 5
+    hist[180:221] = 3
+    t = otsu_threshold(hist)
+    # levels 71 to 179 are empty
+    assert t == (71 + 179) // 2
+    # every pixel goes black or white, none is left at the threshold
+    assert hist[t] == 0
+
+
+@pytest.mark.parametrize("dark,bright,spread", [
+    (60, 190, 25), (90, 140, 20), (30, 200, 40)])
+def test_overlapping_modes_match_brute_force(dark, bright, spread):
+    hist = bimodal(dark, bright, spread)
+    # no empty level between the modes
+    assert hist[dark:bright].min() > 0
+    t = otsu_threshold(hist)
+    assert t == brute_force_otsu(hist)
+    assert dark < t < bright
+
+
+def test_empty_and_single_level_histograms():
+    assert otsu_threshold(np.zeros(LUT_SIZE)) == LUT_SIZE // 2
+    hist = np.zeros(LUT_SIZE)
+    hist[100] = 7
+    # below the only level, which goes white
+    assert otsu_threshold(hist) < 100
+
+
+def test_auto_threshold_binarizes_a_bimodal_image():
+    # two flat regions with noise that leaves a gap between them
+    rng = np.random.RandomState(3)
+    pixels = np.empty((40, 60, 4), dtype=np.float32)
+    pixels[:, :30] = rng.uniform(0.1, 0.3, (40, 30, 4))
+    pixels[:, 30:] = rng.uniform(0.6, 0.9, (40, 30, 4))
+    engine = LutEngine()
+    engine.set_source(None, pixels)
+    t = engine.auto_threshold('RED')
+    out = engine.binarize(t / 255.0, 'RED')
+    assert (out[:, :30, :3] == 0.0).all()
+    assert (out[:, 30:, :3] == 1.0).all()
+
+
+def test_pixels_at_the_threshold_are_kept():
+    # strict binarize: the level itself is neither black nor white
+    levels = np.arange(LUT_SIZE, dtype=np.float32) / (LUT_SIZE - 1)
+    pixels = np.zeros((1, LUT_SIZE, 4), dtype=np.float32)
+    pixels[0, :, :3] = levels[:, np.newaxis]
+    pixels[..., 3] = 1.0
+    t = 100
+    engine = LutEngine()
+    engine.set_source(None, pixels)
+    out = engine.binarize(t / 255.0, 'GREEN')
+    expected = core.kernel_binarize(pixels.copy(), t / 255.0, 'GREEN')
+    np.testing.assert_array_equal(out, expected)
+    assert (out[0, :t, :3] == 0.0).all()
+    np.testing.assert_array_equal(out[0, t, :3], pixels[0, t, :3])
+    assert (out[0, t + 1:, :3] == 1.0).all()
@@ -0,0 +1,107 @@
+import numpy as np
+import pytest
+
+from paint_tools.pipeline import Pipeline, get_step_kernel
+
+
+def new_pixels(seed=0):
+    rng = np.random.RandomState(seed)
+    pixels = rng.random_sample((40, 50, 4)).astype(np.float32)
+    # the ends of the range, where the clamps of a chain matter
+    pixels[0, :10] = 0.0
+    pixels[1, :10] = 1.0
+    return pixels
+
+
+def apply_sequential(pixels, steps):
+    for step in steps:
+        get_step_kernel(step)(pixels)
+    return pixels
+
+
+def apply_fused(pixels, steps):
+    Pipeline(steps).apply(
+        pixels, {'x0': 0, 'y0': 0, 'x1': pixels.shape[1],
+                 'y1': pixels.shape[0]})
+    return pixels
+
+
+def step(op, **params):
+    return {'op': op, 'params': params}
+
+
+CHAINS = {
+    'brightness_up_down': [step('BRIGHTNESS', value=0.3),
+                           step('BRIGHTNESS', value=-0.5)],
+    'invert_twice': [step('INVERT'), step('INVERT')],
+    'clipped_then_inverted': [step('BRIGHTNESS', value=0.6), step('INVERT'),
+                              step('BRIGHTNESS', value=0.2)],
+    # the first step leaves only 1.0, the second only 0.0
+    'constant': [step('BRIGHTNESS', value=1.0),
+                 step('BRIGHTNESS', value=-1.0), step('INVERT')],
+    'gray_breaks_the_chain': [step('BRIGHTNESS', value=0.2),
+                              step('GRAY_SCALE', color='NTSC'),
+                              step('INVERT'), step('BRIGHTNESS', value=-0.1)],
+    'binarize_breaks_the_chain': [step('INVERT'),
+                                  step('BINARIZE', threshold=0.4,
+                                       color='GREEN'),
+                                  step('BRIGHTNESS', value=-0.3)],
+    'fill_drops_earlier_steps': [step('INVERT'),
+                                 step('FILL', color=(0.2, 0.4, 0.6)),
+                                 step('BRIGHTNESS', value=0.5),
+                                 step('INVERT')],
+    'erase_then_brightness': [step('GRAY_SCALE', color='RED'),
+                              step('ERASE'),
+                              step('BRIGHTNESS', value=0.25)],
+}
+
+
+@pytest.mark.parametrize("name", sorted(CHAINS))
+def test_fused_chain_equals_sequential_steps(name):
+    steps = CHAINS[name]
+    expected = apply_sequential(new_pixels(), steps)
+    result = apply_fused(new_pixels(), steps)
+    np.testing.assert_allclose(result, expected, rtol=0, atol=1.0e-6)
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_random_chains_equal_sequential_steps(seed):
+    rng = np.random.RandomState(seed)
+    steps = []
+    for i in range(rng.randint(1, 8)):
+        op = rng.choice(['BRIGHTNESS', 'BRIGHTNESS', 'INVERT', 'INVERT',
+                         'GRAY_SCALE', 'BINARIZE', 'FILL'])
+        if op == 'BRIGHTNESS':
+            steps.append(step(op, value=float(rng.uniform(-1.0, 1.0))))
+        elif op == 'GRAY_SCALE':
+            steps.append(step(op, color='AVERAGE'))
+        elif op == 'BINARIZE':
+            steps.append(step(op, threshold=float(rng.uniform()),
+                              color='BLUE'))
+        elif op == 'FILL':
+            steps.append(step(op, color=tuple(rng.uniform(size=3))))
+        else:
+            steps.append(step(op))
+    expected = apply_sequential(new_pixels(seed), steps)
+    result = apply_fused(new_pixels(seed), steps)
+    np.testing.assert_allclose(result, expected, rtol=0, atol=1.0e-6)
+
+
+def test_fusion_groups_only_adjacent_affine_steps():
+    fused = Pipeline(CHAINS['gray_breaks_the_chain']).get_fused_steps()
+    assert [kind for kind, _ in fused] == ['AFFINE', 'STEP', 'AFFINE']
+    a, c, lo, hi = fused[2][1]
+    # invert then -0.1: 0.9 - x, clamped
+    assert (a, lo, hi) == (-1.0, 0.0, 0.9)
+    assert c == pytest.approx(0.9)
+
+    fused = Pipeline(CHAINS['fill_drops_earlier_steps']).get_fused_steps()
+    assert [kind for kind, _ in fused] == ['STEP', 'AFFINE']
+    assert fused[0][1]['op'] == 'FILL'
+
+
+def test_alpha_is_left_alone():
+    pixels = new_pixels()
+    alpha = pixels[..., 3].copy()
+    apply_fused(pixels, CHAINS['clipped_then_inverted'])
+    np.testing.assert_array_equal(pixels[..., 3], alpha)
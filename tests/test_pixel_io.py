@@ -0,0 +1,80 @@
+import numpy as np
+
+from paint_tools.pixel_io import (
+    DirtyRegions,
+    NumpyImage,
+    NumpyPixelIO,
+    PixelTransfer,
+)
+
+
+class RecordingIO(NumpyPixelIO):
+
+    def __init__(self):
+        self.calls = []
+
+    def write(self, image, buf):
+        self.calls.append('bulk')
+        super().write(image, buf)
+
+    def write_spans(self, image, buf, spans):
+        self.calls.append('spans')
+        super().write_spans(image, buf, spans)
+
+
+def test_overlapping_boxes_merge():
+    d = DirtyRegions(100, 100)
+    d.add(0, 0, 10, 10)
+    d.add(5, 5, 20, 20)
+    assert d.rects() == [(0, 0, 20, 20)]
+
+
+def test_boxes_sharing_an_edge_merge():
+    d = DirtyRegions(100, 100)
+    d.add(0, 0, 10, 10)
+    d.add(10, 0, 20, 10)
+    assert d.rects() == [(0, 0, 20, 10)]
+
+
+def test_boxes_touching_at_a_corner_stay_apart():
+    d = DirtyRegions(100, 100)
+    d.add(0, 0, 10, 10)
+    d.add(10, 10, 20, 20)
+    assert sorted(d.rects()) == [(0, 0, 10, 10), (10, 10, 20, 20)]
+    assert d.num_pixels() == 200
+
+
+def test_boxes_are_clipped():
+    d = DirtyRegions(10, 10)
+    d.add(-5, -5, 3, 30)
+    d.add(20, 0, 30, 5)
+    assert d.rects() == [(0, 0, 3, 10)]
+
+
+def write(rect):
+    io = RecordingIO()
+    transfer = PixelTransfer(io)
+    image = NumpyImage("test", 16, 16)
+    buf = np.random.RandomState(0).random_sample(16 * 16 * 4).astype(
+        np.float32)
+    dirty = DirtyRegions(16, 16)
+    dirty.add(*rect)
+    nbytes = transfer.write(image, buf, dirty)
+    return io, image, buf, nbytes
+
+
+def test_small_dirty_area_writes_spans():
+    io, image, buf, nbytes = write((2, 3, 6, 5))
+    assert io.calls == ['spans']
+    assert nbytes == 4 * 2 * 4 * 4
+    pixels = image.pixels.reshape((16, 16, 4))
+    expected = buf.reshape((16, 16, 4))
+    assert np.array_equal(pixels[3:5, 2:6], expected[3:5, 2:6])
+    assert not pixels[:3].any() and not pixels[5:].any()
+
+
+def test_large_dirty_area_writes_in_bulk():
+    io, image, buf, nbytes = write((0, 0, 16, 12))
+    assert io.calls == ['bulk']
+    assert nbytes == buf.nbytes
+    assert np.array_equal(image.pixels, buf)
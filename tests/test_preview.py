@@ -0,0 +1,21 @@
+import numpy as np
+
+from paint_tools.preview import PreviewRenderer
+
+
+def test_upload_time_counts_to_the_refresh():
+    renderer = PreviewRenderer()
+    pixels = np.random.RandomState(0).random_sample((8, 8, 4)).astype(
+        np.float32)
+    renderer.set_source("key", pixels, 8, 8)
+    assert renderer.refresh('INVERT', {}, force=True)
+    compute = renderer.get_refresh_time()
+    renderer.add_upload_time(0.5)
+    assert abs(renderer.get_refresh_time() - (compute + 0.5)) < 1e-9
+    assert renderer.get_max_fps() < 2.0
+
+
+def test_upload_time_without_refresh_is_ignored():
+    renderer = PreviewRenderer()
+    renderer.add_upload_time(0.5)
+    assert renderer.get_refresh_time() == 0.0
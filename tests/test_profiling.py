@@ -0,0 +1,134 @@
+import csv
+import io
+import json
+
+import numpy as np
+
+from paint_tools import profiling
+from paint_tools.pixel_io import NumpyImage, pixel_transfer
+from paint_tools.profiling import Profiler, NULL_PHASE, profiled
+
+
+def run(profiler, name, pixels=0):
+    profiler.begin(name)
+    with profiler.phase("work"):
+        profiler.add_pixels(pixels)
+    return profiler.end()
+
+
+def test_ring_buffer_wraps_at_capacity():
+    profiler = Profiler(size=4)
+    for i in range(10):
+        run(profiler, "op{}".format(i), i)
+    assert len(profiler.records) == 4
+    # the oldest records are dropped first
+    assert [r['op'] for r in profiler.records] == \
+        ["op6", "op7", "op8", "op9"]
+    assert [r['op'] for r in profiler.last(2)] == ["op8", "op9"]
+    assert sum(calls for calls, _, _ in profiler.summary().values()) == 4
+
+
+def test_resizing_keeps_the_newest_records():
+    profiler = Profiler(size=8)
+    for i in range(8):
+        run(profiler, "op{}".format(i))
+    profiler.set_size(3)
+    assert [r['op'] for r in profiler.records] == ["op5", "op6", "op7"]
+    profiler.set_size(5)
+    run(profiler, "op8")
+    run(profiler, "op9")
+    run(profiler, "op10")
+    assert [r['op'] for r in profiler.records] == \
+        ["op6", "op7", "op8", "op9", "op10"]
+
+
+class Operator():
+
+    def __init__(self):
+        self.calls = 0
+
+    def execute(self, context):
+        self.calls += 1
+        profiling.profiler.add_pixels(10)
+        with profiling.profiler.phase("kernel"):
+            pass
+        return {'FINISHED'}
+
+
+def new_execute(monkeypatch):
+    profiler = Profiler(size=4)
+    monkeypatch.setattr(profiling, "profiler", profiler)
+    return profiler, profiled("OP", Operator.execute)
+
+
+def test_disabled_profiler_records_nothing(monkeypatch):
+    profiler, execute = new_execute(monkeypatch)
+    op = Operator()
+    times = []
+    monkeypatch.setattr(profiling.time, "perf_counter",
+                        lambda: times.append(1) or 0.0)
+    assert execute(op, None) == {'FINISHED'}
+    assert op.calls == 1
+    # nothing is timed or stored, phases are no-ops
+    assert times == []
+    assert len(profiler.records) == 0
+    assert not profiler.is_active()
+    assert profiler.phase("x") is NULL_PHASE
+
+
+def test_switching_on_and_off(monkeypatch):
+    profiler, execute = new_execute(monkeypatch)
+    op = Operator()
+    profiler.enabled = True
+    execute(op, None)
+    execute(op, None)
+    profiler.enabled = False
+    execute(op, None)
+    assert op.calls == 3
+    assert len(profiler.records) == 2
+    record = profiler.records[-1]
+    assert (record['op'], record['pixels']) == ("OP", 10)
+    assert "kernel" in record['phases']
+    assert record['seconds'] >= record['phases']['kernel']
+    calls, seconds, pixels = profiler.summary()["OP"]
+    assert (calls, pixels) == (2, 20)
+
+
+def test_nested_calls_count_towards_the_outer_one(monkeypatch):
+    profiler, execute = new_execute(monkeypatch)
+    profiler.enabled = True
+    op = Operator()
+    profiler.begin("OUTER")
+    execute(op, None)
+    profiler.end()
+    assert [r['op'] for r in profiler.records] == ["OUTER"]
+    assert profiler.records[0]['pixels'] == 10
+
+
+def test_pixel_transfer_and_memory_are_counted():
+    profiler = Profiler()
+    profiler.track_memory = True
+    image = NumpyImage("img", 8, 4, np.zeros(8 * 4 * 4, dtype=np.float32))
+    profiler.begin("READ")
+    pixel_transfer.read(image)
+    record = profiler.end()
+    assert record['bytes_read'] == 8 * 4 * 4 * 4
+    assert record['bytes_written'] == 0
+    assert record['peak_memory'] is not None
+    # end without begin is ignored
+    assert profiler.end() is None
+
+
+def test_dump_formats(tmp_path):
+    profiler = Profiler()
+    run(profiler, "A", 3)
+    run(profiler, "B", 5)
+    rows = json.loads(profiler.to_json())
+    assert [r['op'] for r in rows] == ["A", "B"]
+    rows = list(csv.DictReader(io.StringIO(profiler.to_csv())))
+    assert [r['pixels'] for r in rows] == ["3", "5"]
+    assert rows[0]['phases'].startswith("work=")
+    assert profiler.dump(str(tmp_path / "p.csv")) == 2
+    assert profiler.dump(str(tmp_path / "p.json")) == 2
+    profiler.clear()
+    assert len(profiler.records) == 0
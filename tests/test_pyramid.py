@@ -0,0 +1,121 @@
+import numpy as np
+import pytest
+
+from paint_tools.pyramid import MipPyramid, downsample_half
+
+
+def new_pixels(width=45, height=30, dtype=np.float32, seed=0):
+    rng = np.random.RandomState(seed)
+    if dtype == np.uint8:
+        return rng.randint(0, 256, (height, width, 4)).astype(np.uint8)
+    return rng.random_sample((height, width, 4)).astype(dtype)
+
+
+def box_filter(pixels):
+    # 2x2 means of the even part of pixels, in float64
+    p = pixels.astype(np.float64)
+    if pixels.dtype == np.uint8:
+        p /= 255.0
+    h, w = p.shape[0] // 2 * 2, p.shape[1] // 2 * 2
+    p = p[:h, :w]
+    return (p[0::2, 0::2] + p[1::2, 0::2] + p[0::2, 1::2] +
+            p[1::2, 1::2]) / 4.0
+
+
+@pytest.mark.parametrize("size", [(45, 30), (64, 64), (100, 3), (1, 1)])
+def test_level_shapes(size):
+    width, height = size
+    pyramid = MipPyramid(new_pixels(width, height))
+    n = pyramid.num_levels()
+    # halved down to the last level where the smaller side is 1
+    assert min(pyramid.get_level_size(n - 1)) == 1
+    for level in range(n):
+        w, h = pyramid.get_level_size(level)
+        assert (w, h) == (max(1, width >> level), max(1, height >> level))
+        pixels = pyramid.get_level(level)
+        assert pixels.shape == (h, w, 4)
+        if level > 0:
+            assert pixels.dtype == np.float32
+    # levels past the last are clamped to it
+    assert pyramid.get_level(n + 3).shape == pyramid.get_level(n - 1).shape
+
+
+@pytest.mark.parametrize("dtype", [np.float32, np.uint8])
+def test_levels_are_box_filtered(dtype):
+    pixels = new_pixels(dtype=dtype)
+    pyramid = MipPyramid(pixels)
+    expected = pixels
+    for level in range(1, pyramid.num_levels()):
+        expected = box_filter(expected)
+        np.testing.assert_allclose(
+            pyramid.get_level(level), expected, rtol=0, atol=1.0e-5)
+
+
+def test_levels_are_built_lazily():
+    pyramid = MipPyramid(new_pixels())
+    assert pyramid.memory_usage() == 0
+    pyramid.get_level(2)
+    assert len(pyramid.levels) == 3
+    assert pyramid.memory_usage() == sum(
+        p.nbytes for p in pyramid.levels[1:])
+
+
+def test_level_for_zoom():
+    pyramid = MipPyramid(new_pixels(256, 256))
+    assert pyramid.level_for_zoom(2.0) == 0
+    assert pyramid.level_for_zoom(1.0) == 0
+    assert pyramid.level_for_zoom(0.6) == 0
+    assert pyramid.level_for_zoom(0.5) == 1
+    assert pyramid.level_for_zoom(0.3) == 1
+    assert pyramid.level_for_zoom(0.25) == 2
+    assert pyramid.level_for_zoom(1.0e-6) == pyramid.num_levels() - 1
+    assert pyramid.level_for_zoom(0.0) == 0
+
+
+@pytest.mark.parametrize("box", [
+    (10, 4, 20, 12), (0, 0, 1, 1), (44, 29, 45, 30), (3, 0, 4, 30),
+    (-5, -5, 100, 100)])
+def test_edits_reach_built_levels_after_invalidate(box):
+    pixels = new_pixels()
+    pyramid = MipPyramid(pixels)
+    n = pyramid.num_levels()
+    pyramid.get_level(n - 1)
+    x0, y0, x1, y1 = box
+    pixels[max(0, y0):y1, max(0, x0):x1] = 0.25
+    pyramid.invalidate(x0, y0, x1, y1)
+    fresh = MipPyramid(pixels.copy())
+    for level in range(1, n):
+        np.testing.assert_array_equal(
+            pyramid.get_level(level), fresh.get_level(level))
+
+
+def test_stale_without_invalidate():
+    # levels are only recomputed where invalidate says so
+    pixels = new_pixels()
+    pyramid = MipPyramid(pixels)
+    before = pyramid.get_level(1).copy()
+    pixels[:4, :4] = 0.0
+    np.testing.assert_array_equal(pyramid.get_level(1), before)
+    pyramid.invalidate(0, 0, 4, 4)
+    after = pyramid.get_level(1)
+    np.testing.assert_array_equal(after[2:], before[2:])
+    np.testing.assert_array_equal(after[:2, :2], 0.0)
+
+
+def test_downsample_half_into_a_box():
+    src = new_pixels(16, 12)
+    out = np.zeros((6, 8, 4), dtype=np.float32)
+    downsample_half(src, out, 2, 1, 5, 4)
+    np.testing.assert_allclose(
+        out[1:4, 2:5], box_filter(src)[1:4, 2:5], atol=1.0e-6)
+    out[1:4, 2:5] = 0.0
+    assert not out.any()
+
+
+def test_region_is_scaled_to_the_level():
+    pyramid = MipPyramid(new_pixels(64, 48))
+    region = pyramid.get_region(2, (8, 5, 33, 20))
+    # 8 // 4 to ceil(33 / 4), 5 // 4 to ceil(20 / 4)
+    np.testing.assert_array_equal(region, pyramid.get_level(2)[1:5, 2:9])
+    # clipped to the 32x24 level
+    assert pyramid.get_region(1, (40, 40, 100, 100)).shape == (4, 12, 4)
@@ -0,0 +1,32 @@
+import numpy as np
+
+from paint_tools import raster
+
+
+def draw(rects, stroke, fill=False):
+    pixels = np.zeros((16, 16, 4), dtype=np.float32)
+    raster.draw_rects(
+        pixels, rects, (1.0, 1.0, 1.0, 1.0), stroke, 'REPLACE', 1.0, fill)
+    return pixels[..., 0]
+
+
+def test_rect_outline_has_square_corners():
+    cov = draw([(3, 3, 12, 12)], 2.0)
+    expected = np.zeros((16, 16), dtype=np.float32)
+    expected[2:13, 2:13] = 1.0
+    expected[4:11, 4:11] = 0.0
+    np.testing.assert_array_equal(cov, expected)
+
+
+def test_rect_outline_is_fill_minus_inner_rect():
+    outer = draw([(1.5, 2.5, 13.5, 11.5)], 1.0, True)
+    inner = draw([(2.5, 3.5, 12.5, 10.5)], 1.0, True)
+    np.testing.assert_allclose(
+        draw([(2, 3, 13, 11)], 1.0), outer - inner, atol=1.0e-6)
+
+
+def test_rect_outline_cost_follows_perimeter():
+    xs, ys, cov = raster.rect_coverage(
+        [(10, 10, 1010, 1010)], 1.0, 2000, 2000)
+    # a few pixels across each edge, against a million inside
+    assert len(xs) < 4 * 1000 * 8
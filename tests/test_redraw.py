@@ -0,0 +1,109 @@
+import pytest
+
+from paint_tools import redraw
+from paint_tools.redraw import RedrawScheduler
+
+
+class Region():
+
+    def __init__(self):
+        self.tags = 0
+
+    def tag_redraw(self):
+        self.tags += 1
+
+
+class Clock():
+
+    def __init__(self):
+        self.now = 100.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(redraw.time, "perf_counter", clock)
+    return clock
+
+
+def test_unchanged_state_is_not_redrawn(clock):
+    scheduler = RedrawScheduler(max_fps=10)
+    region = Region()
+    assert scheduler.request(region, (0, 0))
+    clock.now += 1.0
+    assert not scheduler.request(region, (0, 0))
+    assert (region.tags, scheduler.unchanged) == (1, 1)
+    # unless forced
+    assert scheduler.request(region, (0, 0), force=True)
+    assert region.tags == 2
+
+
+def test_requests_are_throttled_to_the_rate(clock):
+    scheduler = RedrawScheduler(max_fps=10)
+    region = Region()
+    # a burst of mouse moves 10 ms apart over one second
+    for i in range(100):
+        scheduler.request(region, (i, 0))
+        clock.now += 0.01
+    assert region.tags == 10
+    assert scheduler.requested == 100
+    assert scheduler.performed == 10
+    assert scheduler.coalesced == 90
+
+
+def test_coalesced_requests_are_flushed_once(clock):
+    scheduler = RedrawScheduler(max_fps=10)
+    region = Region()
+    scheduler.request(region, (0, 0))
+    clock.now += 0.01
+    for i in range(1, 5):
+        assert not scheduler.request(region, (i, 0))
+    assert scheduler.has_pending()
+    # too soon still
+    assert not scheduler.flush()
+    clock.now += 0.11
+    assert scheduler.flush()
+    assert region.tags == 2
+    assert not scheduler.has_pending()
+    assert not scheduler.flush()
+    # the flushed state is the last one requested
+    clock.now += 0.11
+    assert not scheduler.request(region, (4, 0))
+
+
+def test_pending_request_goes_to_its_region(clock):
+    scheduler = RedrawScheduler(max_fps=10)
+    first, second = Region(), Region()
+    scheduler.request(first, (0, 0))
+    scheduler.request(second, (1, 0))
+    clock.now += 0.11
+    assert scheduler.flush()
+    assert (first.tags, second.tags) == (1, 1)
+
+
+def test_returning_to_the_drawn_state_drops_the_pending_one(clock):
+    scheduler = RedrawScheduler(max_fps=10)
+    region = Region()
+    scheduler.request(region, (0, 0))
+    scheduler.request(region, (1, 0))
+    scheduler.request(region, (0, 0))
+    clock.now += 0.11
+    assert not scheduler.flush()
+    assert region.tags == 1
+
+
+def test_reset_forgets_the_drawn_state(clock):
+    scheduler = RedrawScheduler(max_fps=10)
+    region = Region()
+    scheduler.request(region, (0, 0))
+    scheduler.request(region, (1, 0))
+    scheduler.reset()
+    assert not scheduler.has_pending()
+    clock.now += 0.11
+    assert scheduler.request(region, (0, 0))
+    scheduler.reset_stats()
+    assert (scheduler.requested, scheduler.performed, scheduler.unchanged,
+            scheduler.coalesced) == (0, 0, 0, 0)
@@ -0,0 +1,112 @@
+import numpy as np
+import pytest
+
+from paint_tools.resample import RESAMPLE_FILTERS, Resampler
+
+
+def new_pixels(width=24, height=18, seed=0):
+    return np.random.RandomState(seed).random_sample(
+        (height, width, 4)).astype(np.float32)
+
+
+def new_edge(width=24, height=18):
+    # a hard vertical edge, where Lanczos rings
+    pixels = np.zeros((height, width, 4), dtype=np.float32)
+    pixels[:, width // 2:] = 1.0
+    return pixels
+
+
+@pytest.mark.parametrize("name", RESAMPLE_FILTERS)
+def test_identity_scale_returns_a_copy(name):
+    pixels = new_pixels()
+    out = Resampler().resize(pixels, 24, 18, name)
+    assert out is not pixels
+    np.testing.assert_array_equal(out, pixels)
+
+
+@pytest.mark.parametrize("name", RESAMPLE_FILTERS)
+def test_identity_axis_pass_keeps_the_pixels(name):
+    # one axis at its own size: the weights collapse to the pixel itself
+    pixels = new_pixels()
+    out = Resampler().resize_axis(pixels, 24, name, 1)
+    np.testing.assert_allclose(out, pixels, rtol=0, atol=1.0e-6)
+
+
+@pytest.mark.parametrize("size", [(48, 36), (7, 5), (60, 9), (1, 1)])
+@pytest.mark.parametrize("name", RESAMPLE_FILTERS)
+def test_constant_image_stays_constant(name, size):
+    pixels = np.full((18, 24, 4), 0.3, dtype=np.float32)
+    out = Resampler().resize(pixels, size[0], size[1], name)
+    assert out.shape == (size[1], size[0], 4)
+    np.testing.assert_allclose(out, 0.3, rtol=0, atol=1.0e-6)
+
+
+def test_nearest_upscale_repeats_pixels():
+    pixels = new_pixels()
+    out = Resampler().resize(pixels, 48, 36, 'NEAREST')
+    np.testing.assert_array_equal(out[::2, ::2], pixels)
+    np.testing.assert_array_equal(out[1::2, 1::2], pixels)
+
+
+def test_bilinear_upscale_keeps_a_ramp_inside():
+    ramp = np.tile(np.linspace(0.0, 1.0, 24, dtype=np.float32)[:, None],
+                   (18, 1, 4)).reshape(18, 24, 4)
+    out = Resampler().resize(ramp, 96, 18, 'BILINEAR')
+    # away from the clamped edges the samples fall on the line
+    inner = out[:, 4:-4, 0]
+    step = np.diff(inner, axis=1)
+    np.testing.assert_allclose(step, step[0, 0], rtol=0, atol=1.0e-6)
+
+
+@pytest.mark.parametrize("size", [(72, 18), (10, 18), (72, 54), (13, 7)])
+def test_lanczos_is_clamped_to_the_unit_range(size):
+    resampler = Resampler()
+    edge = new_edge()
+    # the raw filter over and undershoots next to the edge
+    raw = resampler.resize_axis(edge, size[0], 'LANCZOS', 1)
+    if size[0] > 24:
+        assert raw.min() < 0.0 and raw.max() > 1.0
+    out = resampler.resize(edge, size[0], size[1], 'LANCZOS')
+    assert out.min() >= 0.0 and out.max() <= 1.0
+    # flat parts far from the edge are unchanged
+    np.testing.assert_allclose(out[:, :2], 0.0, atol=1.0e-6)
+    np.testing.assert_allclose(out[:, -2:], 1.0, atol=1.0e-6)
+
+
+def test_downscale_keeps_the_mean():
+    pixels = new_pixels(64, 48)
+    for name in ('BILINEAR', 'LANCZOS'):
+        out = Resampler().resize(pixels, 16, 12, name)
+        np.testing.assert_allclose(
+            out.mean(axis=(0, 1)), pixels.mean(axis=(0, 1)), atol=0.02)
+
+
+def test_weight_tables_are_reused():
+    resampler = Resampler()
+    pixels = new_pixels()
+    first = resampler.resize(pixels, 40, 30, 'LANCZOS')
+    assert (resampler.misses, resampler.num_tables()) == (2, 2)
+    hits = resampler.hits
+    again = resampler.resize(new_pixels(seed=1), 40, 30, 'LANCZOS')
+    assert resampler.misses == 2
+    assert resampler.hits > hits
+    assert again.shape == first.shape
+    # a reused table gives the same result as a fresh one
+    np.testing.assert_array_equal(
+        resampler.resize(pixels, 40, 30, 'LANCZOS'), first)
+    np.testing.assert_array_equal(
+        Resampler().resize(pixels, 40, 30, 'LANCZOS'), first)
+
+
+def test_least_recently_used_tables_are_dropped():
+    resampler = Resampler(max_tables=2)
+    resampler.get_weights(10, 20, 'BILINEAR')
+    resampler.get_weights(10, 30, 'BILINEAR')
+    resampler.get_weights(10, 20, 'BILINEAR')
+    resampler.get_weights(10, 40, 'BILINEAR')
+    assert resampler.num_tables() == 2
+    misses = resampler.misses
+    resampler.get_weights(10, 20, 'BILINEAR')
+    assert resampler.misses == misses
+    resampler.get_weights(10, 30, 'BILINEAR')
+    assert resampler.misses == misses + 1
@@ -0,0 +1,90 @@
+from collections import deque
+
+import numpy as np
+import pytest
+
+from paint_tools import selection
+from paint_tools.selection import flood_fill, get_color_mask, magic_wand
+
+
+def flood_fill_pixels(mask, x, y):
+    # 4-connected breadth first search per pixel
+    h, w = mask.shape
+    out = np.zeros((h, w), dtype=bool)
+    if not mask[y, x]:
+        return out
+    out[y, x] = True
+    queue = deque([(x, y)])
+    while queue:
+        x, y = queue.popleft()
+        for nx, ny in ((x - 1, y), (x + 1, y), (x, y - 1), (x, y + 1)):
+            if 0 <= nx < w and 0 <= ny < h and mask[ny, nx] \
+                    and not out[ny, nx]:
+                out[ny, nx] = True
+                queue.append((nx, ny))
+    return out
+
+
+@pytest.mark.parametrize("slice_runs", [0, selection.SLICE_RUNS])
+@pytest.mark.parametrize("density", [0.3, 0.55, 0.6, 0.7, 0.95])
+def test_flood_fill_matches_pixel_search(density, slice_runs, monkeypatch):
+    # both ways of filling the selected runs
+    monkeypatch.setattr(selection, 'SLICE_RUNS', slice_runs)
+    rng = np.random.RandomState(int(density * 100))
+    mask = rng.random_sample((67, 91)) < density
+    for x, y in ((0, 0), (90, 66), (45, 33), (13, 50)):
+        mask[y, x] = True
+        np.testing.assert_array_equal(
+            flood_fill(mask, x, y), flood_fill_pixels(mask, x, y))
+
+
+def test_flood_fill_diagonals_do_not_connect():
+    mask = np.eye(5, dtype=bool)
+    expected = np.zeros((5, 5), dtype=bool)
+    expected[2, 2] = True
+    np.testing.assert_array_equal(flood_fill(mask, 2, 2), expected)
+
+
+def test_flood_fill_outside_or_unset_seed():
+    mask = np.zeros((4, 4), dtype=bool)
+    mask[0] = True
+    assert not flood_fill(mask, 1, 1).any()
+    assert not flood_fill(mask, 4, 0).any()
+    np.testing.assert_array_equal(flood_fill(mask, 3, 0), mask)
+
+
+def test_magic_wand_bbox():
+    pixels = np.zeros((20, 30, 4), dtype=np.float32)
+    pixels[5:9, 10:25] = 1.0
+    pixels[15:18, 0:4] = 1.0
+    sel = magic_wand(pixels, 12, 6, 0.1)
+    assert sel.bbox == (10, 5, 25, 9)
+    assert sel.count == 4 * 15
+    assert magic_wand(pixels, 30, 0) is None
+
+
+def test_color_mask_ignores_alpha():
+    rng = np.random.RandomState(2)
+    pixels = rng.random_sample((31, 45, 4)).astype(np.float32)
+    color = pixels[3, 4, :3].copy()
+    d = np.abs(pixels[..., :3] - color)
+    np.testing.assert_array_equal(
+        get_color_mask(pixels, color, 0.3), (d <= 0.3).all(axis=2))
+
+
+def test_magic_wand_rows_reads_in_bands(monkeypatch):
+    monkeypatch.setattr(selection, 'BAND_ROWS', 7)
+    rng = np.random.RandomState(3)
+    pixels = rng.random_sample((40, 33, 4)).astype(np.float32)
+    reads = []
+
+    def read_rows(y0, y1):
+        reads.append(y1 - y0)
+        return pixels[y0:y1].copy()
+
+    sel = selection.magic_wand_rows(read_rows, 33, 40, 16, 20, 0.45)
+    assert max(reads) <= 7
+    whole = magic_wand(pixels, 16, 20, 0.45)
+    assert sel.count == whole.count > 1
+    np.testing.assert_array_equal(
+        sel.get_mask(0, 0, 33, 40), whole.get_mask(0, 0, 33, 40))
@@ -0,0 +1,139 @@
+import numpy as np
+import pytest
+
+from paint_tools.pyramid import MipPyramid
+from paint_tools.stats import IntegralStats, ImageStats, SAT_BYTES_PER_PIXEL
+
+
+def brute_force(pixels, x0, y0, x1, y1):
+    p = pixels[y0:y1, x0:x1].astype(np.float64).reshape((-1, 4))
+    if pixels.dtype == np.uint8:
+        p /= 255.0
+    return p.mean(axis=0), p.var(axis=0)
+
+
+def check(stats, pixels, rect):
+    result = stats.query(*rect)
+    mean, var = brute_force(pixels, *rect)
+    assert result['count'] == (rect[2] - rect[0]) * (rect[3] - rect[1])
+    np.testing.assert_allclose(result['mean'], mean, rtol=0, atol=1.0e-9)
+    np.testing.assert_allclose(result['var'], var, rtol=0, atol=1.0e-9)
+
+
+def new_pixels(dtype=np.float32, seed=0):
+    rng = np.random.RandomState(seed)
+    if dtype == np.uint8:
+        return rng.randint(0, 256, (45, 60, 4)).astype(np.uint8)
+    return rng.random_sample((45, 60, 4)).astype(dtype)
+
+
+# a selection dragged larger, then smaller, then moved
+SELECTIONS = [(20, 15, 22, 17), (18, 12, 30, 25), (5, 3, 50, 40),
+              (0, 0, 60, 45), (10, 8, 40, 30), (25, 20, 26, 21),
+              (33, 1, 59, 44)]
+
+
+@pytest.mark.parametrize("dtype", [np.float32, np.uint8])
+def test_stats_follow_a_growing_and_shrinking_selection(dtype):
+    pixels = new_pixels(dtype)
+    stats = IntegralStats(pixels)
+    for rect in SELECTIONS:
+        check(stats, pixels, rect)
+
+
+@pytest.mark.parametrize("dtype", [np.float32, np.uint8])
+def test_stats_are_updated_after_edits(dtype):
+    pixels = new_pixels(dtype)
+    stats = IntegralStats(pixels)
+    check(stats, pixels, SELECTIONS[1])
+    rng = np.random.RandomState(1)
+    edits = [(10, 10, 20, 20), (0, 0, 3, 45), (50, 40, 60, 45),
+             (30, 5, 31, 6), (0, 44, 60, 45)]
+    for i, (x0, y0, x1, y1) in enumerate(edits):
+        block = rng.random_sample((y1 - y0, x1 - x0, 4))
+        if dtype == np.uint8:
+            block = (block * 255).astype(np.uint8)
+        pixels[y0:y1, x0:x1] = block
+        stats.invalidate(x0, y0, x1, y1)
+        # the tables only change on the next query
+        for rect in SELECTIONS[i:i + 3]:
+            check(stats, pixels, rect)
+
+
+def test_several_edits_before_one_query():
+    pixels = new_pixels()
+    stats = IntegralStats(pixels)
+    stats.get_tables()
+    pixels[2:4, 50:55] = 1.0
+    stats.invalidate(50, 2, 55, 4)
+    pixels[30:40, 1:6] = 0.0
+    stats.invalidate(1, 30, 6, 40)
+    # outside the image, clamped
+    stats.invalidate(-5, -5, 100, 2)
+    for rect in SELECTIONS:
+        check(stats, pixels, rect)
+    full = IntegralStats(pixels.copy())
+    np.testing.assert_allclose(stats.sums, full.get_tables()[0], atol=1.0e-9)
+
+
+def test_empty_selection_has_no_stats():
+    stats = IntegralStats(new_pixels())
+    assert stats.query(10, 10, 10, 20) is None
+    assert stats.query(70, 0, 80, 10) is None
+
+
+def test_image_stats_on_a_pyramid_level():
+    pixels = new_pixels(seed=2)
+    pyramid = MipPyramid(pixels)
+    # room for the tables of level 1 only
+    w, h = pyramid.get_level_size(1)
+    stats = ImageStats(pyramid, (w + 1) * (h + 1) * SAT_BYTES_PER_PIXEL)
+    assert stats.level == 1
+    rect = (8, 6, 40, 30)
+    result = stats.query(rect)
+    level = pyramid.get_level(1)
+    mean, var = brute_force(level, 4, 3, 20, 15)
+    np.testing.assert_allclose(result['mean'], mean, atol=1.0e-9)
+    # an edit reaches the level and the tables through invalidate, in the
+    # order of the cache's derived data
+    pixels[10:20, 10:30] = 0.0
+    pyramid.invalidate(10, 10, 30, 20)
+    stats.invalidate(10, 10, 30, 20)
+    result = stats.query(rect)
+    level = pyramid.get_level(1)
+    mean, var = brute_force(level, 4, 3, 20, 15)
+    np.testing.assert_allclose(result['mean'], mean, atol=1.0e-9)
+    np.testing.assert_allclose(result['var'], var, atol=1.0e-9)
+    assert result['level'] == 1
+
+
+def test_image_stats_follow_the_view_zoom():
+    pixels = new_pixels(seed=3)
+    pyramid = MipPyramid(pixels)
+    stats = ImageStats(pyramid)
+    assert stats.level == 0
+    rect = (8, 6, 40, 30)
+    assert stats.query(rect)['level'] == 0
+    # zoomed out to a quarter: level 2, rect scaled to it
+    result = stats.query(rect, 0.25)
+    assert result['level'] == 2
+    mean, var = brute_force(pyramid.get_level(2), 2, 1, 10, 8)
+    np.testing.assert_allclose(result['mean'], mean, atol=1.0e-9)
+    assert stats.region(rect, 0.25)['level'] == 2
+    assert sorted(stats.integrals) == [0, 2]
+    # an edit reaches the tables of every level
+    pixels[:, :] = 0.5
+    pyramid.invalidate(0, 0, 60, 45)
+    stats.invalidate(0, 0, 60, 45)
+    for zoom in (1.0, 0.25):
+        np.testing.assert_allclose(
+            stats.query(rect, zoom)['mean'], 0.5, atol=1.0e-6)
+
+
+def test_memory_limit_is_the_finest_level():
+    pyramid = MipPyramid(new_pixels())
+    w, h = pyramid.get_level_size(1)
+    stats = ImageStats(pyramid, (w + 1) * (h + 1) * SAT_BYTES_PER_PIXEL)
+    # zoomed in further than the limit allows
+    assert stats.query((0, 0, 60, 45), 2.0)['level'] == 1
+    assert stats.query((0, 0, 60, 45), 0.25)['level'] == 2
@@ -0,0 +1,151 @@
+import tracemalloc
+
+import numpy as np
+import pytest
+
+from paint_tools import core
+from paint_tools.cache import CONVERT_ROWS, ImageCache
+from paint_tools.formats import from_float, to_float
+from paint_tools.pixel_io import NumpyImage, NumpyPixelIO, PixelTransfer
+
+
+def random_uint8(shape=(37, 53, 4), seed=0):
+    # with every level in every channel
+    pixels = np.random.RandomState(seed).randint(
+        0, 256, shape).astype(np.uint8)
+    pixels.reshape(-1, 4)[:256] = np.arange(256)[:, np.newaxis]
+    return pixels
+
+
+def float_then_round(pixels, kernel):
+    # the float32 path rounded to 8 bits, what a uint8 result must match
+    f = to_float(pixels)
+    kernel(f)
+    return from_float(f, np.empty_like(pixels))
+
+
+KERNELS = [
+    ('invert', core.kernel_invert),
+    ('fill', lambda p: core.kernel_fill(p, (0.2, 0.5, 1.0))),
+    ('erase', core.kernel_erase),
+    ('brightness_up', lambda p: core.kernel_brightness(p, 51 / 255.0)),
+    ('brightness_down', lambda p: core.kernel_brightness(p, -0.6)),
+    ('gray_red', lambda p: core.kernel_gray_scale(p, 'RED')),
+    ('gray_blue', lambda p: core.kernel_gray_scale(p, 'BLUE')),
+] + [
+    ('binarize_{}_{:.4f}'.format(c.lower(), t),
+     (lambda c, t: lambda p: core.kernel_binarize(p, t, c))(c, t))
+    for c in core.COLOR_CHANNELS
+    for t in [k / 255.0 for k in range(256)] + [0.25, 0.5, 0.7]
+]
+
+
+@pytest.mark.parametrize("name,kernel", KERNELS, ids=[k[0] for k in KERNELS])
+def test_uint8_kernels_are_exact(name, kernel):
+    pixels = random_uint8()
+    expected = float_then_round(pixels, kernel)
+    kernel(pixels)
+    np.testing.assert_array_equal(pixels, expected)
+
+
+@pytest.mark.parametrize("mode", ['NTSC', 'AVERAGE'])
+def test_uint8_weighted_gray_scale_within_one_step(mode):
+    # fixed point weights: off by one only where the float result lands
+    # next to a rounding boundary
+    pixels = random_uint8((200, 300, 4))
+    expected = float_then_round(
+        pixels, lambda p: core.kernel_gray_scale(p, mode))
+    core.kernel_gray_scale(pixels, mode)
+    diff = np.abs(pixels.astype(np.int16) - expected)
+    assert diff.max() <= 1
+    assert np.count_nonzero(diff) < pixels.size // 1000
+
+
+def test_float16_error_bounds():
+    # storing rounds by at most half a float16 step, 2 ** -12 below 1.0;
+    # a kernel adds the rounding of its constant and of its result;
+    # thresholds may flip on the rounded input, so binarize is left out
+    step = 2.0 ** -12
+    rng = np.random.RandomState(1)
+    f = rng.random_sample((64, 64, 4)).astype(np.float32)
+    half = f.astype(np.float16)
+    assert np.abs(to_float(half) - f).max() <= step
+    for name, kernel in KERNELS:
+        if name.startswith('binarize'):
+            continue
+        expected = f.copy()
+        kernel(expected)
+        result = half.copy()
+        kernel(result)
+        assert np.abs(to_float(result) - expected).max() <= 3 * step, name
+
+
+def new_image(width, height, is_float, seed=0):
+    pixels = np.random.RandomState(seed).randint(
+        0, 256, width * height * 4) / np.float32(255.0)
+    image = NumpyImage("img", width, height, pixels.astype(np.float32))
+    image.is_float = is_float
+    return image
+
+
+class CountingIO(NumpyPixelIO):
+
+    def __init__(self):
+        self.bulk_reads = 0
+        self.span_reads = 0
+
+    def read(self, image, buf):
+        self.bulk_reads += 1
+        super().read(image, buf)
+
+    def read_span(self, image, start, out):
+        self.span_reads += 1
+        super().read_span(image, start, out)
+
+
+def new_cache(budget, mode='AUTO'):
+    io = CountingIO()
+    cache = ImageCache(budget, PixelTransfer(io))
+    cache.set_storage_mode(mode)
+    return cache, io
+
+
+@pytest.mark.parametrize("mode,is_float", [
+    ('AUTO', False), ('COMPACT', False), ('COMPACT', True)])
+def test_cache_reads_in_bands_when_float_copy_does_not_fit(mode, is_float):
+    image = new_image(50, 300, is_float)
+    itemsize = 1 if not is_float else 2
+    nbytes = 50 * 300 * 4 * itemsize
+    big, big_io = new_cache(nbytes + image.pixels.nbytes)
+    small, small_io = new_cache(nbytes)
+    for cache in (big, small):
+        cache.set_storage_mode(mode)
+    a = big.get(image)['pixels']
+    b = small.get(image)['pixels']
+    assert (big_io.bulk_reads, big_io.span_reads) == (1, 0)
+    assert small_io.bulk_reads == 0 and small_io.span_reads > 1
+    np.testing.assert_array_equal(a, b)
+    expected = image.pixels.reshape(300, 50, 4)
+    if is_float:
+        assert np.abs(to_float(b) - expected).max() <= 2.0 ** -12
+    else:
+        np.testing.assert_array_equal(
+            b, from_float(expected, np.empty_like(b)))
+
+
+def test_cache_read_peak_memory_stays_in_budget():
+    width, height = 128, 2048
+    image = new_image(width, height, False)
+    nbytes = width * height * 4
+    cache, io = new_cache(nbytes)
+    tracemalloc.start()
+    try:
+        entry = cache.get(image)
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    assert entry['pixels'].dtype == np.uint8
+    # the entry plus a float band and its rounding temporary, against
+    # four times the entry for a float32 copy of the image
+    band = CONVERT_ROWS * width * 4 * 4
+    assert peak < nbytes + 2 * band + 64 * 1024
@@ -0,0 +1,144 @@
+import tracemalloc
+
+import numpy as np
+import pytest
+
+from paint_tools import core, filters
+from paint_tools.formats import from_float
+from paint_tools.pixel_io import NumpyImage, NumpyPixelIO, PixelTransfer
+from paint_tools.selection import MaskSelection
+from paint_tools.tiles import (
+    TILE_BYTES_PER_PIXEL, ArrayTileSource, ImageTileSource, TileEngine)
+
+
+WIDTH, HEIGHT = 100, 70
+RECT = {'x0': 3, 'y0': 5, 'x1': 97, 'y1': 66}
+TILE = 16
+
+
+def new_pixels(seed=0):
+    return np.random.RandomState(seed).random_sample(
+        (HEIGHT, WIDTH, 4)).astype(np.float32)
+
+
+def new_source(kind, pixels):
+    # float32 arrays are edited in place through views, uint8 arrays and
+    # images are streamed through tile buffers
+    if kind == 'array':
+        return ArrayTileSource(pixels.copy())
+    if kind == 'uint8':
+        return ArrayTileSource(
+            from_float(pixels, np.empty(pixels.shape, dtype=np.uint8)))
+    image = NumpyImage("img", WIDTH, HEIGHT, pixels.reshape(-1).copy())
+    return ImageTileSource(image, PixelTransfer(NumpyPixelIO()))
+
+
+def get_pixels(source):
+    if isinstance(source, ImageTileSource):
+        return source.image.pixels.reshape((HEIGHT, WIDTH, 4))
+    return source.pixels
+
+
+def new_mask():
+    mask = np.zeros((HEIGHT, WIDTH), dtype=bool)
+    yy, xx = np.mgrid[0:HEIGHT, 0:WIDTH]
+    mask[(xx - 50) ** 2 + (yy - 35) ** 2 < 30 ** 2] = True
+    # a tile with nothing selected and a fully selected one
+    mask[:16, :16] = False
+    mask[32:48, 48:64] = True
+    return MaskSelection(mask)
+
+
+KERNELS = {
+    # native kernels run on uint8 views, the others on float tiles
+    'invert': core.kernel_invert,
+    'brightness': lambda p: core.kernel_brightness(p, 0.2),
+    'gray_scale': lambda p: core.kernel_gray_scale(p, 'NTSC'),
+}
+
+
+def run(kind, workers, name, masked):
+    source = new_source(kind, new_pixels())
+    engine = TileEngine(tile_size=TILE, workers=workers)
+    mask = new_mask() if masked else None
+    if name == 'blur':
+        filt, halo = filters.get_filter('GAUSSIAN', 4)
+        engine.apply_filter(source, RECT, filt, halo, mask)
+    else:
+        engine.apply(source, RECT, KERNELS[name], mask)
+    engine.shutdown()
+    return get_pixels(source).copy()
+
+
+@pytest.mark.parametrize("masked", [False, True])
+@pytest.mark.parametrize("name", sorted(KERNELS) + ['blur'])
+@pytest.mark.parametrize("kind", ['array', 'uint8', 'image'])
+def test_workers_give_identical_output(kind, name, masked):
+    one = run(kind, 1, name, masked)
+    for workers in (3, 8):
+        np.testing.assert_array_equal(run(kind, workers, name, masked), one)
+
+
+@pytest.mark.parametrize("kind", ['array', 'image'])
+def test_tiled_kernel_matches_the_whole_rect(kind):
+    expected = new_pixels()
+    x0, y0, x1, y1 = RECT['x0'], RECT['y0'], RECT['x1'], RECT['y1']
+    core.kernel_gray_scale(expected[y0:y1, x0:x1], 'NTSC')
+    np.testing.assert_array_equal(
+        run(kind, 8, 'gray_scale', False), expected)
+
+
+def new_large_source(kind, width, height):
+    pixels = np.random.RandomState(0).random_sample(
+        (height, width, 4)).astype(np.float32)
+    if kind == 'array':
+        return ArrayTileSource(pixels)
+    if kind == 'uint8':
+        return ArrayTileSource(
+            from_float(pixels, np.empty(pixels.shape, dtype=np.uint8)))
+    image = NumpyImage("img", width, height, pixels.reshape(-1))
+    return ImageTileSource(image, PixelTransfer(NumpyPixelIO()))
+
+
+def measure_peak(op, source, engine):
+    rect = {'x0': 0, 'y0': 0, 'x1': source.width, 'y1': source.height}
+    tracemalloc.start()
+    try:
+        op(engine, source, rect)
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+MEMORY_LIMIT = 1024 * 1024
+
+
+@pytest.mark.parametrize("name", sorted(KERNELS))
+@pytest.mark.parametrize("kind", ['array', 'uint8', 'image'])
+def test_rect_op_memory_stays_in_the_engine_limit(kind, name):
+    # a 16 MB image goes through tile buffers of the 1 MB limit
+    engine = TileEngine(memory_limit=MEMORY_LIMIT, workers=1)
+    source = new_large_source(kind, 1024, 1024)
+    peak = measure_peak(
+        lambda e, s, r: e.apply(s, r, KERNELS[name]), source, engine)
+    assert peak < MEMORY_LIMIT + 64 * 1024
+
+
+@pytest.mark.parametrize("kind", ['array', 'image'])
+def test_filter_memory_follows_the_width_not_the_height(kind):
+    # a band of tiles with its halo rows is held at once: read, joined
+    # with the carried rows and edge padded, next to the float64 RGB the
+    # filter returns for the band; a few strips whatever the height
+    filt, halo = filters.get_filter('GAUSSIAN', 4)
+    op = lambda e, s, r: e.apply_filter(s, r, filt, halo)
+    width = 512
+    peaks = []
+    for height in (512, 2048):
+        engine = TileEngine(memory_limit=MEMORY_LIMIT, workers=1)
+        peaks.append(measure_peak(
+            op, new_large_source(kind, width, height), engine))
+    assert peaks[1] < peaks[0] * 1.1
+    side = engine.get_tile_size()
+    assert side * side * TILE_BYTES_PER_PIXEL <= MEMORY_LIMIT
+    strip = (width + 2 * halo) * (side + 2 * halo) * 16
+    assert peaks[1] < 6 * strip
@@ -0,0 +1,40 @@
+from paint_tools.view import ViewCache
+
+
+class View2D():
+
+    # image spanning (x0, y0) to (x1, y1) of the region
+    def __init__(self, x0, y0, x1, y1):
+        self.bounds = (x0, y0, x1, y1)
+
+    def view_to_region(self, vx, vy, clip=True):
+        x0, y0, x1, y1 = self.bounds
+        return (x0 + vx * (x1 - x0), y0 + vy * (y1 - y0))
+
+
+def test_regions_keep_their_own_transform():
+    cache = ViewCache()
+    cache.capture(1, View2D(0, 0, 100, 100), 100, 100)
+    cache.capture(2, View2D(10, 10, 410, 410), 100, 100)
+    assert cache.get(1).to_pixel(50, 50) == (50, 50)
+    assert cache.get(2).to_pixel(50, 50) == (10, 10)
+    assert cache.get(3) is None
+
+
+def test_invalidate_one_or_all_regions():
+    cache = ViewCache()
+    cache.capture(1, View2D(0, 0, 100, 100), 100, 100)
+    cache.capture(2, View2D(0, 0, 200, 200), 100, 100)
+    cache.invalidate(1)
+    assert cache.get(1) is None
+    assert cache.get(2) is not None
+    cache.invalidate()
+    assert cache.get(2) is None
+
+
+def test_degenerate_view_drops_the_transform():
+    cache = ViewCache()
+    cache.capture(1, View2D(0, 0, 100, 100), 100, 100)
+    assert cache.capture(1, View2D(5, 5, 5, 5), 100, 100) is None
+    assert cache.get(1) is None
+    assert cache.capture(1, View2D(0, 0, 100, 100), 0, 100) is None